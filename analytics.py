@@ -0,0 +1,346 @@
+"""Headless analytics core for the Universal Bank dashboard.
+
+Every number the dashboard sections show is computed here by plain functions
+of a ``Dataset`` (the cleaned frame plus its filter index, data cube, quantile
+sketches and moment index) and a ``FilterSpec``. Nothing here imports Streamlit, so
+the same results can be produced by ``batch.py``, a notebook or a profiler.
+
+Functions that need row-level data accept ``selection``, the
+``filter_index.Selection`` already resolved for ``spec``, so a caller that
+holds one (like the dashboard) does not select twice; they read the columns
+they need from it instead of copying the filtered frame. Rates are returned as
+fractions; formatting is left to the caller.
+"""
+import dataclasses
+import hashlib
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from data_cube import DataCube
+from data_store import DATA_FILE, frame_digest, load_dataset
+from filter_index import FilterIndex, RebuildRequired, education_labels
+from intervals import CONFIDENCE, RESAMPLES, rate_intervals
+from moments import MomentIndex
+from quantile_sketch import QuantileSketch, SketchIndex
+from scenarios import envelope, scenario_kpis
+from segmentation import CUSTOMER_TIERS, TIER_THRESHOLDS, VIP_SEGMENTS, customer_tier_rules
+from sort_index import SortIndex
+from threshold_search import MIN_TIER_SIZE, ThresholdGrid
+
+STAT_COLUMNS = ['Age', 'Experience', 'Income', 'Family', 'CCAvg', 'Mortgage']
+CORR_COLUMNS = ['Age', 'Experience', 'Income', 'Family', 'CCAvg', 'Mortgage', 'Personal Loan', 'CD Account']
+HIGH_SPENDERS = 'High Spenders'
+
+
+@dataclass
+class Dataset:
+    """The cleaned frame and the structures pre-built over it.
+
+    ``version`` is a digest of the frame's content; results cached for one
+    version (``result_cache.ResultCache.bind``) are not served for another.
+    ``sorts`` orders selections for the paged table; its per-column sorts are
+    built on first use. ``revision`` counts the ``updated`` datasets this one
+    descends from.
+    """
+    df: pd.DataFrame
+    index: FilterIndex
+    cube: DataCube
+    sketches: SketchIndex
+    moments: MomentIndex
+    version: str = ''
+    sorts: SortIndex = None
+    revision: int = 0
+
+    @classmethod
+    def build(cls, df):
+        index = FilterIndex(df)
+        return cls(df, index, DataCube(df), SketchIndex(df), MomentIndex(df), frame_digest(df),
+                   SortIndex(df, index.sort_orders()))
+
+    @classmethod
+    def load(cls, path=DATA_FILE):
+        # Memory-mapped, so worker processes share the column pages.
+        return cls.build(load_dataset(path, mmap=True))
+
+    def updated(self, df, rows):
+        """The dataset of ``df``, this one's frame after ``rows`` changed or were appended.
+
+        Every structure folds in just those rows, and the version chains this
+        one with a digest of them instead of hashing the whole frame. A change
+        a structure cannot take incrementally (a value beyond the cube's bins,
+        a new education level) builds the dataset from scratch instead.
+        """
+        rows = np.unique(np.asarray(rows, dtype=np.intp))
+        if not len(rows) and len(df) == len(self.df):
+            return self
+        sha = hashlib.sha256(self.version.encode('utf-8'))
+        sha.update(rows.astype(np.int64).tobytes())
+        sha.update(frame_digest(df.iloc[rows]).encode('utf-8'))
+        try:
+            index = self.index.updated(df, rows)
+            return Dataset(df, index, self.cube.updated(df, rows), self.sketches.updated(df, rows),
+                           self.moments.updated(df, rows), sha.hexdigest(),
+                           self.sorts.updated(df, rows, index.sort_orders()), self.revision + 1)
+        except RebuildRequired:
+            return dataclasses.replace(Dataset.build(df), revision=self.revision + 1)
+
+    def select(self, spec):
+        return self.index.selection(self.df, spec)
+
+
+def _rows(data, spec, selection):
+    return data.select(spec) if selection is None else selection
+
+
+def _loan_subset(rows, loan):
+    return rows if loan is None else rows.subset(rows['Personal Loan'] == loan)
+
+
+def _rate(loans, count):
+    return loans / count if count else np.nan
+
+
+def kpis(cube_slice):
+    """Headline numbers for one cube slice."""
+    return {
+        'customers': len(cube_slice),
+        'loan_rate': cube_slice.mean('Personal Loan'),
+        'avg_income': cube_slice.mean('Income'),
+        'avg_ccavg': cube_slice.mean('CCAvg'),
+        'education_counts': {int(k): int(v) for k, v in cube_slice.education_counts().items()},
+    }
+
+
+def overview(data, spec):
+    return {'overall': kpis(data.cube.total()), 'filtered': kpis(data.cube.query(spec))}
+
+
+def column_sketch(data, spec, column, loan=None, selection=None, exact=False):
+    """Quantile sketch of ``column`` over ``spec``; ``exact`` sketches every filtered row."""
+    if not exact:
+        return data.sketches.query(spec, column, loan=loan)
+    rows = _rows(data, spec, selection)
+    values = rows[column]
+    if loan is not None:
+        values = values[rows['Personal Loan'] == loan]
+    return QuantileSketch(exact=True).update(values)
+
+
+def iqr_threshold(sketch, whisker=1.5):
+    """``(Q1, Q3, Q3 + whisker * IQR)`` from a sketch."""
+    q1, q3 = sketch.quantile([0.25, 0.75])
+    return q1, q3, q3 + whisker * (q3 - q1)
+
+
+def income_analysis(data, spec, selection=None, exact=False):
+    cube_slice = data.cube.query(spec)
+    by_loan = {}
+    for loan in (1, 0):
+        sketch = column_sketch(data, spec, 'Income', loan=loan, selection=selection, exact=exact)
+        by_loan[loan] = {
+            'mean': cube_slice.mean('Income', loan=loan),
+            'min': sketch.min,
+            'median': sketch.quantile(0.5),
+            'max': sketch.max,
+        }
+    return {
+        'avg_income': cube_slice.mean('Income'),
+        'by_loan': by_loan,
+        'brackets': cube_slice.conversion_by_income_bracket(),
+    }
+
+
+def credit_card_analysis(data, spec, selection=None, exact=False):
+    rows = _rows(data, spec, selection)
+    q1, q3, threshold = iqr_threshold(column_sketch(data, spec, 'CCAvg', selection=rows, exact=exact))
+    ccavg = rows['CCAvg']
+    loan = rows['Personal Loan']
+    outlier = ccavg > threshold
+    normal = ccavg <= threshold
+    n_outliers, n_normal = int(outlier.sum()), int(normal.sum())
+    return {
+        'q1': q1,
+        'q3': q3,
+        'iqr': q3 - q1,
+        'threshold': threshold,
+        'customers': len(rows),
+        'outliers': n_outliers,
+        'outlier_share': _rate(n_outliers, len(rows)),
+        'outlier_rate': _rate(loan[outlier].sum(), n_outliers),
+        'normal_rate': _rate(loan[normal].sum(), n_normal),
+    }
+
+
+def education_details(selection):
+    """Per education level count/loans/rate and Income/CCAvg stats, by label."""
+    labels = selection.derive('Education_Label', lambda rows: education_labels(rows['Education']))
+    frame = selection.frame(['Personal Loan', 'Income', 'CCAvg'])
+    details = frame.groupby(pd.Series(labels, index=frame.index, name='Education_Label'), observed=True).agg({
+        'Personal Loan': ['count', 'sum', 'mean'],
+        'Income': ['mean', 'median', 'min', 'max'],
+        'CCAvg': 'mean'
+    })
+    details.columns = ['Count', 'Loan_Count', 'Loan_Rate', 'Avg_Income', 'Median_Income',
+                       'Min_Income', 'Max_Income', 'Avg_CC']
+    # Alphabetical, as the table was when grouped by label strings.
+    details.index = details.index.astype(str)
+    return details.sort_index()
+
+
+def education_analysis(data, spec, selection=None):
+    return {
+        'conversion': data.cube.query(spec).conversion_by_education(),
+        'details': education_details(_rows(data, spec, selection)),
+    }
+
+
+def vip_segments(data, spec, selection=None, exact=False, rules=VIP_SEGMENTS):
+    """Count, share, conversion and average income of the VIP tiers and high spenders."""
+    rows = _rows(data, spec, selection)
+    _, _, threshold = iqr_threshold(column_sketch(data, spec, 'CCAvg', selection=rows, exact=exact))
+    masks = rules.masks(rows)
+    masks[HIGH_SPENDERS] = rows['CCAvg'] > threshold
+    loan = rows['Personal Loan']
+    income = rows['Income']
+    records = {}
+    for name, mask in masks.items():
+        count = int(mask.sum())
+        records[name] = {
+            'count': count,
+            'share': _rate(count, len(rows)),
+            'conversion': _rate(loan[mask].sum(), count),
+            'avg_income': _rate(income[mask].sum(), count),
+        }
+    segments = pd.DataFrame.from_dict(records, orient='index')
+    segments.index.name = 'Segment'
+    return {'threshold': threshold, 'segments': segments}
+
+
+def customer_tiers(data, spec, selection=None, rules=CUSTOMER_TIERS):
+    """Per-tier count, loans, conversion and average Income/CCAvg, in rule order."""
+    rows = _rows(data, spec, selection)
+    summary = rules.summary(rows, means=('Income', 'CCAvg'))
+    summary['share'] = summary['count'] / len(rows) if len(rows) else np.nan
+    return summary
+
+
+def tier_rules(thresholds=()):
+    """Customer tier rules with ``thresholds`` (``(name, value)`` pairs) replacing the defaults."""
+    return customer_tier_rules({**TIER_THRESHOLDS, **dict(thresholds)}) if thresholds else CUSTOMER_TIERS
+
+
+def tier_frontier(data, spec, selection=None, min_count=MIN_TIER_SIZE):
+    """Best Tier 1 conversion for each tier size over Income x CCAvg x education cut-offs.
+
+    ``frontier`` lists the cut-offs (smallest tier first); ``candidates`` is
+    how many combinations were evaluated.
+    """
+    grid = ThresholdGrid.from_selection(_rows(data, spec, selection))
+    return {
+        'frontier': grid.frontier(min_count),
+        'candidates': grid.n_candidates,
+    }
+
+
+def with_intervals(table, count='count', rate='mean', total=None, method='wilson', resamples=RESAMPLES,
+                   confidence=CONFIDENCE):
+    """``table`` plus ``low``/``high``, the confidence bounds of its ``rate`` column (see intervals.py).
+
+    ``total`` is the number of filtered customers the segments come from.
+    """
+    counts = table[count].to_numpy(dtype=np.float64)
+    loans = np.where(counts > 0, np.round(table[rate].to_numpy(dtype=np.float64) * counts), 0)
+    low, high = rate_intervals(loans, counts, method, total=total, resamples=resamples, confidence=confidence)
+    return table.assign(low=low, high=high)
+
+
+def conversion_intervals(data, spec, selection=None, exact=False, thresholds=(), method='wilson',
+                         resamples=RESAMPLES, confidence=CONFIDENCE):
+    """Income bracket, education, VIP segment and customer tier conversion rates with confidence bounds."""
+    rows = _rows(data, spec, selection)
+    cube_slice = data.cube.query(spec)
+    options = dict(total=len(rows), method=method, resamples=resamples, confidence=confidence)
+    return {
+        'income': with_intervals(cube_slice.conversion_by_income_bracket(), **options),
+        'education': with_intervals(cube_slice.conversion_by_education(), **options),
+        'vip': with_intervals(vip_segments(data, spec, selection=rows, exact=exact)['segments'], rate='conversion',
+                              **options),
+        'tiers': with_intervals(customer_tiers(data, spec, selection=rows, rules=tier_rules(thresholds)), **options),
+    }
+
+
+def compare_scenarios(data, scenarios, rules=CUSTOMER_TIERS):
+    """KPIs and tier mix of named filter states (``{name: FilterSpec}``), side by side.
+
+    All of them are evaluated in one pass over the rows of their envelope
+    (see scenarios.py) instead of resolving each one.
+    """
+    selection = data.select(envelope(scenarios.values())) if scenarios else None
+    return scenario_kpis(selection, scenarios, rules=rules)
+
+
+def describe(data, spec, columns=STAT_COLUMNS, loan=None, selection=None, exact=False):
+    """Like ``df_filtered[columns].describe().T`` (optionally one loan status)."""
+    if not exact:
+        return data.sketches.describe(spec, columns, loan=loan)
+    rows = _loan_subset(_rows(data, spec, selection), loan)
+    return rows.frame(columns).describe().T
+
+
+def correlations(data, spec, columns=CORR_COLUMNS, selection=None, exact=False):
+    """Pearson correlations of ``columns``, added up from per-partition moments.
+
+    ``exact`` (or a column the moment index does not track) computes them from
+    the filtered rows with pandas instead.
+    """
+    if not exact and set(columns) <= set(data.moments.columns):
+        return data.moments.query(spec, columns=columns).corr()
+    return _rows(data, spec, selection).frame(columns).corr()
+
+
+# Results the dashboard reads per filter state, by name: each is a function of
+# (data, spec, selection, *params). The dashboard and the cache warm-up
+# (warmup.py) compute them through ``section_result``, so both fill the same
+# ``result_cache`` keys.
+SECTION_RESULTS = {
+    'overview': lambda data, spec, selection: overview(data, spec),
+    'income': lambda data, spec, selection, exact: income_analysis(data, spec, selection=selection, exact=exact),
+    'credit_card': lambda data, spec, selection, exact: credit_card_analysis(data, spec, selection=selection,
+                                                                             exact=exact),
+    'education': lambda data, spec, selection: education_analysis(data, spec, selection=selection),
+    'vip': lambda data, spec, selection, exact: vip_segments(data, spec, selection=selection, exact=exact),
+    'tiers': lambda data, spec, selection, thresholds=(): customer_tiers(data, spec, selection=selection,
+                                                                         rules=tier_rules(thresholds)),
+    'tier_frontier': lambda data, spec, selection: tier_frontier(data, spec, selection=selection),
+    'describe': lambda data, spec, selection, loan, exact: describe(data, spec, loan=loan, selection=selection,
+                                                                    exact=exact),
+    'correlations': lambda data, spec, selection, exact: correlations(data, spec, selection=selection, exact=exact),
+}
+
+
+def section_result(data, spec, name, *params, selection=None):
+    """``SECTION_RESULTS[name]`` for ``spec``, e.g. ``section_result(data, spec, 'describe', 0, False)``."""
+    return SECTION_RESULTS[name](data, spec, selection, *params)
+
+
+def run_all(data, spec, exact=False):
+    """Every section's results for one filter state."""
+    selection = data.select(spec)
+    return {
+        'overview': overview(data, spec),
+        'income': income_analysis(data, spec, selection=selection, exact=exact),
+        'credit_card': credit_card_analysis(data, spec, selection=selection, exact=exact),
+        'education': education_analysis(data, spec, selection=selection),
+        'vip': vip_segments(data, spec, selection=selection, exact=exact),
+        'tiers': customer_tiers(data, spec, selection=selection),
+        'statistics': {
+            'all': describe(data, spec, selection=selection, exact=exact),
+            'no_loan': describe(data, spec, loan=0, selection=selection, exact=exact),
+            'loan': describe(data, spec, loan=1, selection=selection, exact=exact),
+        },
+        'correlations': correlations(data, spec, selection=selection, exact=exact),
+        'intervals': conversion_intervals(data, spec, selection=selection, exact=exact),
+    }
+
@@ -0,0 +1,198 @@
+"""Compute every dashboard section for a list of filter presets, in parallel.
+
+Each worker process loads the dataset and builds its indexes once (in the pool
+initializer) and then evaluates ``analytics.run_all`` for the presets it is
+handed. Results are written as one JSON document keyed by preset, or as a
+directory of Parquet files: one per table (``income.brackets.parquet``, ...)
+with a ``preset`` column, plus ``metrics.parquet`` holding the scalar results.
+
+    python batch.py --presets presets.json --output results.json --workers 4
+
+``--stream`` instead aggregates a CSV or Parquet file too large to load, chunk
+by chunk (``streaming.StreamStats``): every preset is updated from each chunk,
+so the file is read once. The summary metrics (overview, income brackets,
+education, tiers) are computed this way, not the full ``run_all`` sections.
+
+    python batch.py --stream customers.parquet --output results.json
+
+A presets file maps names to filter settings; omitted keys keep the default:
+
+    {"high income": {"income": [150, 224]}, "graduates": {"education": [2, 3]}}
+"""
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import analytics
+from analytics import Dataset
+from data_store import DATA_FILE
+from filter_index import DEFAULT_FILTERS, FilterSpec
+from streaming import DEFAULT_CHUNKSIZE, StreamStats, iter_chunks
+
+DEFAULT_PRESETS = {
+    'sidebar defaults': DEFAULT_FILTERS,
+    'high income': FilterSpec(income=(150.0, 224.0)),
+    'high spenders': FilterSpec(ccavg=(4.0, 10.0)),
+    'graduate/professional': FilterSpec(education=(2, 3)),
+    'loan takers': FilterSpec(loan=(1,)),
+}
+
+_data = None
+
+
+def parse_presets(raw):
+    """``{name: {income, ccavg, education, loan}}`` -> ``{name: FilterSpec}``."""
+    presets = {}
+    for name, values in raw.items():
+        unknown = set(values) - {'income', 'ccavg', 'education', 'loan'}
+        if unknown:
+            raise ValueError(f"preset {name!r}: unknown keys {sorted(unknown)}")
+        presets[name] = FilterSpec.from_widgets(
+            values.get('income', DEFAULT_FILTERS.income),
+            values.get('ccavg', DEFAULT_FILTERS.ccavg),
+            values.get('education', DEFAULT_FILTERS.education),
+            values.get('loan', DEFAULT_FILTERS.loan),
+        )
+    return presets
+
+
+def load_presets(path):
+    with open(path) as fh:
+        return parse_presets(json.load(fh))
+
+
+def to_jsonable(value):
+    """Nested results -> plain JSON types (frames as records, NaN as ``None``)."""
+    if isinstance(value, dict):
+        return {str(k): to_jsonable(v) for k, v in value.items()}
+    if isinstance(value, pd.DataFrame):
+        return to_jsonable(value.reset_index().to_dict(orient='records'))
+    if isinstance(value, pd.Series):
+        return to_jsonable(value.to_dict())
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [to_jsonable(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _init_worker(path):
+    global _data
+    _data = Dataset.load(path)
+
+
+def _run_preset(name, spec, exact):
+    start = time.perf_counter()
+    results = analytics.run_all(_data, spec, exact=exact)
+    return name, results, time.perf_counter() - start
+
+
+def run_presets(presets, path=DATA_FILE, workers=None, exact=False):
+    """``{name: run_all results}`` for every preset, computed in a process pool."""
+    workers = workers or min(len(presets), os.cpu_count() or 1)
+    results, timings = {}, {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(path,)) as pool:
+        futures = [pool.submit(_run_preset, name, spec, exact) for name, spec in presets.items()]
+        for future in futures:
+            name, result, seconds = future.result()
+            results[name] = result
+            timings[name] = seconds
+    return results, timings
+
+
+def stream_presets(presets, path, chunksize=DEFAULT_CHUNKSIZE):
+    """``{name: StreamStats results}`` for every preset, from one chunked pass over ``path``."""
+    stats = {name: StreamStats() for name in presets}
+    timings = dict.fromkeys(presets, 0.0)
+    for chunk in iter_chunks(path, chunksize):
+        for name, spec in presets.items():
+            start = time.perf_counter()
+            stats[name].update(chunk[spec.mask(chunk)])
+            timings[name] += time.perf_counter() - start
+    return {name: s.results() for name, s in stats.items()}, timings
+
+
+def _flatten(results, prefix=''):
+    """Yield ``(dotted key, value)`` for every leaf, stopping at DataFrames."""
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _flatten(value, name + '.')
+        else:
+            yield name, value
+
+
+def write_json(results, path, presets):
+    document = {
+        name: {'filters': to_jsonable(vars(presets[name])), 'results': to_jsonable(result)}
+        for name, result in results.items()
+    }
+    with open(path, 'w') as fh:
+        json.dump(document, fh, indent=2)
+
+
+def write_parquet(results, path, presets):
+    """One Parquet file per table plus ``metrics.parquet``, all with a ``preset`` column."""
+    os.makedirs(path, exist_ok=True)
+    tables, metrics = {}, []
+    for name, result in results.items():
+        for key, value in _flatten(result):
+            if isinstance(value, pd.DataFrame):
+                frame = value.reset_index()
+                frame.insert(0, 'preset', name)
+                tables.setdefault(key, []).append(frame)
+            else:
+                metrics.append({'preset': name, 'metric': key, 'value': to_jsonable(value)})
+    for key, frames in tables.items():
+        frame = pd.concat(frames, ignore_index=True)
+        frame.columns = [str(c) for c in frame.columns]
+        frame.to_parquet(os.path.join(path, f"{key}.parquet"), index=False)
+    metrics = pd.DataFrame(metrics)
+    metrics['value'] = pd.to_numeric(metrics['value'], errors='coerce')
+    metrics.to_parquet(os.path.join(path, 'metrics.parquet'), index=False)
+
+
+WRITERS = {'json': write_json, 'parquet': write_parquet}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compute every dashboard section for filter presets.")
+    parser.add_argument('--presets', help="JSON file of named presets (default: built-in presets)")
+    parser.add_argument('--output', default='batch_results.json',
+                        help="output file (json) or directory (parquet)")
+    parser.add_argument('--format', choices=list(WRITERS), default=None,
+                        help="defaults to parquet unless the output ends in .json")
+    parser.add_argument('--data', default=DATA_FILE)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--exact', action='store_true', help="exact quantiles instead of sketches")
+    parser.add_argument('--stream', metavar='PATH',
+                        help="aggregate this CSV or Parquet file chunk by chunk instead of loading --data")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args(argv)
+
+    source = args.stream or args.data
+    if not os.path.exists(source):
+        parser.error(f"data file not found: {source}")
+    fmt = args.format or ('json' if args.output.lower().endswith('.json') else 'parquet')
+    presets = load_presets(args.presets) if args.presets else DEFAULT_PRESETS
+    start = time.perf_counter()
+    if args.stream:
+        results, timings = stream_presets(presets, args.stream, args.chunksize)
+    else:
+        results, timings = run_presets(presets, args.data, args.workers, args.exact)
+    WRITERS[fmt](results, args.output, presets)
+    for name, seconds in timings.items():
+        print(f"{name:30s} {seconds * 1000:8.1f} ms")
+    print(f"wrote {len(results)} presets to {args.output} ({fmt}) in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Section compute time on a cold vs a warm result cache.
+
+Visits every dashboard section twice with the same filters through
+Streamlit's ``AppTest`` and reads the section's time back from the session's
+``RerunLog``: the first visit computes the aggregates and builds the figures,
+the second finds them in the ``ResultCache`` (``result_cache.py``). The
+output of both visits is compared; the script exits with an error if a cached
+visit shows anything different. With ``--after-warmup`` the first visits
+start once the background warm-up (``warmup.py``) has filled in the presets'
+aggregates, so they only build figures. Run from the repository root:
+
+    python benchmarks/bench_cache.py [--rounds 3] [--after-warmup]
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD = os.path.join(ROOT, 'streamlit_dashboard.py')
+SECTIONS = {
+    "📊 Overview": 'overview',
+    "📈 Income Analysis": 'income',
+    "💳 Credit Card Analysis": 'credit_card',
+    "🎓 Education Analysis": 'education',
+    "🎪 VIP Segment": 'vip',
+    "🎯 Customer Tiers": 'tiers',
+    "📋 Data Explorer": 'explorer',
+}
+
+
+def snapshot(at):
+    """What a section shows: metrics, markdown, figure specs and tables."""
+    return (
+        [(m.label, m.value) for m in at.metric],
+        [m.value for m in at.markdown],
+        [json.loads(e.proto.spec) for e in at.get('plotly_chart')],
+        [d.value.to_json() for d in at.main.dataframe],
+    )
+
+
+def visit(at, section):
+    log = at.session_state['rerun_log']
+    at.sidebar.radio[0].set_value(section).run()
+    assert not at.exception, [e.value for e in at.exception]
+    unit = SECTIONS[section]
+    return next(run.seconds for run in reversed(log.runs) if run.unit == unit) * 1000, snapshot(at)
+
+
+def caption(at, prefix):
+    return next(c.value for c in at.caption if c.value.startswith(prefix))
+
+
+def wait_for_warmup(at, timeout=300):
+    start = time.perf_counter()
+    while "done" not in caption(at, "Cache warm-up:"):
+        if time.perf_counter() - start > timeout:
+            raise TimeoutError("cache warm-up did not finish")
+        time.sleep(0.2)
+        at.run()
+    return caption(at, "Cache warm-up:")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=3, help="warm visits per section")
+    parser.add_argument('--after-warmup', action='store_true', help="wait for the background warm-up first")
+    args = parser.parse_args(argv)
+    logging.disable(logging.WARNING)
+    from streamlit.testing.v1 import AppTest
+
+    # Load Plotly's lazily built modules up front, so the cold visits time the sections.
+    import plotly.express as px
+    px.bar(x=[0], y=[0]).to_json()
+
+    at = AppTest.from_file(DASHBOARD, default_timeout=300).run()
+    if args.after_warmup:
+        print(wait_for_warmup(at))
+    mismatches = 0
+    print(f"{'section':<26}{'first':>10}{'cached':>10}{'speed-up':>10}")
+    for section in SECTIONS:
+        cold, expected = visit(at, section)
+        warm = []
+        for _ in range(args.rounds):
+            ms, shown = visit(at, section)
+            warm.append(ms)
+            mismatches += shown != expected
+        warm_ms = statistics.median(warm)
+        print(f"{section:<26}{cold:7.1f} ms{warm_ms:7.1f} ms{cold / warm_ms:9.1f}x")
+    print(caption(at, "Result cache:"))
+    if mismatches:
+        print(f"{mismatches} cached visit(s) differ from the first visit")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
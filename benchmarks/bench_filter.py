@@ -0,0 +1,60 @@
+"""Sidebar filtering: full boolean scan vs ``FilterIndex``.
+
+The sample is resampled with replacement up to ``--rows`` customers:
+
+    python benchmarks/bench_filter.py --rows 10000000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_store import load_dataset  # noqa: E402
+from filter_index import FilterIndex, FilterSpec  # noqa: E402
+
+SPECS = {
+    'sidebar defaults': FilterSpec(),
+    'VIP corner': FilterSpec(income=(150, 224), ccavg=(4.0, 10.0), education=(2, 3)),
+    'narrow band': FilterSpec(income=(100, 101), ccavg=(2.0, 2.1)),
+    'loan takers': FilterSpec(income=(0, 224), loan=(1,)),
+}
+
+
+def _median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    sample = load_dataset()
+    rng = np.random.default_rng(args.seed)
+    df = sample.take(rng.integers(0, len(sample), args.rows)).reset_index(drop=True)
+
+    start = time.perf_counter()
+    index = FilterIndex(df)
+    print(f"index build over {len(df):,} rows: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    for name, spec in SPECS.items():
+        scan = _median_ms(lambda: np.flatnonzero(spec.mask(df)), args.repeat)
+        indexed = _median_ms(lambda: index.rows(spec), args.repeat)
+        print(f"{name:<18} rows {index.count(spec):>11,}   scan {scan:9.2f} ms   "
+              f"index {indexed:9.2f} ms   x{scan / indexed:6.1f}")
+
+
+if __name__ == '__main__':
+    main()
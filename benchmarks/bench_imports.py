@@ -0,0 +1,140 @@
+"""Import-time profile of the dashboard and time-to-first-paint on a fresh worker.
+
+Every measurement runs in a fresh interpreter, so nothing is already cached in
+``sys.modules``. The import profile lists the modules ``streamlit_dashboard.py``
+imports, eagerly (at the top of the script) or lazily (inside a section), with
+what each costs on its own and on top of the eager set, from
+``python -X importtime``. The first-paint runs execute the dashboard with
+Streamlit's ``AppTest`` and read back the ``first_paint_ms`` mark the script
+records once the header, filters and sidebar KPIs are drawn.
+
+Run from the repository root:
+
+    python benchmarks/bench_imports.py [--runs 3] [--top 15] [--json startup.jsonl]
+
+With ``--json`` one JSON line per invocation is appended to the file, so the
+numbers can be tracked across commits.
+"""
+import argparse
+import ast
+import datetime
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD = os.path.join(ROOT, 'streamlit_dashboard.py')
+
+FIRST_PAINT_SCRIPT = """
+import json, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+ready = time.perf_counter()
+at = AppTest.from_file({path!r}, default_timeout=300).run()
+done = time.perf_counter()
+assert not at.exception, [e.value for e in at.exception]
+print(json.dumps({{
+    'streamlit_import_ms': (ready - start) * 1000,
+    'first_paint_ms': at.session_state['first_paint_ms'],
+    'first_run_ms': (done - ready) * 1000,
+}}))
+"""
+
+
+def dashboard_imports(path=DASHBOARD):
+    """``(eager, lazy)`` module names imported by the dashboard script."""
+    with open(path, encoding='utf-8') as fh:
+        tree = ast.parse(fh.read())
+    eager = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    lazy = [node for node in ast.walk(tree)
+            if isinstance(node, (ast.Import, ast.ImportFrom)) and node not in eager]
+
+    def names(nodes):
+        found = []
+        for node in nodes:
+            modules = [a.name for a in node.names] if isinstance(node, ast.Import) else [node.module]
+            found.extend(m for m in modules if m not in found)
+        return found
+
+    eager_names = names(eager)
+    return eager_names, [m for m in names(lazy) if m not in eager_names]
+
+
+def import_times(modules, preload=()):
+    """Import ``modules`` in order (after ``preload``) in a fresh interpreter.
+
+    Returns the cost (ms) of each import statement, i.e. of everything it
+    pulled in that was not loaded yet, and the cumulative cost of every
+    package imported at the top of the tree, keyed by name.
+    """
+    code = ''.join(f"import {m}\n" for m in preload)
+    code += ''.join(f"sys.stderr.write('-- {m}\\n'); import {m}\n" for m in modules)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import sys\n' + code],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+    per_module, packages, current = {}, {}, None
+    for line in proc.stderr.splitlines():
+        if line.startswith('-- '):
+            current = line[3:]
+            per_module[current] = 0.0
+        elif current and line.startswith('import time:') and 'cumulative' not in line:
+            _, cum, name = line.split('|')
+            # Nested entries are already included in their parent's cumulative time.
+            if not name[1:].startswith(' '):
+                per_module[current] += int(cum) / 1000
+                packages[name.strip()] = int(cum) / 1000
+    return per_module, packages
+
+
+def first_paint(runs):
+    samples = []
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, '-c', FIRST_PAINT_SCRIPT.format(path=DASHBOARD)],
+                              cwd=ROOT, capture_output=True, text=True, check=True)
+        samples.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return {key: statistics.median(s[key] for s in samples) for key in samples[0]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3, help="fresh workers for time-to-first-paint")
+    parser.add_argument('--top', type=int, default=15, help="heaviest packages to list")
+    parser.add_argument('--json', help="append the results as one JSON line to this file")
+    args = parser.parse_args(argv)
+
+    eager, lazy = dashboard_imports()
+    standalone = {m: import_times([m])[0][m] for m in eager + lazy}
+    eager_total, packages = import_times(eager)
+    on_top = {m: import_times([m], preload=eager)[0][m] for m in lazy}
+
+    print("module                         alone (ms)   on top of eager imports (ms)")
+    for m in eager:
+        print(f"  {m:<28} {standalone[m]:10.1f}   {eager_total[m]:10.1f}")
+    for m in lazy:
+        print(f"  {m + ' (lazy)':<28} {standalone[m]:10.1f}   {on_top[m]:10.1f}")
+    print(f"eager imports total            {sum(eager_total.values()):10.1f} ms")
+    print("\nheaviest packages loaded by the eager imports:")
+    for name, ms in sorted(packages.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {name:<40} {ms:8.1f} ms")
+
+    paint = first_paint(args.runs)
+    print(f"\nfresh worker, median of {args.runs}:")
+    print(f"  import streamlit + AppTest     {paint['streamlit_import_ms']:10.1f} ms")
+    print(f"  script start -> first paint    {paint['first_paint_ms']:10.1f} ms")
+    print(f"  full first run (Overview)      {paint['first_run_ms']:10.1f} ms")
+
+    if args.json:
+        record = {
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'eager_import_ms': eager_total,
+            'lazy_import_ms': on_top,
+            'first_paint': paint,
+        }
+        with open(args.json, 'a') as fh:
+            fh.write(json.dumps(record) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Bytes per customer: inferred int64/float64 frame vs the compact schema.
+
+Also compares what one rerun allocates for the filtered rows: a dense
+``df.take`` copy of every column (the old path) against a ``Selection``, which
+holds the row positions plus only the columns a section reads. The sample is
+resampled with replacement up to ``--rows`` customers:
+
+    python benchmarks/bench_memory.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_store import bytes_per_row, load_dataset  # noqa: E402
+from filter_index import FilterIndex, FilterSpec  # noqa: E402
+
+# Columns the credit card section reads from the selection.
+SECTION_COLUMNS = ['Income', 'CCAvg', 'Personal Loan']
+
+
+def wide(df):
+    """``df`` in the dtypes pandas infers from the workbook."""
+    return df.astype({col: np.float64 if df[col].dtype.kind == 'f' else np.int64 for col in df.columns})
+
+
+def selection_bytes(selection, columns):
+    gathered = sum(selection[col].nbytes for col in columns)
+    return gathered + (0 if selection.rows is None else selection.rows.nbytes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=None, help="resample to this many customers")
+    args = parser.parse_args(argv)
+
+    compact = load_dataset()
+    if args.rows:
+        picks = np.random.default_rng(0).integers(0, len(compact), args.rows)
+        compact = compact.take(picks).reset_index(drop=True)
+    before = wide(compact)
+    n = len(compact)
+
+    print(f"{n:,} customers")
+    print(f"{'frame':<32}{'bytes/customer':>16}{'total':>14}")
+    for name, frame in (('inferred int64/float64', before), ('compact schema', compact)):
+        print(f"{name:<32}{bytes_per_row(frame):16.1f}{bytes_per_row(frame) * n / 2**20:11.1f} MB")
+
+    spec = FilterSpec()
+    print(f"\nper rerun, default filters ({SECTION_COLUMNS} read by the section):")
+    print(f"{'path':<32}{'bytes/customer':>16}{'total':>14}")
+    for name, frame in (('take(), inferred dtypes', before), ('take(), compact schema', compact)):
+        copy = FilterIndex(frame).select(frame, spec)
+        print(f"{name:<32}{bytes_per_row(copy) * len(copy) / n:16.1f}"
+              f"{bytes_per_row(copy) * len(copy) / 2**20:11.1f} MB")
+    selection = FilterIndex(compact).selection(compact, spec)
+    used = selection_bytes(selection, SECTION_COLUMNS)
+    print(f"{'Selection, compact schema':<32}{used / n:16.1f}{used / 2**20:11.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Correlations and summary statistics: pandas on the filtered rows vs ``MomentIndex``.
+
+Every spec is first checked against pandas (``mean``, ``std``, ``corr`` of the
+filtered rows, overall and per loan status); the script exits with an error if
+any result is off by more than the tolerance. The sample is resampled with
+replacement up to ``--rows`` customers:
+
+    python benchmarks/bench_moments.py --rows 1000000 [--specs 500]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_store import load_dataset  # noqa: E402
+from filter_index import FilterIndex, FilterSpec  # noqa: E402
+from moments import MOMENT_COLUMNS, MomentIndex  # noqa: E402
+
+RTOL = 1e-9
+ATOL = 1e-9
+
+
+def random_spec(rng):
+    income = np.sort(rng.integers(0, 230, 2))
+    ccavg = np.sort(rng.integers(0, 101, 2)) / 10
+    education = rng.choice([1, 2, 3], rng.integers(1, 4), replace=False)
+    loan = rng.choice([0, 1], rng.integers(1, 3), replace=False)
+    return FilterSpec.from_widgets(income, ccavg, education, loan)
+
+
+def check(df, index, moments, spec, loan):
+    """Largest deviation from pandas, or ``None`` if the NaN patterns differ."""
+    selection = index.selection(df, spec)
+    if loan is not None:
+        selection = selection.subset(selection['Personal Loan'] == loan)
+    frame = selection.frame(list(MOMENT_COLUMNS)).astype(np.float64)
+    result = moments.query(spec, loan=loan)
+    if result.n != len(frame):
+        return None
+    worst = 0.0
+    for expected, actual in ((frame.mean(), result.mean()), (frame.std(), result.std()),
+                             (frame.corr(), result.corr())):
+        expected, actual = np.asarray(expected, dtype=np.float64), np.asarray(actual, dtype=np.float64)
+        if not np.array_equal(np.isnan(expected), np.isnan(actual)):
+            return None
+        ok = ~np.isnan(expected)
+        if not np.allclose(actual[ok], expected[ok], rtol=RTOL, atol=ATOL):
+            return None
+        if ok.any():
+            worst = max(worst, float(np.max(np.abs(actual[ok] - expected[ok]))))
+    return worst
+
+
+def _median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=None, help="resample to this many customers")
+    parser.add_argument('--specs', type=int, default=500, help="random specs checked against pandas")
+    parser.add_argument('--repeat', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    df = load_dataset()
+    if args.rows:
+        picks = np.random.default_rng(0).integers(0, len(df), args.rows)
+        df = df.take(picks).reset_index(drop=True)
+    start = time.perf_counter()
+    moments = MomentIndex(df)
+    build = time.perf_counter() - start
+    index = FilterIndex(df)
+    print(f"{len(df):,} customers, {len(moments.partitions)} partitions, "
+          f"{moments.nbytes / 1024:.1f} KB of moments, built in {build * 1000:.0f} ms")
+
+    rng = np.random.default_rng(1)
+    worst, failures = 0.0, 0
+    for _ in range(args.specs):
+        spec = random_spec(rng)
+        for loan in (None, 0, 1):
+            deviation = check(df, index, moments, spec, loan)
+            if deviation is None:
+                failures += 1
+                print(f"MISMATCH {spec} loan={loan}")
+            else:
+                worst = max(worst, deviation)
+    print(f"parity: {args.specs * 3 - failures}/{args.specs * 3} match pandas, "
+          f"max abs deviation {worst:.2e}")
+
+    spec = FilterSpec()
+    columns = list(MOMENT_COLUMNS)
+
+    def pandas_path():
+        selection = index.selection(df, spec)
+        selection.frame(columns).corr()
+        for loan in (0, 1):
+            selection.subset(selection['Personal Loan'] == loan).frame(columns).describe()
+
+    def moments_path():
+        moments.query(spec).corr()
+        for loan in (0, 1):
+            result = moments.query(spec, loan=loan)
+            result.mean(), result.std()
+
+    baseline = _median_ms(pandas_path, args.repeat)
+    fast = _median_ms(moments_path, args.repeat)
+    print(f"default filters: pandas {baseline:8.2f} ms   moments {fast:8.2f} ms   x{baseline / fast:6.1f}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Reruns and compute time for a scripted slider-drag session.
+
+Drives the dashboard with Streamlit's ``AppTest`` and reads back the
+session's ``RerunLog`` (``rerun_stats.py``):
+
+* live filters: every slider position of the drag is one full rerun;
+* "On apply" filters: the same positions are set inside the filter form and
+  sent with a single Apply, so the drag costs one rerun;
+* chart render-mode changes: each change of a chart's "Rendering" box. In the
+  browser only that chart's fragment reruns; ``AppTest`` always reruns the
+  whole script, so the fragment cost is the time the chart's unit took inside
+  those runs.
+
+Run from the repository root:
+
+    python benchmarks/bench_reruns.py [--steps 20] [--json reruns.jsonl]
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import statistics
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD = os.path.join(ROOT, 'streamlit_dashboard.py')
+SECTION = "💳 Credit Card Analysis"
+CHART = ('cc_hist_mode', 'cc_histogram')
+
+
+def start(section=SECTION):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(DASHBOARD, default_timeout=300).run()
+    at.sidebar.radio[0].set_value(section).run()
+    check(at)
+    return at
+
+
+def check(at):
+    assert not at.exception, [e.value for e in at.exception]
+
+
+def positions(steps, low=40, high=160):
+    """Income slider values of a drag of the lower handle from ``low`` towards ``high``."""
+    return [(low + (high - low) * (i + 1) // (steps + 1), 200) for i in range(steps)]
+
+
+def result(log):
+    script = [run.seconds * 1000 for run in log.runs if run.isolated]
+    return {
+        'reruns': log.reruns,
+        'compute_ms': log.compute_seconds * 1000,
+        'median_rerun_ms': statistics.median(script) if script else 0.0,
+    }
+
+
+def live_drag(steps):
+    at = start()
+    log = at.session_state['rerun_log']
+    log.clear()
+    for value in positions(steps):
+        at.slider(key='income_range').set_value(value).run()
+        check(at)
+    return result(log)
+
+
+def apply_drag(steps):
+    at = start()
+    at.radio(key='filter_mode').set_value("On apply").run()
+    log = at.session_state['rerun_log']
+    log.clear()
+    for value in positions(steps):
+        at.slider(key='income_range').set_value(value)
+    next(b for b in at.button if b.label == "Apply filters").click().run()
+    check(at)
+    return result(log)
+
+
+def mode_changes(steps, key=CHART[0], unit=CHART[1]):
+    from charts import RENDER_MODES
+    at = start()
+    log = at.session_state['rerun_log']
+    log.clear()
+    for i in range(steps):
+        at.selectbox(key=key).set_value(RENDER_MODES[(i + 1) % len(RENDER_MODES)]).run()
+        check(at)
+    full = result(log)
+    fragment = [run.seconds * 1000 for run in log.runs if run.unit == unit]
+    return full, {
+        'reruns': len(fragment),
+        'compute_ms': sum(fragment),
+        'median_rerun_ms': statistics.median(fragment),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--steps', type=int, default=20, help="slider positions / render-mode changes")
+    parser.add_argument('--json', help="append the results as one JSON line to this file")
+    args = parser.parse_args(argv)
+    logging.disable(logging.WARNING)
+    sys.path.insert(0, ROOT)
+
+    rows = {
+        'slider drag, live filters': live_drag(args.steps),
+        'slider drag, on apply': apply_drag(args.steps),
+    }
+    full, fragment = mode_changes(args.steps)
+    rows['render-mode change, full rerun'] = full
+    rows['render-mode change, fragment'] = fragment
+
+    print(f"{args.steps} steps on {SECTION}")
+    print(f"{'scenario':<34}{'reruns':>8}{'compute':>12}{'median rerun':>15}")
+    for name, row in rows.items():
+        print(f"{name:<34}{row['reruns']:8d}{row['compute_ms']:9.0f} ms{row['median_rerun_ms']:12.1f} ms")
+
+    if args.json:
+        record = {
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'steps': args.steps,
+            'scenarios': rows,
+        }
+        with open(args.json, 'a') as fh:
+            fh.write(json.dumps(record) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Memory of concurrent workers: one mapped dataset vs a private copy each.
+
+A bundle with ``--rows`` resampled customers is written to a temporary cache
+directory. ``--workers`` processes then load it at the same time, either
+memory-mapped through ``SharedDataset`` or read into private memory, touch
+every column, attach ``--sessions`` sessions each and report their resident
+(RSS), proportional (PSS: shared pages split between the processes mapping
+them) and private memory from ``/proc/self/smaps_rollup`` (Linux only):
+
+    python benchmarks/bench_shared.py --rows 2000000 --workers 4 --sessions 10
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_store import DATA_FILE, load_dataset, write_sidecar  # noqa: E402
+from shared_store import SharedDataset, attached_sessions  # noqa: E402
+
+
+def memory_kb():
+    fields = {}
+    with open('/proc/self/smaps_rollup') as fh:
+        for line in fh:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': fields['Rss'],
+        'pss': fields['Pss'],
+        'private': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    }
+
+
+def _worker(cache_dir, mapped, sessions, barrier, results):
+    before = memory_kb()
+    if mapped:
+        store = SharedDataset(DATA_FILE, cache_dir)
+        for i in range(sessions):
+            store.attach(f'{os.getpid()}-{i}')
+        df = store.df
+    else:
+        df = load_dataset(DATA_FILE, cache_dir)
+    for col in df.columns:
+        df[col].to_numpy().sum()
+    # Measure while every worker holds the data.
+    barrier.wait()
+    after = memory_kb()
+    results.put({key: after[key] - before[key] for key in after})
+    barrier.wait()
+    if mapped:
+        store.close()
+
+
+def run(cache_dir, mapped, workers, sessions):
+    ctx = multiprocessing.get_context('spawn')
+    barrier = ctx.Barrier(workers + 1)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=_worker, args=(cache_dir, mapped, sessions, barrier, results))
+             for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+    barrier.wait()
+    attached = attached_sessions(DATA_FILE, cache_dir) if mapped else {}
+    samples = [results.get() for _ in procs]
+    barrier.wait()
+    for proc in procs:
+        proc.join()
+    return samples, attached
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--sessions', type=int, default=10, help="sessions attached per worker")
+    args = parser.parse_args(argv)
+
+    df = load_dataset()
+    picks = np.random.default_rng(0).integers(0, len(df), args.rows)
+    df = df.take(picks).reset_index(drop=True)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        write_sidecar(df, DATA_FILE, cache_dir)
+        size = df.memory_usage(index=False).sum() / 2**20
+        print(f"{args.rows:,} customers, {size:.1f} MB of column data, {args.workers} workers")
+        print(f"{'mode':<16}{'RSS/worker':>12}{'PSS/worker':>12}{'private/worker':>16}{'PSS total':>12}")
+        for mapped in (False, True):
+            samples, attached = run(cache_dir, mapped, args.workers, args.sessions)
+            mb = {key: [s[key] / 1024 for s in samples] for key in samples[0]}
+            print(f"{'memory-mapped' if mapped else 'private copy':<16}"
+                  f"{np.mean(mb['rss']):9.1f} MB{np.mean(mb['pss']):9.1f} MB"
+                  f"{np.mean(mb['private']):13.1f} MB{sum(mb['pss']):9.1f} MB")
+            if mapped:
+                print(f"attached sessions: {sum(attached.values())} across {len(attached)} workers")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""Time and memory of every dashboard stage on synthetic data at several scales.
+
+For each ``--rows`` size a seeded synthetic dataset (``synthetic.py``) is
+written as a sidecar bundle and every stage the dashboard runs is measured
+with the sidebar's default filters: load, index build, filter, and each
+section's compute blocks (brackets, IQR, tier assignment, describe, corr, ...)
+and figure builds. A stage's time is the median of ``--repeat`` runs, each on
+a freshly resolved selection so cached column gathers do not flatter it; its
+memory is the peak of Python/NumPy allocations during one more run, traced
+with ``tracemalloc`` (memory-mapped pages are not allocations and do not
+show). Results go to a JSON file; ``--compare`` reports stages whose best time
+got slower than in an earlier file by more than ``--threshold`` (and by at
+least ``MIN_DELTA_MS``, so timer noise on tiny stages is ignored) and exits
+with an error:
+
+    python benchmarks/bench_suite.py --rows 5000 1000000 10000000 --output suite.json
+    python benchmarks/bench_suite.py --rows 5000 1000000 --compare suite.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import analytics  # noqa: E402
+from analytics import Dataset  # noqa: E402
+from charts import binned_histogram, density_heatmap  # noqa: E402
+from data_store import load_dataset, write_sidecar  # noqa: E402
+from filter_index import FilterSpec  # noqa: E402
+from refresh import KEY, upsert  # noqa: E402
+from scoring import train  # noqa: E402
+from segmentation import CUSTOMER_TIERS  # noqa: E402
+from synthetic import SyntheticBank  # noqa: E402
+
+DEFAULT_ROWS = [5_000, 1_000_000, 10_000_000]
+SPEC = FilterSpec()
+MIN_DELTA_MS = 1.0
+# 16 variants of the default filters: Income floor x CC spending floor x
+# education levels, compared in one pass and one by one.
+SCENARIOS = {
+    f'income {low:g}+, cc {cc:g}+, edu {edu}': FilterSpec(income=(low, 200.0), ccavg=(cc, 10.0), education=edu)
+    for low in (40.0, 60.0, 80.0, 100.0) for cc in (0.0, 1.0) for edu in ((1, 2, 3), (2, 3))
+}
+
+
+def _px_bar(frame, **kwargs):
+    import plotly.express as px
+    return px.bar(frame, **kwargs).to_json()
+
+
+def _px_imshow(matrix):
+    import plotly.express as px
+    return px.imshow(matrix, color_continuous_scale='RdBu', zmin=-1, zmax=1, text_auto='.2f').to_json()
+
+
+# (section, stage, fn(data, selection)); the selection is resolved for SPEC
+# before each run and is not part of the stage's time.
+STAGES = [
+    ('sidebar', 'filter', lambda data, sel: data.select(SPEC)['Income']),
+    ('sidebar', 'overview KPIs', lambda data, sel: analytics.overview(data, SPEC)),
+    ('income', 'brackets', lambda data, sel: data.cube.query(SPEC).conversion_by_income_bracket()),
+    ('income', 'income stats', lambda data, sel: analytics.income_analysis(data, SPEC, selection=sel)),
+    ('income', 'figure: histogram',
+     lambda data, sel: binned_histogram(sel['Income'], sel['Personal Loan'], nbins=50).to_json()),
+    ('income', 'figure: brackets bar',
+     lambda data, sel: _px_bar(data.cube.query(SPEC).conversion_by_income_bracket().reset_index(),
+                               x='Income_Bracket', y='mean')),
+    ('credit_card', 'IQR (sketches)', lambda data, sel: analytics.iqr_threshold(
+        analytics.column_sketch(data, SPEC, 'CCAvg'))),
+    ('credit_card', 'IQR (exact)', lambda data, sel: analytics.iqr_threshold(
+        analytics.column_sketch(data, SPEC, 'CCAvg', selection=sel, exact=True))),
+    ('credit_card', 'outliers', lambda data, sel: analytics.credit_card_analysis(data, SPEC, selection=sel)),
+    ('credit_card', 'figure: histogram',
+     lambda data, sel: binned_histogram(sel['CCAvg'], sel['Personal Loan'], nbins=50).to_json()),
+    ('credit_card', 'figure: density',
+     lambda data, sel: density_heatmap(sel['Income'], sel['CCAvg'], sel['Personal Loan'],
+                                       sample_per_group=500).to_json()),
+    ('education', 'education stats', lambda data, sel: analytics.education_analysis(data, SPEC, selection=sel)),
+    ('vip', 'VIP segments', lambda data, sel: analytics.vip_segments(data, SPEC, selection=sel)),
+    ('tiers', 'tier assignment', lambda data, sel: CUSTOMER_TIERS.codes(sel)),
+    ('tiers', 'tier summary', lambda data, sel: analytics.customer_tiers(data, SPEC, selection=sel)),
+    ('tiers', 'intervals: wilson', lambda data, sel: analytics.conversion_intervals(data, SPEC, selection=sel)),
+    ('tiers', 'intervals: poisson', lambda data, sel: analytics.conversion_intervals(data, SPEC, selection=sel,
+                                                                                      method='poisson')),
+    ('tiers', 'intervals: multinomial', lambda data, sel: analytics.conversion_intervals(
+        data, SPEC, selection=sel, method='multinomial')),
+    ('tiers', 'threshold frontier', lambda data, sel: analytics.tier_frontier(data, SPEC, selection=sel)),
+    ('explorer', 'describe (sketches)', lambda data, sel: analytics.describe(data, SPEC)),
+    ('explorer', 'describe (exact)', lambda data, sel: analytics.describe(data, SPEC, selection=sel, exact=True)),
+    ('explorer', 'corr (moments)', lambda data, sel: analytics.correlations(data, SPEC)),
+    ('explorer', 'corr (exact)', lambda data, sel: analytics.correlations(data, SPEC, selection=sel, exact=True)),
+    ('explorer', 'figure: corr heatmap', lambda data, sel: _px_imshow(analytics.correlations(data, SPEC))),
+    ('explorer', 'table: order', lambda data, sel: data.sorts.ordered(sel, 'Mortgage')),
+    ('scenarios', f'{len(SCENARIOS)} batched', lambda data, sel: analytics.compare_scenarios(data, SCENARIOS)),
+    ('scenarios', f'{len(SCENARIOS)} one by one', lambda data, sel: [
+        (analytics.overview(data, spec), analytics.customer_tiers(data, spec)) for spec in SCENARIOS.values()]),
+]
+TABLE_COLUMNS = ['ID', 'Age', 'Income', 'CCAvg', 'Education', 'Mortgage', 'Personal Loan']
+
+
+def measure(fn, setup, repeat):
+    """``(median ms, min ms, peak traced bytes)`` of ``fn(*setup())``."""
+    samples = []
+    for _ in range(repeat):
+        args = setup()
+        start = time.perf_counter()
+        fn(*args)
+        samples.append((time.perf_counter() - start) * 1000)
+    args = setup()
+    tracemalloc.start()
+    try:
+        fn(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return statistics.median(samples), min(samples), peak
+
+
+def _touch(df):
+    for col in df.columns:
+        df[col].to_numpy().sum()
+    return df
+
+
+def run_size(model, rows, seed, repeat):
+    start = time.perf_counter()
+    df = model.generate(rows, seed=seed)
+    print(f"\n{rows:,} customers (generated in {time.perf_counter() - start:.1f} s)")
+    results = []
+
+    def record(section, stage, fn, setup, times=repeat):
+        median, best, peak = measure(fn, setup, times)
+        results.append({'rows': rows, 'section': section, 'stage': stage,
+                        'median_ms': median, 'min_ms': best, 'peak_bytes': peak})
+        print(f"  {section:<12}{stage:<24}{median:10.2f} ms{peak / 2**20:10.1f} MB")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # A placeholder source: the bundle's manifest fingerprints it, so the
+        # loads below read the bundle instead of parsing anything.
+        source = os.path.join(cache_dir, 'synthetic.xls')
+        with open(source, 'wb') as fh:
+            fh.write(f'synthetic {rows} {seed}'.encode())
+        write_sidecar(df, source, cache_dir)
+        record('startup', 'load (read)', lambda: _touch(load_dataset(source, cache_dir)), tuple)
+        record('startup', 'load (mmap)', lambda: _touch(load_dataset(source, cache_dir, mmap=True)), tuple)
+    record('startup', 'build indexes', Dataset.build, lambda: (df,), times=max(1, min(repeat, 3)))
+    data = Dataset.build(df)
+    # A refresh folds changed or new customers into the built dataset.
+    keyed = data.sorts.order(KEY)
+    changed = df.iloc[[len(df) // 2]].copy()
+    changed['Income'] += 1
+    appended = model.generate(max(1, rows // 100), seed=seed + 1)
+    appended['ID'] += df['ID'].max()
+    for stage, records in (('refresh: one row', changed), ('refresh: append 1%', appended)):
+        record('startup', stage, lambda: data.updated(*upsert(df, records, order=keyed)), tuple,
+               times=max(1, min(repeat, 3)))
+    for section, stage, fn in STAGES:
+        record(section, stage, fn, lambda: (data, data.select(SPEC)))
+    # A page from the middle of a selection that is already ordered.
+    ordered = data.select(SPEC)
+    data.sorts.ordered(ordered, 'Mortgage')
+    record('explorer', 'table: page', lambda sel: data.sorts.page(sel, 'Mortgage', False, len(sel) // 2, 100,
+                                                                 TABLE_COLUMNS), lambda: (ordered,))
+    # Fitting is once per dataset version; scoring covers every customer.
+    models = []
+    record('explorer', 'propensity train', lambda: models.append(train(df)), tuple, times=1)
+    record('explorer', 'propensity score', models[-1].score, lambda: (df,))
+    return results
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, threshold):
+    """Print stages slower than the baseline by more than ``threshold``; returns how many."""
+    with open(baseline_path) as fh:
+        baseline = {(r['rows'], r['section'], r['stage']): r for r in json.load(fh)['results']}
+    slower = 0
+    print(f"\ncompared with {baseline_path} (best time, flagged above x{threshold}):")
+    for r in results:
+        old = baseline.get((r['rows'], r['section'], r['stage']))
+        if old is None:
+            continue
+        before, after = old['min_ms'], r['min_ms']
+        ratio = after / before if before else float('inf')
+        flag = ratio > threshold and after - before >= MIN_DELTA_MS
+        slower += flag
+        print(f"  {r['rows']:>11,} {r['section']:<12}{r['stage']:<24}{before:10.2f} ->"
+              f"{after:10.2f} ms  x{ratio:5.2f}{'  SLOWER' if flag else ''}")
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="results file of an earlier run")
+    parser.add_argument('--threshold', type=float, default=1.5, help="slow-down ratio flagged by --compare")
+    args = parser.parse_args(argv)
+
+    model = SyntheticBank.fit(load_dataset())
+    results = []
+    for rows in args.rows:
+        results.extend(run_size(model, rows, args.seed, args.repeat))
+
+    if args.output:
+        document = {
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'revision': _git_revision(),
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'results': results,
+        }
+        with open(args.output, 'w') as fh:
+            json.dump(document, fh, indent=1)
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Server-side binned figures for the large-data charts.
+
+``px.histogram`` and ``px.scatter`` embed every filtered row in the Plotly JSON
+sent to the browser. The builders here bin with NumPy on the server and only
+send bar heights or a 2D density grid (plus an optional stratified sample of
+points), so the payload size does not depend on the number of rows.
+
+``plotly.graph_objects`` is imported by the builders themselves, so importing
+this module for its constants does not load Plotly.
+"""
+import numpy as np
+
+LOAN_COLORS = {0: '#1f77b4', 1: '#ff7f0e'}
+
+RENDER_AUTO = 'Auto'
+RENDER_ROWS = 'Rows'
+RENDER_BINNED = 'Binned'
+RENDER_SAMPLED = 'Binned + sample'
+RENDER_MODES = [RENDER_AUTO, RENDER_ROWS, RENDER_BINNED, RENDER_SAMPLED]
+
+# Above this many rows "Auto" switches from per-row traces to binned ones.
+RAW_ROW_LIMIT = 20_000
+
+
+def resolve_mode(mode, n_rows, row_limit=RAW_ROW_LIMIT):
+    if mode == RENDER_AUTO:
+        return RENDER_ROWS if n_rows <= row_limit else RENDER_BINNED
+    return mode
+
+
+def payload_bytes(fig):
+    """Size of the figure JSON that ``st.plotly_chart`` ships to the browser."""
+    return len(fig.to_json().encode('utf-8'))
+
+
+def format_bytes(n):
+    for unit in ('B', 'KB', 'MB'):
+        if n < 1024 or unit == 'MB':
+            return f"{n:,.0f} {unit}" if unit == 'B' else f"{n:,.1f} {unit}"
+        n /= 1024
+
+
+def _group_names(labels, groups):
+    return {g: str(labels.get(g, g)) for g in groups}
+
+
+def binned_histogram(values, color_values, nbins=50, title=None, x_title=None,
+                     color_title='Loan Status', colors=LOAN_COLORS, labels=None):
+    """Stacked histogram of ``values`` split by ``color_values``, binned with NumPy."""
+    import plotly.graph_objects as go
+
+    values = np.asarray(values, dtype=np.float64)
+    color_values = np.asarray(color_values)
+    fig = go.Figure()
+    if len(values):
+        edges = np.histogram_bin_edges(values, bins=nbins)
+        centers = (edges[:-1] + edges[1:]) / 2
+        widths = np.diff(edges)
+        groups = np.unique(color_values)
+        names = _group_names(labels or {}, groups)
+        for group in groups:
+            counts, _ = np.histogram(values[color_values == group], bins=edges)
+            fig.add_trace(go.Bar(
+                x=centers, y=counts, width=widths, name=names[group],
+                marker_color=colors.get(group.item()),
+                hovertemplate='%{x:.2f}: %{y} customers<extra>%{fullData.name}</extra>',
+            ))
+    fig.update_layout(barmode='stack', bargap=0, title=title, legend_title_text=color_title)
+    fig.update_xaxes(title_text=x_title)
+    fig.update_yaxes(title_text='count')
+    return fig
+
+
+def stratified_sample(strata, per_stratum, seed=0):
+    """Row positions with at most ``per_stratum`` rows drawn from each stratum."""
+    strata = np.asarray(strata)
+    rng = np.random.default_rng(seed)
+    picks = []
+    for value in np.unique(strata):
+        rows = np.flatnonzero(strata == value)
+        if len(rows) > per_stratum:
+            rows = np.sort(rng.choice(rows, per_stratum, replace=False))
+        picks.append(rows)
+    if not picks:
+        return np.empty(0, dtype=np.intp)
+    return np.sort(np.concatenate(picks))
+
+
+def density_heatmap(x, y, target, nbins=(60, 40), title=None, x_title=None, y_title=None,
+                    sample_per_group=0, colors=LOAN_COLORS, labels=None, seed=0):
+    """2D customer density of ``x`` vs ``y`` with the ``target`` rate per cell on hover.
+
+    With ``sample_per_group`` > 0 a stratified sample of individual points
+    (per ``target`` value) is drawn on top of the density.
+    """
+    import plotly.graph_objects as go
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    target = np.asarray(target)
+    fig = go.Figure()
+    if len(x):
+        counts, x_edges, y_edges = np.histogram2d(x, y, bins=nbins)
+        hits, _, _ = np.histogram2d(x, y, bins=(x_edges, y_edges), weights=(target == 1).astype(np.float64))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rate = np.where(counts > 0, hits / counts * 100, np.nan)
+        # histogram2d is indexed [x, y]; Heatmap wants z[y][x].
+        fig.add_trace(go.Heatmap(
+            x=(x_edges[:-1] + x_edges[1:]) / 2,
+            y=(y_edges[:-1] + y_edges[1:]) / 2,
+            z=np.where(counts.T > 0, counts.T, np.nan),
+            customdata=rate.T,
+            colorscale='Blues',
+            colorbar=dict(title='Customers'),
+            hovertemplate=('%{x:.0f}, %{y:.2f}<br>%{z} customers<br>'
+                           'Conversion %{customdata:.1f}%<extra></extra>'),
+        ))
+        if sample_per_group:
+            rows = stratified_sample(target, sample_per_group, seed=seed)
+            names = _group_names(labels or {}, np.unique(target))
+            for group in np.unique(target[rows]):
+                picked = rows[target[rows] == group]
+                fig.add_trace(go.Scattergl(
+                    x=x[picked], y=y[picked], mode='markers', name=names[group],
+                    marker=dict(color=colors.get(group.item()), size=4, opacity=0.6),
+                ))
+    fig.update_layout(title=title)
+    fig.update_xaxes(title_text=x_title)
+    fig.update_yaxes(title_text=y_title)
+    return fig
@@ -0,0 +1,409 @@
+"""Pre-aggregated count/sum cube behind the dashboard KPIs.
+
+The cube holds customer counts and Income/CCAvg sums on a fine grid of
+Income bin x CCAvg bin x Education x Personal Loan, built once at load. A
+``FilterSpec`` is answered by summing the cells whose bins lie entirely inside
+the slider ranges; only rows in bins that a slider edge cuts through are
+scanned, so the result is exact and the cost follows the number of cells.
+
+A query is reduced to a ``CubeSlice`` over (Income bin, Education, Loan),
+from which the overview metrics, the income-bracket conversion chart and the
+education stats are read. Income bins are right-closed like ``pd.cut`` so the
+income brackets are unions of whole bins.
+
+``updated`` gives the cube of a frame whose rows changed or grew: the old
+values of those rows are taken out of their cells and the new ones added, on
+the same bins (a value beyond them raises ``RebuildRequired``).
+"""
+import copy
+
+import numpy as np
+import pandas as pd
+
+from filter_index import EDUCATION_LABELS, RebuildRequired, merged_order, typed_bounds
+
+INCOME_BRACKET_BINS = [0, 40, 80, 120, 160, 224]
+INCOME_BRACKET_LABELS = ['<$40k', '$40-80k', '$80-120k', '$120-160k', '>$160k']
+
+MEASURES = ('count', 'Income', 'CCAvg')
+
+
+def conversion_table(count, loans, labels, name):
+    """``mean``/``count`` frame like ``groupby(name, observed=True)['Personal Loan'].agg(['mean', 'count'])``."""
+    count = np.asarray(count)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rate = np.asarray(loans) / count
+    frame = pd.DataFrame({'mean': rate, 'count': count.astype(np.int64)},
+                         index=pd.Index(labels, name=name))
+    return frame[frame['count'] > 0]
+
+
+class BinnedAxis:
+    """Right-closed bins ``(edges[i], edges[i + 1]]`` over one column."""
+
+    def __init__(self, values, width):
+        values = np.asarray(values)
+        self.dtype = values.dtype
+        values = values.astype(np.float64, copy=False)
+        start = (np.floor(values.min() / width) - 1) * width
+        n_bins = int(np.ceil((values.max() - start) / width))
+        self.edges = np.round(start + width * np.arange(n_bins + 1), 10)
+        self.bin = (np.searchsorted(self.edges, values, side='left') - 1).astype(np.int32)
+        self.order = np.argsort(values, kind='stable')
+        self.offsets = np.searchsorted(values[self.order], self.edges, side='right')
+        self.offsets[0] = 0
+        self._bin_ranges(values)
+
+    def _bin_ranges(self, values):
+        counts = np.diff(self.offsets)
+        self.nonempty = counts > 0
+        safe_lo = np.minimum(self.offsets[:-1], len(values) - 1)
+        safe_hi = np.maximum(self.offsets[1:] - 1, 0)
+        self.bin_min = np.where(self.nonempty, values[self.order[safe_lo]].astype(np.float64), np.inf)
+        self.bin_max = np.where(self.nonempty, values[self.order[safe_hi]].astype(np.float64), -np.inf)
+
+    def __len__(self):
+        return len(self.edges) - 1
+
+    def covers(self, values):
+        """True when every value falls in one of the bins."""
+        values = np.asarray(values, dtype=np.float64)
+        return bool(np.all((values > self.edges[0]) & (values <= self.edges[-1])))
+
+    def updated(self, values, rows):
+        """The axis over ``values`` after ``rows`` changed or were appended, with the same bins."""
+        rows = np.unique(rows)
+        new = np.asarray(values)[rows].astype(np.float64)
+        if not self.covers(new):
+            raise RebuildRequired("values outside the binned range")
+        n = len(self.bin)
+        bins = (np.searchsorted(self.edges, new, side='left') - 1).astype(np.int32)
+        counts = np.diff(self.offsets) - np.bincount(self.bin[rows[rows < n]], minlength=len(self)) \
+            + np.bincount(bins, minlength=len(self))
+        axis = copy.copy(self)
+        axis.bin = np.empty(len(values), dtype=np.int32)
+        axis.bin[:n] = self.bin
+        axis.bin[rows] = bins
+        axis.order = merged_order(self.order, values, rows)
+        axis.offsets = np.concatenate([[0], np.cumsum(counts)])
+        axis._bin_ranges(values)
+        return axis
+
+    def classify(self, low, high):
+        """``(first, last)`` full-bin run (``last < first`` if none) and partial bins."""
+        low, high = (float(v) for v in typed_bounds(self.dtype, low, high))
+        full = self.nonempty & (self.bin_min >= low) & (self.bin_max <= high)
+        touched = self.nonempty & (self.bin_max >= low) & (self.bin_min <= high)
+        partial = np.flatnonzero(touched & ~full)
+        full_bins = np.flatnonzero(full)
+        if len(full_bins) == 0:
+            return (0, -1), partial
+        return (full_bins[0], full_bins[-1]), partial
+
+    def rows_in(self, bins):
+        parts = [self.order[self.offsets[b]:self.offsets[b + 1]] for b in bins]
+        if not parts:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(parts)
+
+
+def edge_rows(income, income_partial, ccavg, cc_partial):
+    """Rows in any partial Income or CCAvg bin, each listed once."""
+    rows = income.rows_in(income_partial)
+    cc_rows = ccavg.rows_in(cc_partial)
+    if len(cc_rows):
+        income_is_partial = np.zeros(len(income), dtype=bool)
+        income_is_partial[income_partial] = True
+        cc_rows = cc_rows[~income_is_partial[income.bin[cc_rows]]]
+        rows = np.concatenate([rows, cc_rows])
+    return rows
+
+
+class Partitions:
+    """Rows grouped into coarse (Income bin, CCAvg bin, Education, Loan) partitions.
+
+    Indexes that keep a summary per partition (quantile sketches, moments)
+    answer a ``FilterSpec`` from the partitions lying fully inside it plus the
+    matching rows of the partitions a slider edge cuts through, so no query
+    touches more rows than those edge partitions hold.
+    """
+
+    def __init__(self, df, income_width=20.0, ccavg_width=1.0):
+        self.income = BinnedAxis(df['Income'].to_numpy(), income_width)
+        self.ccavg = BinnedAxis(df['CCAvg'].to_numpy(), ccavg_width)
+        self._filters = {col: df[col].to_numpy() for col in ('Income', 'CCAvg', 'Education', 'Personal Loan')}
+        self.education_levels = np.unique(self._filters['Education'])
+        self.loan_levels = np.unique(self._filters['Personal Loan'])
+        part = self._part_of(slice(None))
+        self.order = np.argsort(part, kind='stable')
+        self.ids, starts = np.unique(part[self.order], return_index=True)
+        self._coords = np.unravel_index(self.ids, self._shape())
+        self.bounds = np.append(starts, len(self.order))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _shape(self):
+        return (len(self.income), len(self.ccavg), len(self.education_levels), len(self.loan_levels))
+
+    def _part_of(self, rows):
+        """Partition id (a flat grid cell) of ``rows``."""
+        return np.ravel_multi_index((self.income.bin[rows], self.ccavg.bin[rows],
+                                     np.searchsorted(self.education_levels, self._filters['Education'][rows]),
+                                     np.searchsorted(self.loan_levels, self._filters['Personal Loan'][rows])),
+                                    self._shape())
+
+    def positions(self, rows):
+        """Partition position of each of ``rows``."""
+        return np.searchsorted(self.ids, self._part_of(rows))
+
+    def updated(self, df, rows):
+        """Partitions of ``df`` after ``rows`` changed or were appended.
+
+        Partitions keep their grid cells; ones a row moves into are added and
+        emptied ones are kept, so ``np.searchsorted(new.ids, old.ids)`` maps
+        the old positions to the new.
+        """
+        rows = np.unique(rows)
+        filters = {col: df[col].to_numpy() for col in self._filters}
+        for col, levels in (('Education', self.education_levels), ('Personal Loan', self.loan_levels)):
+            if not np.isin(filters[col][rows], levels).all():
+                raise RebuildRequired(f"new {col} level")
+        parts = copy.copy(self)
+        parts._filters = filters
+        parts.income = self.income.updated(filters['Income'], rows)
+        parts.ccavg = self.ccavg.updated(filters['CCAvg'], rows)
+        part = parts._part_of(slice(None))
+        parts.ids = np.union1d(self.ids, part[rows])
+        parts._coords = np.unravel_index(parts.ids, parts._shape())
+        parts.order = merged_order(self.order, part, rows)
+        counts = np.zeros(len(parts.ids), dtype=np.int64)
+        counts[np.searchsorted(parts.ids, self.ids)] = np.diff(self.bounds)
+        old = rows[rows < len(self.order)]
+        np.subtract.at(counts, np.searchsorted(parts.ids, self._part_of(old)), 1)
+        np.add.at(counts, np.searchsorted(parts.ids, part[rows]), 1)
+        parts.bounds = np.concatenate([[0], np.cumsum(counts)])
+        return parts
+
+    def rows(self, p):
+        """Row positions of the ``p``-th partition."""
+        return self.order[self.bounds[p]:self.bounds[p + 1]]
+
+    def codes(self):
+        """Partition position of every row."""
+        codes = np.empty(len(self.order), dtype=np.intp)
+        codes[self.order] = np.repeat(np.arange(len(self)), np.diff(self.bounds))
+        return codes
+
+    def select(self, spec, loan=None):
+        """``(partitions, rows)`` for ``spec``, optionally one loan status only.
+
+        ``partitions`` are the positions of the partitions inside ``spec``;
+        ``rows`` are the matching rows of the partitions cut by a slider edge.
+        """
+        allowed_loans = [v for v in spec.loan if loan is None or v == loan]
+        (i0, i1), income_partial = self.income.classify(*spec.income)
+        (c0, c1), cc_partial = self.ccavg.classify(*spec.ccavg)
+        ib, cb, eb, lb = self._coords
+        selected = ((ib >= i0) & (ib <= i1) & (cb >= c0) & (cb <= c1)
+                    & np.isin(self.education_levels, list(spec.education))[eb]
+                    & np.isin(self.loan_levels, allowed_loans)[lb])
+
+        rows = edge_rows(self.income, income_partial, self.ccavg, cc_partial)
+        if len(rows):
+            f = {col: values[rows] for col, values in self._filters.items()}
+            low, high = typed_bounds(f['Income'].dtype, *spec.income)
+            keep = (f['Income'] >= low) & (f['Income'] <= high)
+            low, high = typed_bounds(f['CCAvg'].dtype, *spec.ccavg)
+            keep &= (f['CCAvg'] >= low) & (f['CCAvg'] <= high)
+            keep &= np.isin(f['Education'], list(spec.education))
+            keep &= np.isin(f['Personal Loan'], allowed_loans)
+            rows = rows[keep]
+        return np.flatnonzero(selected), rows
+
+
+class CubeSlice:
+    """Measures for one filter, reduced to (Income bin, Education, Loan)."""
+
+    def __init__(self, cube, grid):
+        self.cube = cube
+        self.grid = grid
+
+    def __len__(self):
+        return int(self.grid['count'].sum())
+
+    def loans(self):
+        """Customers who accepted the loan."""
+        if 1 not in self.cube.loan_levels:
+            return 0
+        return int(self.grid['count'][:, :, self.cube.loan_levels.index(1)].sum())
+
+    def mean(self, column, loan=None):
+        """Mean of ``Income``, ``CCAvg`` or ``Personal Loan`` (the conversion rate).
+
+        ``loan`` restricts the mean to one loan status.
+        """
+        count = self.grid['count']
+        grid = self.grid
+        if loan is not None:
+            if loan not in self.cube.loan_levels:
+                return np.nan
+            li = self.cube.loan_levels.index(loan)
+            count = count[:, :, li:li + 1]
+            grid = {m: values[:, :, li:li + 1] for m, values in grid.items()}
+        n = count.sum()
+        if not n:
+            return np.nan
+        if column == 'Personal Loan':
+            if 1 not in self.cube.loan_levels:
+                return 0.0
+            if loan is not None:
+                return float(loan == 1)
+            return self.loans() / n
+        return float(grid[column].sum() / n)
+
+    def education_counts(self):
+        """Customers per education level, as a Series indexed by level."""
+        counts = self.grid['count'].sum(axis=(0, 2))
+        return pd.Series(counts, index=pd.Index(self.cube.education_levels, name='Education'))
+
+    def conversion_by_income_bracket(self):
+        """Like ``groupby(pd.cut(Income, brackets), observed=True)['Personal Loan'].agg(['mean', 'count'])``."""
+        codes = self.cube.bracket_of_bin
+        valid = codes >= 0
+        per_bin = self.grid['count'].sum(axis=1)
+        n_brackets = len(self.cube.bracket_labels)
+        count = np.bincount(codes[valid], weights=per_bin[valid].sum(axis=1), minlength=n_brackets)
+        if 1 in self.cube.loan_levels:
+            li = self.cube.loan_levels.index(1)
+            loans = np.bincount(codes[valid], weights=per_bin[valid, li], minlength=n_brackets)
+        else:
+            loans = np.zeros(n_brackets)
+        return conversion_table(count, loans, self.cube.bracket_labels, 'Income_Bracket')
+
+    def conversion_by_education(self):
+        """Like ``groupby('Education_Label')['Personal Loan'].agg(['mean', 'count'])``."""
+        per_level = self.grid['count'].sum(axis=0)
+        count = per_level.sum(axis=1)
+        if 1 in self.cube.loan_levels:
+            loans = per_level[:, self.cube.loan_levels.index(1)]
+        else:
+            loans = np.zeros(len(count))
+        labels = [EDUCATION_LABELS.get(level, str(level)) for level in self.cube.education_levels]
+        return conversion_table(count, loans, labels, 'Education_Label').sort_index()
+
+
+class DataCube:
+    def __init__(self, df, income_width=1.0, ccavg_width=0.1,
+                 income_brackets=INCOME_BRACKET_BINS, bracket_labels=INCOME_BRACKET_LABELS):
+        self.n_rows = len(df)
+        self.income = BinnedAxis(df['Income'].to_numpy(), income_width)
+        self.ccavg = BinnedAxis(df['CCAvg'].to_numpy(), ccavg_width)
+        self._values = {col: df[col].to_numpy() for col in ('Income', 'CCAvg', 'Education', 'Personal Loan')}
+
+        education = self._values['Education']
+        loan = self._values['Personal Loan']
+        self.education_levels = [v.item() for v in np.unique(education)]
+        self.loan_levels = [v.item() for v in np.unique(loan)]
+        self._education_code = np.searchsorted(self.education_levels, education).astype(np.int8)
+        self._loan_code = np.searchsorted(self.loan_levels, loan).astype(np.int8)
+
+        self.bracket_labels = list(bracket_labels)
+        self.bracket_of_bin = self._bracket_codes(np.asarray(income_brackets, dtype=np.float64))
+
+        self.cells = self._tally(slice(None))
+
+    def _tally(self, rows):
+        """Count and Income/CCAvg sums of ``rows`` per cell."""
+        shape = (len(self.income), len(self.ccavg), len(self.education_levels), len(self.loan_levels))
+        flat = np.ravel_multi_index(
+            (self.income.bin[rows], self.ccavg.bin[rows], self._education_code[rows], self._loan_code[rows]), shape)
+        size = int(np.prod(shape))
+        return {
+            'count': np.bincount(flat, minlength=size).reshape(shape),
+            'Income': np.bincount(flat, weights=self._values['Income'][rows], minlength=size).reshape(shape),
+            'CCAvg': np.bincount(flat, weights=self._values['CCAvg'][rows], minlength=size).reshape(shape),
+        }
+
+    def updated(self, df, rows):
+        """Cube of ``df``, the cubed frame after ``rows`` changed or were appended."""
+        rows = np.unique(rows)
+        values = {col: df[col].to_numpy() for col in self._values}
+        if not (np.isin(values['Education'][rows], self.education_levels).all()
+                and np.isin(values['Personal Loan'][rows], self.loan_levels).all()):
+            raise RebuildRequired("new Education or Personal Loan level")
+        cube = copy.copy(self)
+        cube.n_rows = len(df)
+        cube.income = self.income.updated(values['Income'], rows)
+        cube.ccavg = self.ccavg.updated(values['CCAvg'], rows)
+        cube._values = values
+        codes = {}
+        for name, col, levels in (('_education_code', 'Education', self.education_levels),
+                                  ('_loan_code', 'Personal Loan', self.loan_levels)):
+            codes[name] = np.empty(len(df), dtype=np.int8)
+            codes[name][:self.n_rows] = getattr(self, name)
+            codes[name][rows] = np.searchsorted(levels, values[col][rows])
+        cube._education_code, cube._loan_code = codes['_education_code'], codes['_loan_code']
+        removed = self._tally(rows[rows < self.n_rows])
+        added = cube._tally(rows)
+        cube.cells = {m: cells - removed[m] + added[m] for m, cells in self.cells.items()}
+        return cube
+
+    def _bracket_codes(self, brackets):
+        lower, upper = self.income.edges[:-1], self.income.edges[1:]
+        codes = np.searchsorted(brackets, upper, side='left') - 1
+        inside = (codes >= 0) & (codes < len(brackets) - 1)
+        if np.any(inside & (brackets[np.clip(codes, 0, len(brackets) - 1)] > lower)):
+            raise ValueError("income bracket edges must fall on income bin edges")
+        return np.where(inside, codes, -1)
+
+    @property
+    def nbytes(self):
+        return sum(cells.nbytes for cells in self.cells.values())
+
+    def _grid_shape(self):
+        return (len(self.income), len(self.education_levels), len(self.loan_levels))
+
+    def total(self):
+        """Slice over every customer."""
+        return CubeSlice(self, {m: cells.sum(axis=1) for m, cells in self.cells.items()})
+
+    def query(self, spec):
+        """Exact ``CubeSlice`` for a ``FilterSpec``."""
+        (i0, i1), income_partial = self.income.classify(*spec.income)
+        (c0, c1), cc_partial = self.ccavg.classify(*spec.ccavg)
+        edu_keep = np.isin(self.education_levels, list(spec.education))
+        loan_keep = np.isin(self.loan_levels, list(spec.loan))
+        category_keep = np.logical_and.outer(edu_keep, loan_keep)
+
+        grid = {m: np.zeros(self._grid_shape()) for m in MEASURES}
+        if i1 >= i0 and c1 >= c0:
+            for m, cells in self.cells.items():
+                block = cells[i0:i1 + 1, c0:c1 + 1].sum(axis=1)
+                grid[m][i0:i1 + 1] = block * category_keep
+
+        # Rows in bins cut by a slider edge are checked one by one.
+        rows = edge_rows(self.income, income_partial, self.ccavg, cc_partial)
+        if len(rows):
+            self._add_rows(grid, rows, spec)
+        return CubeSlice(self, grid)
+
+    def _add_rows(self, grid, rows, spec):
+        income = self._values['Income'][rows]
+        ccavg = self._values['CCAvg'][rows]
+        edu = self._education_code[rows]
+        loan = self._loan_code[rows]
+        low, high = typed_bounds(income.dtype, *spec.income)
+        keep = (income >= low) & (income <= high)
+        low, high = typed_bounds(ccavg.dtype, *spec.ccavg)
+        keep &= (ccavg >= low) & (ccavg <= high)
+        keep &= np.isin(self._values['Education'][rows], list(spec.education))
+        keep &= np.isin(self._values['Personal Loan'][rows], list(spec.loan))
+        if not keep.any():
+            return
+        shape = self._grid_shape()
+        flat = np.ravel_multi_index((self.income.bin[rows][keep], edu[keep], loan[keep]), shape)
+        size = int(np.prod(shape))
+        grid['count'] += np.bincount(flat, minlength=size).reshape(shape)
+        grid['Income'] += np.bincount(flat, weights=income[keep], minlength=size).reshape(shape)
+        grid['CCAvg'] += np.bincount(flat, weights=ccavg[keep], minlength=size).reshape(shape)
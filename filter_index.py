@@ -0,0 +1,358 @@
+"""Sidebar filter state and a pre-built index to resolve it.
+
+``FilterSpec`` is the hashable form of the four sidebar filters. ``FilterIndex``
+is built once per dataset: range columns keep a stable argsort so a
+``[low, high]`` predicate is two ``searchsorted`` calls, and small-cardinality
+columns keep per-value row-id lists plus a lookup table over their codes.
+Resolving a spec starts from the most selective predicate and only checks the
+remaining ones on those candidate rows, so the cost follows the size of the
+selection rather than the size of the table. That is sub-millisecond for
+narrow selections only: a wide one still touches every selected row (see
+``FilterIndex.rows``).
+
+``Selection`` is what a resolved spec hands to the sections: the frame plus a
+row-position array. Columns are gathered only when a section asks for them,
+and values derived from them are kept beside the selection, so no filtered
+copy of the frame is built or mutated on a rerun.
+
+When rows of the frame change or are appended, ``FilterIndex.updated`` builds
+the index of the new frame from the old one: ``merged_order`` sorts only the
+changed rows and merges them into each stable argsort.
+"""
+import copy
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+EDUCATION_LEVELS = (1, 2, 3)
+EDUCATION_LABELS = {1: 'Undergrad', 2: 'Graduate', 3: 'Professional'}
+LOAN_STATUSES = (0, 1)
+LOAN_LABELS = {0: 'No Loan', 1: 'Accepted Loan'}
+
+
+def education_labels(codes):
+    """Categorical of education labels over the ``Education`` codes."""
+    return pd.Categorical(codes, categories=list(EDUCATION_LEVELS)).rename_categories(EDUCATION_LABELS)
+
+
+class RebuildRequired(ValueError):
+    """A change that an index cannot fold in incrementally; build it again instead."""
+
+
+def merged_order(order, values, rows):
+    """Stable argsort of ``values``, from ``order`` as it was before ``rows`` changed.
+
+    ``order`` sorts the first ``len(order)`` rows by their previous values;
+    ``rows`` are the positions whose value changed or that were appended.
+    Only those rows are sorted; the others keep their place, so the order is
+    the one ``np.argsort(values, kind='stable')`` gives without sorting it.
+    """
+    n = len(order)
+    rows = np.unique(rows)
+    if len(rows) and rows[0] < n:
+        gone = np.zeros(n, dtype=bool)
+        gone[rows[rows < n]] = True
+        order = order[~gone[order]]
+    if not len(rows):
+        return order
+    rows = rows[np.argsort(values[rows], kind='stable')]
+    kept = values[order]
+    new = values[rows]
+    # Ties keep row order: appended rows go after every equal kept row, a
+    # changed row between the equal rows before and after it.
+    at = np.searchsorted(kept, new, side='right')
+    lo = np.searchsorted(kept, new, side='left')
+    for i in np.flatnonzero((lo < at) & (rows < n)).tolist():
+        at[i] = lo[i] + np.searchsorted(order[lo[i]:at[i]], rows[i])
+    return np.insert(order, at, rows)
+
+
+def typed_bounds(dtype, low, high):
+    """``(low, high)`` in ``dtype`` when it is floating-point.
+
+    A float32 column stores 1.9 as 1.89999998; comparing it with the bound cast
+    the same way keeps the slider ranges inclusive.
+    """
+    dtype = np.dtype(dtype)
+    if dtype.kind == 'f':
+        return dtype.type(low), dtype.type(high)
+    return low, high
+
+
+@dataclass(frozen=True)
+class FilterSpec:
+    income: tuple = (40, 200)
+    ccavg: tuple = (0.0, 10.0)
+    education: tuple = EDUCATION_LEVELS
+    loan: tuple = LOAN_STATUSES
+
+    @classmethod
+    def from_widgets(cls, income_range, cc_spending_range, education_filter, loan_filter):
+        return cls(
+            income=(float(income_range[0]), float(income_range[1])),
+            ccavg=(round(float(cc_spending_range[0]), 6), round(float(cc_spending_range[1]), 6)),
+            education=tuple(sorted(int(v) for v in education_filter)),
+            loan=tuple(sorted(int(v) for v in loan_filter)),
+        )
+
+    def ranges(self):
+        return {'Income': self.income, 'CCAvg': self.ccavg}
+
+    def categories(self):
+        return {'Education': self.education, 'Personal Loan': self.loan}
+
+    def mask(self, df):
+        """Full-scan boolean mask; the reference the index must agree with."""
+        mask = np.ones(len(df), dtype=bool)
+        for col, (low, high) in self.ranges().items():
+            values = df[col].to_numpy()
+            low, high = typed_bounds(values.dtype, low, high)
+            mask &= (values >= low) & (values <= high)
+        for col, allowed in self.categories().items():
+            mask &= np.isin(df[col].to_numpy(), list(allowed))
+        return mask
+
+
+DEFAULT_FILTERS = FilterSpec()
+
+
+class _RangeIndex:
+    def __init__(self, values, order=None):
+        self.values = values
+        self.order = np.argsort(values, kind='stable') if order is None else order
+        self.sorted = values[self.order]
+
+    def updated(self, values, rows):
+        return _RangeIndex(values, merged_order(self.order, values, rows))
+
+    def bounds(self, low, high):
+        dtype = self.sorted.dtype
+        if dtype.kind in 'iu':
+            return self._integer_bound(low, 'left'), self._integer_bound(high, 'right')
+        low, high = typed_bounds(dtype, low, high)
+        lo = np.searchsorted(self.sorted, low, side='left')
+        hi = np.searchsorted(self.sorted, high, side='right')
+        return lo, hi
+
+    def _integer_bound(self, bound, side):
+        # Searching an integer array for a float converts the whole array to
+        # float64 first; the equivalent integer key (ceil of a low bound,
+        # floor of a high one) is searched in the array's own dtype instead.
+        info = np.iinfo(self.sorted.dtype)
+        bound = float(bound)
+        if np.isnan(bound):
+            # Nothing compares true with NaN: an empty range.
+            return len(self.sorted) if side == 'left' else 0
+        key = np.ceil(bound) if side == 'left' else np.floor(bound)
+        if key < info.min:
+            return 0
+        if key > info.max:
+            return len(self.sorted)
+        return np.searchsorted(self.sorted, self.sorted.dtype.type(key), side=side)
+
+    def count(self, low, high):
+        lo, hi = self.bounds(low, high)
+        return max(hi - lo, 0)
+
+    def rows(self, low, high):
+        lo, hi = self.bounds(low, high)
+        return self.order[lo:hi]
+
+    def keep(self, rows, low, high):
+        values = self.values[rows]
+        low, high = typed_bounds(values.dtype, low, high)
+        return (values >= low) & (values <= high)
+
+
+class _CategoryIndex:
+    def __init__(self, values, row_ids=None):
+        self.values = values
+        if row_ids is None:
+            row_ids = {v.item(): np.flatnonzero(values == v) for v in np.unique(values)}
+        self.row_ids = row_ids
+        self.levels = np.array(sorted(row_ids), dtype=values.dtype)
+        # Small non-negative integer codes are checked through a lookup table.
+        self._lut_size = None
+        if np.issubdtype(values.dtype, np.integer) and len(self.levels) \
+                and 0 <= self.levels[0] and self.levels[-1] < 1024:
+            self._lut_size = int(self.levels[-1]) + 1
+
+    def updated(self, values, rows):
+        rows = np.unique(rows)
+        old = rows[rows < len(self.values)]
+        row_ids = {}
+        for level, ids in self.row_ids.items():
+            gone = old[self.values[old] == level]
+            row_ids[level] = np.delete(ids, np.searchsorted(ids, gone)) if len(gone) else ids
+        new = values[rows]
+        for level in np.unique(new).tolist():
+            added = rows[new == level]
+            ids = row_ids.get(level, np.empty(0, dtype=np.intp))
+            row_ids[level] = np.insert(ids, np.searchsorted(ids, added), added)
+        return _CategoryIndex(values, {level: ids for level, ids in row_ids.items() if len(ids)})
+
+    def present(self, allowed):
+        return [v for v in allowed if v in self.row_ids]
+
+    def count(self, allowed):
+        return sum(len(self.row_ids[v]) for v in self.present(allowed))
+
+    def covers(self, allowed):
+        return len(self.present(allowed)) == len(self.levels)
+
+    def rows(self, allowed):
+        parts = [self.row_ids[v] for v in self.present(allowed)]
+        if not parts:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(parts)
+
+    def keep(self, rows, allowed):
+        values = self.values[rows]
+        if self._lut_size is not None:
+            lut = np.zeros(self._lut_size, dtype=bool)
+            lut[self.present(allowed)] = True
+            return lut[values]
+        return np.isin(values, list(allowed))
+
+
+class FilterIndex:
+    """Row selection for a ``FilterSpec`` without scanning the whole table."""
+
+    def __init__(self, df, range_columns=('Income', 'CCAvg'),
+                 category_columns=('Education', 'Personal Loan')):
+        self.n_rows = len(df)
+        self._ranges = {col: _RangeIndex(df[col].to_numpy()) for col in range_columns}
+        self._categories = {col: _CategoryIndex(df[col].to_numpy()) for col in category_columns}
+
+    def updated(self, df, rows):
+        """Index of ``df``, the indexed frame after ``rows`` changed or were appended."""
+        index = copy.copy(self)
+        index.n_rows = len(df)
+        index._ranges = {col: r.updated(df[col].to_numpy(), rows) for col, r in self._ranges.items()}
+        index._categories = {col: c.updated(df[col].to_numpy(), rows) for col, c in self._categories.items()}
+        return index
+
+    def _predicates(self, spec):
+        """Restricting predicates as ``(estimated rows, index, args)``."""
+        predicates = []
+        for col, (low, high) in spec.ranges().items():
+            index = self._ranges[col]
+            count = index.count(low, high)
+            if count < self.n_rows:
+                predicates.append((count, index, (low, high)))
+        for col, allowed in spec.categories().items():
+            index = self._categories[col]
+            if not index.covers(allowed):
+                predicates.append((index.count(allowed), index, (allowed,)))
+        predicates.sort(key=lambda p: p[0])
+        return predicates
+
+    def rows(self, spec):
+        """Sorted row positions matching ``spec``.
+
+        The cost grows with the candidate rows, not the table. At 1M rows
+        (``benchmarks/bench_filter.py``) a narrow band takes about 0.1 ms, but
+        the VIP corner (90k candidates) takes about 2 ms and the sidebar
+        defaults (730k rows) about 3 ms. Wide selections are ordered by
+        scattering them into a mask, which is O(n). A lazily kept mask would
+        not help: gathering columns through it is about twice as slow as by
+        position.
+        """
+        predicates = self._predicates(spec)
+        if not predicates:
+            return np.arange(self.n_rows)
+        _, driver, args = predicates[0]
+        rows = driver.rows(*args)
+        for _, index, args in predicates[1:]:
+            if len(rows) == 0:
+                break
+            rows = rows[index.keep(rows, *args)]
+        if len(rows) * 8 < self.n_rows:
+            return np.sort(rows)
+        return np.flatnonzero(self._scatter(rows))
+
+    def count(self, spec):
+        predicates = self._predicates(spec)
+        if not predicates:
+            return self.n_rows
+        if len(predicates) == 1:
+            return int(predicates[0][0])
+        return len(self.rows(spec))
+
+    def sort_orders(self):
+        """The stable argsorts the range columns were indexed with, by column."""
+        return {col: index.order for col, index in self._ranges.items()}
+
+    def mask(self, spec):
+        predicates = self._predicates(spec)
+        if not predicates:
+            return np.ones(self.n_rows, dtype=bool)
+        return self._scatter(self.rows(spec))
+
+    def select(self, df, spec):
+        """``df`` restricted to ``spec``; ``df`` must be the indexed frame."""
+        if not self._predicates(spec):
+            return df.copy(deep=False)
+        return df.take(self.rows(spec))
+
+    def selection(self, df, spec):
+        """Copy-free ``Selection`` of ``df`` for ``spec``."""
+        if not self._predicates(spec):
+            return Selection(df)
+        return Selection(df, self.rows(spec))
+
+    def _scatter(self, rows):
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[rows] = True
+        return mask
+
+
+class Selection:
+    """Rows of ``df`` picked by position, without copying the frame.
+
+    ``selection[column]`` gathers that column's values for the selected rows
+    once and keeps the array; ``derive`` does the same for values computed
+    from the selection (labels, tiers, ...). ``frame`` builds a DataFrame only
+    for the columns an API needs one for.
+    """
+
+    def __init__(self, df, rows=None):
+        self.df = df
+        self.rows = rows
+        self._columns = {}
+        self._derived = {}
+
+    def __len__(self):
+        return len(self.df) if self.rows is None else len(self.rows)
+
+    def __getitem__(self, column):
+        if column not in self._columns:
+            values = self.df[column].to_numpy()
+            self._columns[column] = values if self.rows is None else values[self.rows]
+        return self._columns[column]
+
+    def keys(self):
+        return list(self.df.columns)
+
+    def positions(self):
+        return np.arange(len(self.df)) if self.rows is None else self.rows
+
+    def derive(self, name, fn):
+        """``fn(self)``, computed on first use and kept beside the selection."""
+        if name not in self._derived:
+            self._derived[name] = fn(self)
+        return self._derived[name]
+
+    def subset(self, mask):
+        """The selected rows where ``mask`` (aligned with this selection) is true."""
+        return Selection(self.df, self.positions()[mask])
+
+    def frame(self, columns=None, head=None):
+        """DataFrame of ``columns`` (default: all) for the selected rows, or the first ``head``."""
+        columns = self.keys() if columns is None else list(columns)
+        if head is not None:
+            rows = self.positions()[:head]
+            return self.df.iloc[rows, [self.df.columns.get_loc(c) for c in columns]]
+        index = self.df.index if self.rows is None else self.df.index[self.rows]
+        return pd.DataFrame({c: self[c] for c in columns}, index=index, copy=False)
@@ -0,0 +1,95 @@
+"""Confidence intervals for the conversion rates the sections show.
+
+A segment's conversion rate is loans / customers, so its interval needs only
+those two counts. The counts are already aggregated per segment (by the data
+cube, ``RuleSet.summary``, ...), so the intervals cost the same for 5,000 or
+10 million customers:
+
+- ``wilson``: the Wilson score interval, in closed form.
+- ``poisson``: the Poisson bootstrap. Weighting every customer with an
+  independent Poisson(1) count makes a segment's resampled loans and
+  non-loans independent Poisson variates with the observed counts as means,
+  so ``resamples`` draws of those two per segment are that bootstrap of the
+  rows, in one ``(resamples, segments)`` array.
+- ``multinomial``: the classic bootstrap, ``total`` customers drawn with
+  replacement from the filtered set. A segment's (loans, non-loans, others)
+  in a resample is multinomial with the observed shares, drawn for every
+  segment and resample at once. Segments may overlap (VIP tiers and high
+  spenders); each interval is marginal.
+
+Bootstrap intervals are percentile intervals over the resamples in which the
+segment has customers. They are seeded, so one filter state always gets the
+same interval and cached results agree with recomputed ones.
+"""
+import statistics
+import warnings
+
+import numpy as np
+
+METHODS = ('wilson', 'poisson', 'multinomial')
+CONFIDENCE = 0.95
+RESAMPLES = 2000
+SEED = 0
+
+
+def z_score(confidence=CONFIDENCE):
+    """Two-sided standard normal quantile, e.g. 1.96 for 0.95."""
+    return statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def wilson(loans, count, confidence=CONFIDENCE):
+    """``(low, high)`` Wilson score bounds of ``loans / count`` (NaN where ``count`` is 0)."""
+    loans = np.asarray(loans, dtype=np.float64)
+    count = np.asarray(count, dtype=np.float64)
+    z = z_score(confidence)
+    z2 = z * z
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rate = loans / count
+        scale = 1 + z2 / count
+        centre = (rate + z2 / (2 * count)) / scale
+        half = z * np.sqrt(rate * (1 - rate) / count + z2 / (4 * count * count)) / scale
+    return np.clip(centre - half, 0, 1), np.clip(centre + half, 0, 1)
+
+
+def bootstrap(loans, count, method='poisson', total=None, resamples=RESAMPLES, confidence=CONFIDENCE, seed=SEED):
+    """``(low, high)`` percentile bootstrap bounds of ``loans / count`` per segment.
+
+    ``total`` is the number of customers the segments were drawn from, for
+    the multinomial bootstrap (default: ``count.sum()``, segments that
+    partition the filtered set).
+    """
+    loans = np.asarray(loans, dtype=np.float64)
+    count = np.asarray(count, dtype=np.float64)
+    rng = np.random.default_rng(seed)
+    if method == 'poisson':
+        hits = rng.poisson(loans, size=(resamples, len(count)))
+        n = hits + rng.poisson(count - loans, size=(resamples, len(count)))
+    elif method == 'multinomial':
+        total = int(count.sum() if total is None else total)
+        if not total:
+            return np.full(len(count), np.nan), np.full(len(count), np.nan)
+        shares = np.stack([loans, count - loans], axis=1) / total
+        shares = np.column_stack([shares, np.clip(1 - shares.sum(axis=1), 0, 1)])
+        draws = rng.multinomial(total, shares, size=(resamples, len(count)))
+        hits = draws[..., 0]
+        n = hits + draws[..., 1]
+    else:
+        raise ValueError(f"unknown bootstrap method {method!r}; expected 'poisson' or 'multinomial'")
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rates = np.where(n > 0, hits / n, np.nan)
+    tail = (1 - confidence) / 2
+    with warnings.catch_warnings():
+        # A segment with no customers has no resampled rates.
+        warnings.simplefilter('ignore', RuntimeWarning)
+        low, high = np.nanquantile(rates, [tail, 1 - tail], axis=0)
+    return low, high
+
+
+def rate_intervals(loans, count, method='wilson', total=None, resamples=RESAMPLES, confidence=CONFIDENCE,
+                   seed=SEED):
+    """``(low, high)`` bounds of each segment's conversion rate by one of ``METHODS``."""
+    if method == 'wilson':
+        return wilson(loans, count, confidence)
+    if method not in METHODS:
+        raise ValueError(f"unknown interval method {method!r}; expected one of {METHODS}")
+    return bootstrap(loans, count, method, total, resamples, confidence, seed)
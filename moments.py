@@ -0,0 +1,199 @@
+"""Sufficient statistics for means, variances and correlations under any filter.
+
+``Moments`` holds the count, the column sums, the cross-product matrix
+``X^T X`` and the column min/max of a set of rows. Those add up across disjoint row sets, so
+``MomentIndex`` keeps one ``Moments`` per coarse Income x CCAvg x Education x
+Loan partition (``data_cube.Partitions``) and answers a ``FilterSpec`` by
+adding the partitions inside it plus the rows of the partitions a slider edge
+cuts through. Means, the covariance and the Pearson correlation matrix follow
+from the totals without touching the selected rows.
+
+Values are shifted by each column's overall mean before they are accumulated;
+covariances do not depend on the shift and it keeps the sums of squares from
+swamping the variance of columns far from zero. Min/max make a constant
+column exactly constant (zero variance, no correlation) instead of leaving it
+at rounding noise.
+
+``MomentIndex.updated`` folds changed or appended rows in by taking their old
+values out of their partition's sums and adding the new ones; only the
+partitions that lost a row are scanned again, for their min/max.
+"""
+import copy
+
+import numpy as np
+import pandas as pd
+
+from data_cube import Partitions
+
+MOMENT_COLUMNS = ('Age', 'Experience', 'Income', 'Family', 'CCAvg', 'Mortgage', 'Personal Loan', 'CD Account')
+
+
+class Moments:
+    def __init__(self, columns, shift=None):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.shift = np.zeros(k) if shift is None else np.asarray(shift, dtype=np.float64)
+        self.n = 0
+        self.sums = np.zeros(k)
+        self.cross = np.zeros((k, k))
+        self.lo = np.full(k, np.inf)
+        self.hi = np.full(k, -np.inf)
+
+    @classmethod
+    def of(cls, values, columns, shift=None):
+        """Moments of the rows of the 2D array ``values``."""
+        return cls(columns, shift).update(values)
+
+    def update(self, values):
+        x = np.asarray(values, dtype=np.float64) - self.shift
+        self.n += len(x)
+        self.sums += x.sum(axis=0)
+        self.cross += x.T @ x
+        if len(x):
+            self.lo = np.minimum(self.lo, x.min(axis=0))
+            self.hi = np.maximum(self.hi, x.max(axis=0))
+        return self
+
+    def merge(self, other):
+        self.n += other.n
+        self.sums += other.sums
+        self.cross += other.cross
+        self.lo = np.minimum(self.lo, other.lo)
+        self.hi = np.maximum(self.hi, other.hi)
+        return self
+
+    def subset(self, columns):
+        """The same statistics restricted to ``columns``."""
+        idx = [self.columns.index(col) for col in columns]
+        result = Moments(columns, self.shift[idx])
+        result.n = self.n
+        result.sums = self.sums[idx]
+        result.cross = self.cross[np.ix_(idx, idx)]
+        result.lo = self.lo[idx]
+        result.hi = self.hi[idx]
+        return result
+
+    def mean(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return pd.Series(self.sums / self.n + self.shift, index=self.columns)
+
+    def cov(self, ddof=1):
+        if self.n <= ddof:
+            return pd.DataFrame(np.nan, index=self.columns, columns=self.columns)
+        centered = self.cross - np.outer(self.sums, self.sums) / self.n
+        constant = self.lo == self.hi
+        centered[constant, :] = 0.0
+        centered[:, constant] = 0.0
+        return pd.DataFrame(centered / (self.n - ddof), index=self.columns, columns=self.columns)
+
+    def var(self, ddof=1):
+        return pd.Series(np.diag(self.cov(ddof).to_numpy()), index=self.columns).clip(lower=0)
+
+    def std(self, ddof=1):
+        return np.sqrt(self.var(ddof))
+
+    def corr(self):
+        """Pearson correlation matrix, like ``DataFrame.corr()``."""
+        cov = self.cov().to_numpy()
+        scale = np.sqrt(np.clip(np.diag(cov), 0, None))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = cov / np.outer(scale, scale)
+        # Constant columns have no correlation, as in pandas.
+        corr[scale == 0, :] = np.nan
+        corr[:, scale == 0] = np.nan
+        corr = np.clip(corr, -1.0, 1.0)
+        np.fill_diagonal(corr, np.where(scale > 0, 1.0, np.nan))
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+class MomentIndex:
+    """One ``Moments`` per coarse (Income, CCAvg, Education, Loan) partition."""
+
+    def __init__(self, df, columns=MOMENT_COLUMNS, income_width=20.0, ccavg_width=1.0):
+        self.columns = list(columns)
+        self.partitions = Partitions(df, income_width, ccavg_width)
+        # The frame's own (compact, possibly memory-mapped) columns; only the
+        # rows that are read are converted to float64.
+        self._values = {col: df[col].to_numpy() for col in self.columns}
+        x = self._rows(slice(None))
+        self.shift = x.mean(axis=0) if len(df) else np.zeros(len(self.columns))
+
+        x -= self.shift
+        codes = self.partitions.codes()
+        p, k = len(self.partitions), len(self.columns)
+        self.n = np.bincount(codes, minlength=p)
+        self.sums = np.column_stack([np.bincount(codes, weights=x[:, i], minlength=p) for i in range(k)])
+        self.cross = np.empty((p, k, k))
+        for i in range(k):
+            for j in range(i, k):
+                self.cross[:, i, j] = self.cross[:, j, i] = np.bincount(codes, weights=x[:, i] * x[:, j], minlength=p)
+        starts = self.partitions.bounds[:-1]
+        ordered = x[self.partitions.order]
+        self.lo = np.minimum.reduceat(ordered, starts, axis=0) if p else np.empty((0, k))
+        self.hi = np.maximum.reduceat(ordered, starts, axis=0) if p else np.empty((0, k))
+
+    def _rows(self, rows):
+        """``(len(rows), len(columns))`` float64 values of ``rows``."""
+        return np.column_stack([np.asarray(self._values[col][rows], dtype=np.float64) for col in self.columns])
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.n, self.sums, self.cross, self.lo, self.hi))
+
+    def updated(self, df, rows):
+        """Index of ``df``, the indexed frame after ``rows`` changed or were appended.
+
+        The shift stays the one the index was built with.
+        """
+        rows = np.unique(rows)
+        old = rows[rows < len(self.partitions.order)]
+        index = copy.copy(self)
+        index.partitions = self.partitions.updated(df, rows)
+        index._values = {col: df[col].to_numpy() for col in self.columns}
+
+        p, k = len(index.partitions), len(self.columns)
+        place = np.searchsorted(index.partitions.ids, self.partitions.ids)
+        index.n = np.zeros(p, dtype=self.n.dtype)
+        index.sums = np.zeros((p, k))
+        index.cross = np.zeros((p, k, k))
+        index.lo = np.full((p, k), np.inf)
+        index.hi = np.full((p, k), -np.inf)
+        for name in ('n', 'sums', 'cross', 'lo', 'hi'):
+            getattr(index, name)[place] = getattr(self, name)
+
+        # The old values come from the frame this index was built on.
+        x = self._rows(old) - self.shift
+        at = place[self.partitions.positions(old)]
+        np.subtract.at(index.n, at, 1)
+        np.subtract.at(index.sums, at, x)
+        np.subtract.at(index.cross, at, x[:, :, None] * x[:, None, :])
+        x = index._rows(rows) - self.shift
+        added = index.partitions.positions(rows)
+        np.add.at(index.n, added, 1)
+        np.add.at(index.sums, added, x)
+        np.add.at(index.cross, added, x[:, :, None] * x[:, None, :])
+        np.minimum.at(index.lo, added, x)
+        np.maximum.at(index.hi, added, x)
+        # A removed value may have been the min or max.
+        for part in np.unique(at).tolist():
+            x = index._rows(index.partitions.rows(part)) - self.shift
+            index.lo[part] = x.min(axis=0) if len(x) else np.inf
+            index.hi[part] = x.max(axis=0) if len(x) else -np.inf
+        return index
+
+    def query(self, spec, loan=None, columns=None):
+        """``Moments`` of the rows matching ``spec`` (optionally one loan status only)."""
+        selected, rows = self.partitions.select(spec, loan=loan)
+        result = Moments(self.columns, self.shift)
+        result.n = int(self.n[selected].sum())
+        result.sums = self.sums[selected].sum(axis=0)
+        result.cross = self.cross[selected].sum(axis=0)
+        if len(selected):
+            result.lo = self.lo[selected].min(axis=0)
+            result.hi = self.hi[selected].max(axis=0)
+        if len(rows):
+            result.update(self._rows(rows))
+        if columns is not None:
+            result = result.subset(columns)
+        return result
+
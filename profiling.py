@@ -0,0 +1,226 @@
+"""Per-rerun profile of the dashboard's stages.
+
+``RerunLog`` (rerun_stats.py) says which section or fragment a rerun spent its
+time in, not which step inside it. ``Profiler`` records nested spans: the
+script or fragment run, data loading, the sidebar filter, each section's
+results (``result:<name>``, with a ``compute`` child when the result cache
+missed) and charts (``chart:<name>``: figure construction, JSON serialization
+and ``st.plotly_chart``). Each span has its wall time, the rows it worked on
+and, while allocation tracing is on, the peak bytes allocated above what was
+in use when it started.
+
+A span opened with nothing else open starts a trace; closing it finishes the
+trace, which is kept in a short per-session window and written as one JSON
+line to a size-rotated log for offline analysis. Allocation tracing uses
+``tracemalloc``, which slows Python allocations down, so it is off unless
+switched on with ``trace_allocations``. It is process-wide: with several
+sessions rerunning at once their allocations are counted together, and it
+stays on until every caller that switched it on has switched it off again.
+"""
+import collections
+import contextlib
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+PROFILE_LOG = os.path.join('.profile_logs', 'profile.jsonl')
+LOG_MAX_BYTES = 10 * 2**20
+LOG_BACKUPS = 5
+KEEP_TRACES = 50
+
+Span = collections.namedtuple('Span', 'name depth start seconds rows alloc_bytes')
+Trace = collections.namedtuple('Trace', 'unit at seconds spans')
+
+_logger_lock = threading.Lock()
+_tracing_lock = threading.Lock()
+_tracers = 0
+
+
+def jsonl_logger(path=PROFILE_LOG, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS):
+    """Logger that appends one message per line to ``path``, rotated at ``max_bytes``."""
+    logger = logging.getLogger(f'{__name__}:{os.path.abspath(path)}')
+    with _logger_lock:
+        if not logger.handlers:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                           encoding='utf-8', delay=True)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+    return logger
+
+
+def trace_allocations(enabled):
+    """Ask for ``tracemalloc`` (``enabled``) or release one earlier request; returns whether it is on.
+
+    Requests are counted: tracing starts with the first and stops when the
+    last one is released, so one caller switching off does not end another's
+    trace. Call it once per change, not to restate the current setting.
+    """
+    global _tracers
+    with _tracing_lock:
+        if enabled:
+            _tracers += 1
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+        elif _tracers:
+            _tracers -= 1
+            if not _tracers and tracemalloc.is_tracing():
+                tracemalloc.stop()
+        return tracemalloc.is_tracing()
+
+
+class _OpenSpan:
+    __slots__ = ('name', 'depth', 'start', 'rows', 'base', 'peak')
+
+    def __init__(self, name, depth, rows):
+        self.name = name
+        self.depth = depth
+        self.rows = rows
+        self.base = self.peak = None
+        self.start = time.perf_counter()
+
+
+class Profiler:
+    def __init__(self, log=None, session=None, keep=KEEP_TRACES):
+        self.log = log
+        self.session = session
+        self.traces = collections.deque(maxlen=keep)
+        self._open = []
+        self._spans = []
+
+    def start(self, name, rows=None):
+        """Open span ``name`` inside the innermost open span (or as a new trace)."""
+        if not self._open:
+            self._spans = []
+        span = _OpenSpan(name, len(self._open), rows)
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            if self._open and self._open[-1].peak is not None:
+                self._open[-1].peak = max(self._open[-1].peak, peak)
+            tracemalloc.reset_peak()
+            span.base = span.peak = current
+        self._open.append(span)
+        return span
+
+    def stop(self, rows=None):
+        """Close the innermost span; closing the outermost one finishes the trace."""
+        span = self._open.pop()
+        seconds = time.perf_counter() - span.start
+        alloc = None
+        if span.peak is not None and tracemalloc.is_tracing():
+            span.peak = max(span.peak, tracemalloc.get_traced_memory()[1])
+            alloc = span.peak - span.base
+            if self._open and self._open[-1].peak is not None:
+                self._open[-1].peak = max(self._open[-1].peak, span.peak)
+        origin = self._open[0].start if self._open else span.start
+        self._spans.append(Span(span.name, span.depth, span.start - origin, seconds,
+                                span.rows if rows is None else rows, alloc))
+        if not self._open:
+            self._finish(span.name, seconds)
+
+    @contextlib.contextmanager
+    def span(self, name, rows=None):
+        """Profile the ``with`` block; set ``.rows`` on the yielded span once known."""
+        span = self.start(name, rows)
+        try:
+            yield span
+        finally:
+            self.stop()
+
+    def reset(self):
+        """Drop spans left open by an interrupted run."""
+        self._open.clear()
+        self._spans = []
+
+    @property
+    def last(self):
+        return self.traces[-1] if self.traces else None
+
+    def _finish(self, unit, seconds):
+        trace = Trace(unit, time.time(), seconds, sorted(self._spans, key=lambda s: (s.start, s.depth)))
+        self._spans = []
+        self.traces.append(trace)
+        if self.log is not None:
+            self.log.info(json.dumps(trace_record(trace, self.session)))
+
+
+def trace_record(trace, session=None):
+    """JSON-ready form of a trace, as written to the profile log."""
+    root = trace.spans[0]
+    return {
+        'at': datetime.datetime.fromtimestamp(trace.at, datetime.timezone.utc).isoformat(timespec='milliseconds'),
+        'session': session,
+        'unit': trace.unit,
+        'ms': round(trace.seconds * 1000, 3),
+        'rows': root.rows,
+        'alloc_bytes': root.alloc_bytes,
+        'spans': [{
+            'name': span.name,
+            'depth': span.depth,
+            'start_ms': round(span.start * 1000, 3),
+            'ms': round(span.seconds * 1000, 3),
+            'rows': span.rows,
+            'alloc_bytes': span.alloc_bytes,
+        } for span in trace.spans],
+    }
+
+
+def trace_frame(trace):
+    """One row per span in call order, with its own time (minus its children's)."""
+    child_seconds = [0.0] * len(trace.spans)
+    parents = []
+    for i, span in enumerate(trace.spans):
+        del parents[span.depth:]
+        if parents:
+            child_seconds[parents[-1]] += span.seconds
+        parents.append(i)
+    return pd.DataFrame({
+        'stage': ['  ' * span.depth + span.name for span in trace.spans],
+        'start_ms': [span.start * 1000 for span in trace.spans],
+        'ms': [span.seconds * 1000 for span in trace.spans],
+        'self_ms': [(span.seconds - child) * 1000 for span, child in zip(trace.spans, child_seconds)],
+        'rows': pd.array([span.rows for span in trace.spans], dtype='Int64'),
+        'alloc_bytes': pd.array([span.alloc_bytes for span in trace.spans], dtype='Int64'),
+    }).round({'start_ms': 2, 'ms': 2, 'self_ms': 2})
+
+
+def flame_figure(trace):
+    """Flame chart of a trace: one bar per span, placed at its start, one row per depth."""
+    import plotly.graph_objects as go
+
+    frame = trace_frame(trace)
+    depths = [span.depth for span in trace.spans]
+    hover = [f"{span.name}<br>{span.seconds * 1000:.2f} ms ({own:.2f} ms self)"
+             + (f"<br>{span.rows:,} rows" if span.rows is not None else "")
+             + (f"<br>{span.alloc_bytes / 2**20:.2f} MB allocated" if span.alloc_bytes is not None else "")
+             for span, own in zip(trace.spans, frame['self_ms'])]
+    fig = go.Figure(go.Bar(
+        base=frame['start_ms'],
+        x=frame['ms'],
+        y=depths,
+        orientation='h',
+        text=[span.name for span in trace.spans],
+        textposition='inside',
+        insidetextanchor='start',
+        hovertext=hover,
+        hoverinfo='text',
+        marker=dict(color=frame['self_ms'], colorscale='OrRd', line=dict(width=1, color='white')),
+    ))
+    fig.update_layout(
+        title=f"{trace.unit}: {trace.seconds * 1000:.1f} ms",
+        xaxis_title="ms",
+        yaxis=dict(autorange='reversed', dtick=1, title="depth"),
+        bargap=0.05,
+        height=120 + 30 * (max(depths) + 1),
+        margin=dict(l=10, r=10, t=40, b=10),
+    )
+    return fig
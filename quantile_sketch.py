@@ -0,0 +1,237 @@
+"""Mergeable quantile sketches for medians, quartiles and the IQR threshold.
+
+``QuantileSketch`` is a KLL-style sketch: values land in a level-0 buffer and
+full levels are compacted by sorting and promoting every other item (at twice
+the weight) to the next level, so memory stays around ``3 * k`` items while the
+normalized rank error stays near ``KLL_RANK_ERROR / k``. Count, mean, the sum
+of squared deviations from it (combined with Chan et al.'s pairwise update,
+which a large offset cannot cancel away), min and max are tracked exactly
+alongside. Sketches merge by
+concatenating levels, which is what lets ``SketchIndex`` keep one sketch per
+coarse Income x CCAvg x Education x Loan partition and assemble any filter
+slice from them. A sketch that never compacted (``exact=True``, or simply
+small) answers with ``np.quantile`` and matches pandas exactly.
+
+Sketches cannot forget a value, so ``SketchIndex.updated`` sketches the
+partitions that changed rows left or entered again from their rows and keeps
+every other partition's sketch as it is.
+"""
+import copy
+
+import numpy as np
+import pandas as pd
+
+from data_cube import Partitions
+
+KLL_RANK_ERROR = 1.7
+DEFAULT_K = 200
+SKETCH_COLUMNS = ('Age', 'Experience', 'Income', 'Family', 'CCAvg', 'Mortgage')
+DESCRIBE_INDEX = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+
+
+class QuantileSketch:
+    def __init__(self, k=DEFAULT_K, exact=False, seed=0):
+        self.k = k
+        self.exact = exact
+        self._rng = np.random.default_rng(seed)
+        self.levels = [np.empty(0)]
+        self.n = 0
+        self._mean = 0.0
+        self._m2 = 0.0                                  # sum of squared deviations from the mean
+        self._lo = np.inf
+        self._hi = -np.inf
+
+    @classmethod
+    def for_error(cls, error, **kwargs):
+        """Sketch sized for a target normalized rank error (e.g. ``0.01``)."""
+        return cls(k=int(np.ceil(KLL_RANK_ERROR / error)), **kwargs)
+
+    @classmethod
+    def merged(cls, sketches, k=DEFAULT_K, extra=None):
+        """Union of ``sketches`` (plus raw ``extra`` values), without compacting.
+
+        Used for one-off query results: the item count is bounded by what the
+        parts retain, and skipping compaction keeps small slices exact.
+        """
+        result = cls(k=k)
+        depth = max([len(s.levels) for s in sketches] + [1])
+        parts = [[] for _ in range(depth)]
+        for sketch in sketches:
+            for h, items in enumerate(sketch.levels):
+                parts[h].append(items)
+            result._add_stats(sketch.n, sketch._mean, sketch._m2, sketch._lo, sketch._hi)
+        if extra is not None and len(extra):
+            extra = np.asarray(extra, dtype=np.float64)
+            parts[0].append(extra)
+            result._add_values(extra)
+        result.levels = [np.concatenate(p) if p else np.empty(0) for p in parts]
+        return result
+
+    def _add_stats(self, n, mean, m2, lo, hi):
+        """Fold in the count, mean and M2 of ``n`` more values (Chan et al.)."""
+        if not n:
+            return
+        total = self.n + n
+        delta = mean - self._mean
+        self._mean += delta * n / total
+        self._m2 += m2 + delta * delta * self.n * n / total
+        self.n = total
+        self._lo = min(self._lo, lo)
+        self._hi = max(self._hi, hi)
+
+    def _add_values(self, values):
+        mean = values.mean()
+        centered = values - mean
+        self._add_stats(len(values), mean, np.dot(centered, centered), values.min(), values.max())
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return self
+        self._add_values(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        for h, items in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self._add_stats(other.n, other._mean, other._m2, other._lo, other._hi)
+        self._compress()
+        return self
+
+    def _capacity(self, h):
+        depth = len(self.levels)
+        return max(2, int(np.ceil(self.k * (2 / 3) ** (depth - 1 - h))))
+
+    def _compress(self):
+        if self.exact:
+            return
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if len(items) > self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                keep = items[:0]
+                if len(items) % 2:
+                    keep, items = items[-1:], items[:-1]
+                start = self._rng.integers(2)
+                self.levels[h] = keep
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], items[start::2]])
+            h += 1
+
+    @property
+    def compacted(self):
+        return any(len(items) for items in self.levels[1:])
+
+    @property
+    def rank_error(self):
+        """Approximate normalized rank error of ``quantile`` (0 when exact)."""
+        return KLL_RANK_ERROR / self.k if self.compacted else 0.0
+
+    @property
+    def retained(self):
+        return sum(len(items) for items in self.levels)
+
+    def quantile(self, q):
+        """Quantile(s) ``q`` in [0, 1]; exact linear interpolation if nothing was compacted."""
+        q_arr = np.asarray(q, dtype=np.float64)
+        if not self.n:
+            result = np.full(q_arr.shape, np.nan)
+        elif not self.compacted:
+            result = np.quantile(self.levels[0], q_arr)
+        else:
+            values = np.concatenate(self.levels)
+            weights = np.concatenate([np.full(len(items), 2.0 ** h) for h, items in enumerate(self.levels)])
+            order = np.argsort(values, kind='stable')
+            values, cum = values[order], np.cumsum(weights[order])
+            idx = np.searchsorted(cum, q_arr * (cum[-1] - 1) + 1, side='left')
+            result = np.clip(values[np.minimum(idx, len(values) - 1)], self.min, self.max)
+        return float(result) if result.ndim == 0 else result
+
+    @property
+    def min(self):
+        return self._lo if self.n else np.nan
+
+    @property
+    def max(self):
+        return self._hi if self.n else np.nan
+
+    @property
+    def mean(self):
+        return self._mean if self.n else np.nan
+
+    @property
+    def std(self):
+        """Sample standard deviation (``ddof=1``, as pandas)."""
+        if self.n < 2:
+            return np.nan
+        return float(np.sqrt(self._m2 / (self.n - 1)))
+
+    def describe(self):
+        """Same rows as ``Series.describe()``."""
+        if not self.n:
+            return pd.Series([0.0] + [np.nan] * 7, index=DESCRIBE_INDEX)
+        q1, q2, q3 = self.quantile([0.25, 0.5, 0.75])
+        return pd.Series([self.n, self.mean, self.std, self.min, q1, q2, q3, self.max],
+                         index=DESCRIBE_INDEX, dtype=np.float64)
+
+
+class SketchIndex:
+    """One sketch per column per coarse (Income, CCAvg, Education, Loan) partition.
+
+    A ``FilterSpec`` slice merges the sketches of partitions fully inside the
+    filter and adds the exact values of rows in partitions cut by a slider
+    edge, so no query touches more rows than those edge partitions hold.
+    """
+
+    def __init__(self, df, columns=SKETCH_COLUMNS, k=DEFAULT_K, income_width=20.0, ccavg_width=1.0):
+        self.k = k
+        self.columns = list(columns)
+        self.partitions = Partitions(df, income_width, ccavg_width)
+        # The frame's own (compact, possibly memory-mapped) columns; sketches
+        # convert just the rows they are given to float64.
+        self._values = {col: df[col].to_numpy() for col in self.columns}
+        self.sketches = {
+            col: [QuantileSketch(k=k).update(values[self.partitions.rows(p)]) for p in range(len(self.partitions))]
+            for col, values in self._values.items()
+        }
+
+    @property
+    def retained(self):
+        return sum(s.retained for sketches in self.sketches.values() for s in sketches)
+
+    def updated(self, df, rows):
+        """Index of ``df``, the indexed frame after ``rows`` changed or were appended."""
+        rows = np.unique(rows)
+        old = rows[rows < len(self.partitions.order)]
+        index = copy.copy(self)
+        index.partitions = self.partitions.updated(df, rows)
+        place = np.searchsorted(index.partitions.ids, self.partitions.ids)
+        touched = np.union1d(place[self.partitions.positions(old)], index.partitions.positions(rows))
+        index._values = {col: df[col].to_numpy() for col in self.columns}
+        index.sketches = {}
+        for col, values in index._values.items():
+            sketches = [None] * len(index.partitions)
+            for p, sketch in zip(place.tolist(), self.sketches[col]):
+                sketches[p] = sketch
+            for p in touched.tolist():
+                sketches[p] = QuantileSketch(k=self.k).update(values[index.partitions.rows(p)])
+            index.sketches[col] = sketches
+        return index
+
+    def query(self, spec, column, loan=None):
+        """Merged sketch of ``column`` over ``spec`` (optionally one loan status only)."""
+        selected, rows = self.partitions.select(spec, loan=loan)
+        sketches = self.sketches[column]
+        return QuantileSketch.merged([sketches[p] for p in selected], k=self.k, extra=self._values[column][rows])
+
+    def describe(self, spec, columns=None, loan=None):
+        """Like ``df_filtered[columns].describe().T``, assembled from sketches."""
+        columns = self.columns if columns is None else columns
+        return pd.DataFrame({col: self.query(spec, col, loan=loan).describe() for col in columns}).T
@@ -0,0 +1,71 @@
+"""Rerun counts and compute time per dashboard session.
+
+Streamlit reruns the whole script on every widget change, except for widgets
+inside a fragment, which rerun only that fragment. ``RerunLog`` records one
+``Run`` per execution of each unit: the full script, or a named fragment
+either on its own (``isolated``) or as part of a full run. Only isolated runs
+are reruns the user waited for; the others give the cost a unit adds to a
+full run. Entries are kept in a bounded window so a long session does not
+grow the log without limit.
+"""
+import collections
+import contextlib
+import time
+
+import pandas as pd
+
+SCRIPT = 'script'
+WINDOW = 1000
+
+Run = collections.namedtuple('Run', 'unit seconds isolated at')
+
+
+class RerunLog:
+    def __init__(self, window=WINDOW):
+        self.runs = collections.deque(maxlen=window)
+        self._depth = 0
+
+    def record(self, unit, seconds, isolated=True):
+        self.runs.append(Run(unit, seconds, isolated, time.time()))
+
+    @contextlib.contextmanager
+    def timing(self, unit, isolated=True):
+        """Record the time spent in the ``with`` block as a run of ``unit``."""
+        start = time.perf_counter()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.record(unit, time.perf_counter() - start, isolated)
+
+    @property
+    def running(self):
+        """True inside a ``timing`` block, i.e. while an enclosing unit runs."""
+        return self._depth > 0
+
+    def clear(self):
+        self.runs.clear()
+
+    @property
+    def reruns(self):
+        """Full script runs plus fragment-only reruns."""
+        return sum(run.isolated for run in self.runs)
+
+    @property
+    def compute_seconds(self):
+        """Time spent in those reruns."""
+        return sum(run.seconds for run in self.runs if run.isolated)
+
+    def summary(self):
+        """Per unit: isolated reruns, all runs, and mean / last / total compute ms."""
+        frame = pd.DataFrame(list(self.runs), columns=Run._fields)
+        frame['ms'] = frame['seconds'] * 1000
+        grouped = frame.groupby('unit', sort=False)
+        return pd.DataFrame({
+            'reruns': grouped['isolated'].sum().astype(int),
+            'runs': grouped.size(),
+            'mean_ms': grouped['ms'].mean(),
+            'last_ms': grouped['ms'].last(),
+            'total_ms': grouped['ms'].sum(),
+        }).round(1)
@@ -0,0 +1,161 @@
+"""Filter-keyed cache of section results and serialized figures.
+
+Most sessions look at the same few filter states, yet every rerun recomputed
+each section's aggregates and rebuilt its Plotly figures. ``ResultCache``
+keeps those values under ``cache_key(name, spec, *params)`` keys, where
+``name`` is a section or chart id and ``fingerprint`` normalizes the filter
+state, so a repeated visit is a dictionary lookup. Results of an aggregate
+backend other than pandas (``sqlite_backend``) are keyed by its name too, so
+the two are never mixed in one cache.
+
+The cache is bounded by entry count and by the approximate bytes of the
+values (figure JSON by its length, other values by their pickled size), and
+evicts least recently used entries first. Entries older than ``ttl`` seconds
+are dropped when read. The cache is bound to one dataset version
+(``analytics.Dataset.version``); binding another version clears it. It is
+safe to share between sessions and threads: values are computed outside the
+lock and must be treated as read-only by whoever gets them.
+"""
+import collections
+import hashlib
+import pickle
+import threading
+import time
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 128 * 2**20
+DEFAULT_TTL = 60 * 60
+
+_MISSING = object()
+
+
+def fingerprint(spec, **options):
+    """Short stable key of a ``FilterSpec`` plus options such as ``exact=True``.
+
+    Equivalent widget states (ints vs floats, unsorted or repeated levels)
+    give the same key.
+    """
+    canonical = (
+        tuple(float(v) for v in spec.income),
+        tuple(round(float(v), 6) for v in spec.ccavg),
+        tuple(sorted({int(v) for v in spec.education})),
+        tuple(sorted({int(v) for v in spec.loan})),
+        tuple(sorted(options.items())),
+    )
+    return hashlib.sha1(repr(canonical).encode('utf-8')).hexdigest()[:16]
+
+
+def cache_key(name, spec, *params, backend=None):
+    """Key of result or chart ``name`` for filter state ``spec``, computed with ``backend`` (default pandas)."""
+    options = {} if backend is None else {'backend': backend}
+    return (name, fingerprint(spec, **options)) + params
+
+
+def value_bytes(value):
+    """Approximate memory held by a cached value."""
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+
+class ResultCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL,
+                 clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self.version = None
+        self.nbytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+        self._entries = collections.OrderedDict()   # key -> (value, nbytes, stored at)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._expired(entry)
+
+    def _expired(self, entry):
+        return self.ttl is not None and self.clock() - entry[2] > self.ttl
+
+    def _drop(self, key):
+        _, nbytes, _ = self._entries.pop(key)
+        self.nbytes -= nbytes
+
+    def bind(self, version):
+        """Serve results for dataset ``version``; entries of any other version are dropped."""
+        with self._lock:
+            if version == self.version:
+                return
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.nbytes = 0
+            self.version = version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes=None, version=_MISSING):
+        """Store ``value``; skipped if ``version`` is given and no longer the bound one."""
+        if nbytes is None:
+            nbytes = value_bytes(value)
+        if nbytes > self.max_bytes:
+            return value
+        with self._lock:
+            if version is not _MISSING and version != self.version:
+                return value
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, nbytes, self.clock())
+            self.nbytes += nbytes
+            while len(self._entries) > self.max_entries or self.nbytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+        return value
+
+    def get_or_compute(self, key, compute):
+        """The cached value for ``key``, calling ``compute()`` (and storing it) on a miss."""
+        version = self.version
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = self.put(key, compute(), version=version)
+        return value
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'version': self.version,
+                'entries': len(self._entries),
+                'bytes': self.nbytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
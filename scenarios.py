@@ -0,0 +1,151 @@
+"""Side-by-side KPIs of many filter states in one pass over the data.
+
+Comparing N scenarios (named ``FilterSpec``s) by resolving each one would read
+the selected rows N times. Here the rows of their ``envelope`` (the smallest
+spec covering them all) are read once and grouped by what decides every
+scenario's membership:
+
+- a range column is cut at every scenario's low and high bound; a value's
+  interval is the number of lows at or below it and of highs below it, two
+  ``searchsorted`` calls whatever N is, and says for each scenario whether
+  the value is inside its range,
+- a category column by its level, plus the customer tier (``RuleSet.codes``).
+
+Counts and the Personal Loan, Income and CCAvg sums are added up per
+non-empty cell of those codes (a ``bincount``, or ``np.unique`` when the grid
+of cells is larger than the rows). A scenario's totals are then the sum over
+the cells it covers: one ``(cells x N)`` membership matrix and one matrix
+product, so N only grows the work done per cell, not per customer.
+"""
+import numpy as np
+import pandas as pd
+
+from filter_index import FilterSpec, typed_bounds
+from segmentation import CUSTOMER_TIERS
+
+SUMS = ('Personal Loan', 'Income', 'CCAvg')
+# Grids up to this many cells are counted with a dense bincount.
+DENSE_CELLS = 1 << 16
+
+
+def envelope(specs):
+    """The smallest ``FilterSpec`` every spec of ``specs`` lies within."""
+    specs = list(specs)
+    return FilterSpec(
+        income=(min(s.income[0] for s in specs), max(s.income[1] for s in specs)),
+        ccavg=(min(s.ccavg[0] for s in specs), max(s.ccavg[1] for s in specs)),
+        education=tuple(sorted({int(v) for s in specs for v in s.education})),
+        loan=tuple(sorted({int(v) for s in specs for v in s.loan})),
+    )
+
+
+class _RangeCuts:
+    """Intervals of a range column between every scenario's bounds."""
+
+    def __init__(self, dtype, bounds):
+        # Bounds are compared as FilterSpec.mask compares them: in the
+        # column's precision when it is floating-point, else as float64 (an
+        # int16 column can have bounds beyond int16 or between integers).
+        dtype = np.dtype(dtype)
+        bounds = [typed_bounds(dtype, low, high) for low, high in bounds]
+        cut_dtype = dtype if dtype.kind == 'f' else np.float64
+        lows = np.array([low for low, _ in bounds], dtype=cut_dtype)
+        highs = np.array([high for _, high in bounds], dtype=cut_dtype)
+        self.lows, self.highs = np.unique(lows), np.unique(highs)
+        self.low_rank = np.searchsorted(self.lows, lows)
+        self.high_rank = np.searchsorted(self.highs, highs)
+        self.size = (len(self.lows) + 1) * (len(self.highs) + 1)
+
+    def codes(self, values):
+        above = np.searchsorted(self.lows, values, side='right')
+        below = np.searchsorted(self.highs, values, side='left')
+        return above * (len(self.highs) + 1) + below
+
+    def inside(self, codes):
+        """``(len(codes), N)``: whether each interval is within each scenario's range."""
+        above, below = np.divmod(codes, len(self.highs) + 1)
+        return (self.low_rank < above[:, None]) & (self.high_rank >= below[:, None])
+
+
+class _LevelCuts:
+    """Levels of a category column and the scenarios each one is allowed in."""
+
+    def __init__(self, allowed):
+        self.levels = np.array(sorted({int(v) for options in allowed for v in options}), dtype=np.int64)
+        # The last code is for values at none of the levels; no scenario has it.
+        self.table = np.zeros((len(self.levels) + 1, len(allowed)), dtype=bool)
+        for j, options in enumerate(allowed):
+            self.table[:-1, j] = np.isin(self.levels, list(options))
+        self.size = len(self.levels) + 1
+
+    def codes(self, values):
+        at = np.searchsorted(self.levels, values)
+        found = self.levels[np.minimum(at, len(self.levels) - 1)] == values if len(self.levels) else False
+        return np.where(found, at, len(self.levels))
+
+    def inside(self, codes):
+        return self.table[codes]
+
+
+def scenario_kpis(selection, scenarios, rules=CUSTOMER_TIERS):
+    """KPIs and tier mix of every scenario, from the rows of their envelope.
+
+    ``scenarios`` maps names to ``FilterSpec``s and ``selection`` holds (at
+    least) the rows of ``envelope(scenarios.values())``; it is not read when
+    there are no scenarios. Returns ``kpis`` (customers, loans, conversion,
+    avg_income, avg_ccavg) and ``tiers`` (customers per tier, in rule order),
+    one row per scenario.
+    """
+    names = list(scenarios)
+    specs = list(scenarios.values())
+    index = pd.Index(names, name='Scenario')
+    k = len(rules.labels)
+    if not specs:
+        totals = np.zeros((0, len(SUMS) + 1 + k))
+    else:
+        axes = [_RangeCuts(selection[col].dtype, [spec.ranges()[col] for spec in specs])
+                for col in ('Income', 'CCAvg')]
+        axes += [_LevelCuts([spec.categories()[col] for spec in specs]) for col in ('Education', 'Personal Loan')]
+        columns = ('Income', 'CCAvg', 'Education', 'Personal Loan')
+        codes = [axis.codes(selection[col]) for axis, col in zip(axes, columns)]
+        codes.append(selection.derive(('tiers', rules), rules.codes))
+        shape = tuple(axis.size for axis in axes) + (k,)
+        keys = np.ravel_multi_index(codes, shape)
+
+        size = int(np.prod(shape))
+        dense = size <= max(len(keys), DENSE_CELLS)
+        if dense:
+            ids, n = keys, size
+        else:
+            cells, ids = np.unique(keys, return_inverse=True)
+            n = len(cells)
+        count = np.bincount(ids, minlength=n).astype(np.float64)
+        sums = [np.bincount(ids, weights=np.asarray(selection[col], dtype=np.float64), minlength=n) for col in SUMS]
+        if dense:
+            cells = np.flatnonzero(count)
+            count, sums = count[cells], [s[cells] for s in sums]
+
+        cell_codes = np.unravel_index(cells, shape)
+        member = np.ones((len(cells), len(specs)), dtype=bool)
+        for axis, axis_codes in zip(axes, cell_codes):
+            member &= axis.inside(axis_codes)
+        weights = np.zeros((len(cells), len(SUMS) + 1 + k))
+        weights[:, 0] = count
+        for j, s in enumerate(sums, start=1):
+            weights[:, j] = s
+        weights[np.arange(len(cells)), len(SUMS) + 1 + cell_codes[-1]] = count
+        totals = member.T.astype(np.float64) @ weights
+
+    customers = totals[:, 0].round().astype(np.int64)
+    loans = totals[:, 1].round().astype(np.int64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        kpis = pd.DataFrame({
+            'customers': customers,
+            'loans': loans,
+            'conversion': loans / customers,
+            'avg_income': totals[:, 2] / customers,
+            'avg_ccavg': totals[:, 3] / customers,
+        }, index=index)
+    tiers = pd.DataFrame(totals[:, len(SUMS) + 1:].round().astype(np.int64),
+                         index=index, columns=pd.Index(rules.labels, name='Tier'))
+    return {'kpis': kpis, 'tiers': tiers}
@@ -0,0 +1,323 @@
+"""Personal Loan propensity model: logistic regression in NumPy.
+
+The tier rules use Income, CCAvg and Education only. ``train`` fits an
+L2-regularized logistic regression of Personal Loan on the customer columns
+(``FEATURES``, Education one-hot, plus the squared and education-interacted
+terms of ``TERMS``) by Newton's method. Each step adds up the gradient and
+Hessian batch by batch, so training memory does not grow with the number of
+customers; a seeded holdout share is kept aside to report AUC and log loss.
+
+A trained ``PropensityModel`` is saved as a small JSON artifact named after
+its version (a digest of its coefficients) in ``MODEL_DIR``, together with the
+dataset version it was trained on; ``latest_model`` finds the newest one for a
+dataset. ``score`` computes probabilities for any frame or ``Selection`` in
+``BATCH_ROWS`` batches of float32 arithmetic, which scores millions of
+customers a second on one CPU. ``ModelTrainer`` hands out the saved model for
+a dataset and, when there is none yet, trains one on a daemon thread instead
+of making the caller wait for it:
+
+    python scoring.py train
+    python scoring.py score --output scores.parquet
+"""
+import argparse
+import collections
+import datetime
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+import numpy as np
+import pandas as pd
+
+from data_store import DATA_FILE, frame_digest, load_dataset
+from filter_index import EDUCATION_LEVELS
+
+TARGET = 'Personal Loan'
+FEATURES = ['Age', 'Experience', 'Income', 'Family', 'CCAvg', 'Mortgage',
+            'Securities Account', 'CD Account', 'Online', 'CreditCard']
+# Extra terms as (column, other): ``other`` is None for the square, or an
+# Education level for the column within that level.
+TERMS = [('Income', None), ('CCAvg', None), ('Income', 2), ('Income', 3), ('Family', 2), ('Family', 3)]
+
+MODEL_DIR = '.models'
+MODEL_FORMAT = 1
+BATCH_ROWS = 100_000
+L2 = 1.0
+HOLDOUT = 0.2
+MAX_STEPS = 25
+TOLERANCE = 1e-8
+MAX_ERRORS = 20
+
+
+def feature_names():
+    levels = [f'Education={level}' for level in EDUCATION_LEVELS[1:]]
+    terms = [f'{col}^2' if other is None else f'{col}*Education={other}' for col, other in TERMS]
+    return FEATURES + levels + terms
+
+
+def design(source, start=0, stop=None, dtype=np.float64):
+    """Raw feature matrix of rows ``start:stop`` of ``source`` (a frame or ``Selection``)."""
+    columns = {col: np.asarray(source[col])[start:stop] for col in FEATURES + ['Education']}
+    n = len(columns['Education'])
+    x = np.empty((n, len(feature_names())), dtype=dtype)
+    for k, col in enumerate(FEATURES):
+        x[:, k] = columns[col]
+    k = len(FEATURES)
+    for level in EDUCATION_LEVELS[1:]:
+        x[:, k] = columns['Education'] == level
+        k += 1
+    for col, other in TERMS:
+        values = columns[col].astype(dtype)
+        x[:, k] = values * values if other is None else values * (columns['Education'] == other)
+        k += 1
+    return x
+
+
+def _sigmoid(z):
+    return 1 / (1 + np.exp(-np.clip(z, -35, 35)))
+
+
+def auc(labels, scores):
+    """Area under the ROC curve (ties count half)."""
+    labels = np.asarray(labels) == 1
+    positives = int(labels.sum())
+    negatives = len(labels) - positives
+    if not positives or not negatives:
+        return float('nan')
+    _, inverse, counts = np.unique(scores, return_inverse=True, return_counts=True)
+    ranks = (np.cumsum(counts) - (counts - 1) / 2)[inverse]
+    return float((ranks[labels].sum() - positives * (positives + 1) / 2) / (positives * negatives))
+
+
+def log_loss(labels, scores):
+    p = np.clip(np.asarray(scores, dtype=np.float64), 1e-12, 1 - 1e-12)
+    y = np.asarray(labels, dtype=np.float64)
+    return float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p)))
+
+
+@dataclass(frozen=True)
+class PropensityModel:
+    features: tuple
+    mean: tuple
+    scale: tuple
+    coef: tuple
+    intercept: float
+    data_version: str = ''
+    trained_at: str = ''
+    metrics: tuple = ()
+
+    @property
+    def version(self):
+        payload = json.dumps([MODEL_FORMAT, self.features, self.mean, self.scale, self.coef, self.intercept])
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+    def score(self, source, batch_rows=BATCH_ROWS):
+        """Loan propensity (0-1, float32) of every row of ``source``."""
+        n = len(source['Education'])
+        scores = np.empty(n, dtype=np.float32)
+        # The standardization is folded into the weights: (x - mean) / scale @ coef.
+        coef = np.asarray(self.coef) / np.asarray(self.scale)
+        weights = coef.astype(np.float32)
+        bias = np.float32(self.intercept - np.asarray(self.mean) @ coef)
+        for start in range(0, n, batch_rows):
+            x = design(source, start, start + batch_rows, dtype=np.float32)
+            scores[start:start + len(x)] = _sigmoid(x @ weights + bias)
+        return scores
+
+    def path(self, model_dir=MODEL_DIR):
+        return os.path.join(model_dir, f'propensity-{self.version}.json')
+
+    def save(self, model_dir=MODEL_DIR):
+        os.makedirs(model_dir, exist_ok=True)
+        document = dict(asdict(self), format=MODEL_FORMAT, version=self.version, metrics=dict(self.metrics))
+        path = self.path(model_dir)
+        tmp = f'{path}.tmp{os.getpid()}'
+        with open(tmp, 'w') as fh:
+            json.dump(document, fh, indent=1)
+        os.replace(tmp, path)
+        return self
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as fh:
+            document = json.load(fh)
+        if document.get('format') != MODEL_FORMAT:
+            raise ValueError(f"{path}: unsupported model format {document.get('format')!r}")
+        model = cls(
+            features=tuple(document['features']),
+            mean=tuple(document['mean']),
+            scale=tuple(document['scale']),
+            coef=tuple(document['coef']),
+            intercept=document['intercept'],
+            data_version=document.get('data_version', ''),
+            trained_at=document.get('trained_at', ''),
+            metrics=tuple(document.get('metrics', {}).items()),
+        )
+        if model.features != tuple(feature_names()):
+            raise ValueError(f"{path}: trained on different features")
+        return model
+
+
+def latest_model(data_version=None, model_dir=MODEL_DIR):
+    """Newest saved model (trained on ``data_version`` if given), or ``None``."""
+    models = []
+    for path in glob.glob(os.path.join(model_dir, 'propensity-*.json')):
+        try:
+            models.append(PropensityModel.load(path))
+        except (OSError, ValueError, KeyError):
+            continue
+    if data_version is not None:
+        models = [m for m in models if m.data_version == data_version]
+    return max(models, key=lambda m: m.trained_at, default=None)
+
+
+def _gather(df, rows):
+    """The model's columns for ``rows``, as ``design`` reads them."""
+    return {col: df[col].to_numpy()[rows] for col in FEATURES + ['Education']}
+
+
+def _moments(df, rows, batch_rows):
+    k = len(feature_names())
+    total, square = np.zeros(k), np.zeros(k)
+    for start in range(0, len(rows), batch_rows):
+        x = design(_gather(df, rows[start:start + batch_rows]))
+        total += x.sum(axis=0)
+        square += (x * x).sum(axis=0)
+    mean = total / len(rows)
+    scale = np.sqrt(np.maximum(square / len(rows) - mean * mean, 0))
+    return mean, np.where(scale > 0, scale, 1.0)
+
+
+def train(df, l2=L2, holdout=HOLDOUT, seed=0, batch_rows=BATCH_ROWS, max_steps=MAX_STEPS, tol=TOLERANCE,
+          data_version=None):
+    """Fit the model on ``df`` (all but a seeded ``holdout`` share of rows).
+
+    ``data_version`` is recorded with the model (default: ``frame_digest(df)``).
+    """
+    rng = np.random.default_rng(seed)
+    test = rng.random(len(df)) < holdout
+    fit_rows, test_rows = np.flatnonzero(~test), np.flatnonzero(test)
+    mean, scale = _moments(df, fit_rows, batch_rows)
+    labels = df[TARGET].to_numpy()
+    k = len(mean) + 1
+    beta = np.zeros(k)
+    penalty = np.full(k, l2)
+    penalty[0] = 0                                      # the intercept is not shrunk
+    for _ in range(max_steps):
+        gradient = -penalty * beta
+        hessian = np.diag(penalty)
+        for start in range(0, len(fit_rows), batch_rows):
+            rows = fit_rows[start:start + batch_rows]
+            x = np.hstack([np.ones((len(rows), 1)), (design(_gather(df, rows)) - mean) / scale])
+            p = _sigmoid(x @ beta)
+            gradient += x.T @ (labels[rows] - p)
+            hessian += (x * (p * (1 - p))[:, None]).T @ x
+        step = np.linalg.solve(hessian, gradient)
+        beta += step
+        if np.max(np.abs(step)) < tol:
+            break
+    model = PropensityModel(
+        features=tuple(feature_names()),
+        mean=tuple(mean.tolist()),
+        scale=tuple(scale.tolist()),
+        coef=tuple(beta[1:].tolist()),
+        intercept=float(beta[0]),
+        data_version=frame_digest(df) if data_version is None else data_version,
+        trained_at=datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+    )
+    metrics = {'rows': len(fit_rows), 'holdout_rows': len(test_rows)}
+    if len(test_rows):
+        scores = model.score(_gather(df, test_rows), batch_rows)
+        metrics.update(auc=auc(labels[test_rows], scores), log_loss=log_loss(labels[test_rows], scores),
+                       base_rate=float(labels[test_rows].mean()))
+    return PropensityModel(**{**asdict(model), 'metrics': tuple(metrics.items())})
+
+
+class ModelTrainer:
+    """The propensity model of each dataset version, trained in the background when missing."""
+
+    def __init__(self, model_dir=MODEL_DIR):
+        self.model_dir = model_dir
+        self.models = {}                                # data version -> PropensityModel
+        self.errors = collections.deque(maxlen=MAX_ERRORS)
+        self._training = {}                             # data version -> Thread
+        self._failed = set()                            # data versions not trained again
+        self._lock = threading.Lock()
+
+    def model(self, df, data_version):
+        """The model for ``data_version`` (else the newest saved one, so a refresh
+        only rescores), or ``None`` while one is trained on ``df`` (or after that
+        failed, see ``errors``); never blocks."""
+        with self._lock:
+            model = self.models.get(data_version)
+            if model is None and data_version not in self._training and data_version not in self._failed:
+                model = latest_model(data_version, self.model_dir) or latest_model(model_dir=self.model_dir)
+                if model is not None:
+                    self.models[data_version] = model
+                else:
+                    thread = threading.Thread(target=self._train, args=(df, data_version),
+                                              name='propensity-train', daemon=True)
+                    self._training[data_version] = thread
+                    thread.start()
+            return model
+
+    def training(self, data_version):
+        with self._lock:
+            return data_version in self._training
+
+    def _train(self, df, data_version):
+        try:
+            model = train(df, data_version=data_version).save(self.model_dir)
+        except Exception as exc:
+            self.errors.append(repr(exc))
+            model = None
+        with self._lock:
+            if model is None:
+                self._failed.add(data_version)
+            else:
+                self.models[data_version] = model
+            del self._training[data_version]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the loan propensity model or score customers with it.")
+    parser.add_argument('command', choices=['train', 'score'])
+    parser.add_argument('--data', default=DATA_FILE, help="source workbook")
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--model', help="model artifact to score with (default: newest for the data)")
+    parser.add_argument('--batch-rows', type=int, default=BATCH_ROWS)
+    parser.add_argument('--output', help="write ID and score to this Parquet or CSV file")
+    args = parser.parse_args(argv)
+
+    df = load_dataset(args.data, mmap=True)
+    if args.command == 'train':
+        start = time.perf_counter()
+        model = train(df, batch_rows=args.batch_rows).save(args.model_dir)
+        print(f"trained {model.version} on {len(df):,} customers in {time.perf_counter() - start:.1f} s "
+              f"-> {model.path(args.model_dir)}")
+        for name, value in model.metrics:
+            print(f"  {name}: {value:.4f}" if isinstance(value, float) else f"  {name}: {value:,}")
+        return
+
+    model = PropensityModel.load(args.model) if args.model else latest_model(frame_digest(df), args.model_dir)
+    if model is None:
+        parser.error(f"no model for this data in {args.model_dir}; run 'python scoring.py train' first")
+    start = time.perf_counter()
+    scores = model.score(df, args.batch_rows)
+    seconds = time.perf_counter() - start
+    print(f"scored {len(df):,} customers with {model.version} in {seconds:.2f} s "
+          f"({len(df) / seconds:,.0f} rows/s)")
+    if args.output:
+        out = pd.DataFrame({'ID': df['ID'].to_numpy(), 'score': scores})
+        if args.output.endswith('.csv'):
+            out.to_csv(args.output, index=False)
+        else:
+            out.to_parquet(args.output, index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""Declarative customer segmentation rules.
+
+Tiers are declared as data: an ordered list of segments, each a conjunction of
+``(column, op, value)`` conditions. A rule set compiles to a single
+``np.select`` over the column arrays, so assigning tiers is one vectorized
+pass instead of a Python call per customer. ``TIER_THRESHOLDS`` is the only
+place the cut-offs live; both the Customer Tiers and VIP Segment sections build
+their rules from it.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+TIER_THRESHOLDS = {
+    'income_vip': 150,
+    'income_core': 100,
+    'income_secondary': 80,
+    'cc_vip': 4,
+    'cc_core': 2,
+    'cc_secondary': 1,
+    'education_target': (2, 3),
+}
+
+DO_NOT_PURSUE = 'Do Not Pursue'
+
+_OPS = {
+    '>=': np.greater_equal,
+    '>': np.greater,
+    '<=': np.less_equal,
+    '<': np.less,
+    '==': np.equal,
+    'in': lambda values, options: np.isin(values, list(options)),
+}
+
+
+@dataclass(frozen=True)
+class Condition:
+    column: str
+    op: str
+    value: object
+
+    def evaluate(self, data):
+        values = np.asarray(data[self.column])
+        value = self.value
+        if self.op != 'in' and values.dtype.kind == 'f':
+            # Compare in the column's precision, e.g. float32 CCAvg against 1.9.
+            value = values.dtype.type(value)
+        return _OPS[self.op](values, value)
+
+
+@dataclass(frozen=True)
+class Segment:
+    label: str
+    conditions: tuple
+
+    def mask(self, data):
+        result = None
+        for condition in self.conditions:
+            hit = condition.evaluate(data)
+            result = hit if result is None else np.logical_and(result, hit, out=result)
+        if result is None:
+            return np.ones(len(data[next(iter(data.keys()))]), dtype=bool)
+        return result
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    """Ordered segments; a row belongs to the first segment it matches."""
+    segments: tuple
+    default: str = DO_NOT_PURSUE
+
+    @property
+    def labels(self):
+        return [segment.label for segment in self.segments] + [self.default]
+
+    @property
+    def columns(self):
+        return sorted({c.column for s in self.segments for c in s.conditions})
+
+    def masks(self, data):
+        return {segment.label: segment.mask(data) for segment in self.segments}
+
+    def codes(self, data):
+        """Segment index per row; ``len(segments)`` for the default label."""
+        conditions = [segment.mask(data) for segment in self.segments]
+        choices = np.arange(len(self.segments), dtype=np.int8)
+        return np.select(conditions, choices, default=len(self.segments)).astype(np.int8, copy=False)
+
+    def assign(self, data):
+        """Categorical of segment labels, in rule order."""
+        return pd.Categorical.from_codes(self.codes(data), categories=self.labels)
+
+    def summary(self, data, target='Personal Loan', means=()):
+        """Count, target sum and target rate per matched segment, in rule order.
+
+        ``means`` adds the per-segment mean of other columns. Segments no row
+        falls into are omitted, matching a ``groupby``.
+        """
+        codes = self.codes(data)
+        k = len(self.labels)
+
+        def totals(col):
+            return np.bincount(codes, weights=np.asarray(data[col], dtype=np.float64), minlength=k)
+
+        count = np.bincount(codes, minlength=k)
+        total = totals(target)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            columns = {'count': count, 'sum': total, 'mean': total / count}
+            for col in means:
+                columns[col] = totals(col) / count
+        frame = pd.DataFrame(columns, index=pd.Index(self.labels, name='Tier'))
+        return frame[frame['count'] > 0]
+
+
+def customer_tier_rules(thresholds=TIER_THRESHOLDS):
+    t = thresholds
+    return RuleSet((
+        Segment('Tier 1: VIP', (
+            Condition('Income', '>=', t['income_vip']),
+            Condition('CCAvg', '>=', t['cc_vip']),
+            Condition('Education', 'in', t['education_target']),
+        )),
+        Segment('Tier 2: Core', (
+            Condition('Income', '>=', t['income_core']),
+            Condition('Income', '<', t['income_vip']),
+            Condition('CCAvg', '>=', t['cc_core']),
+            Condition('Education', 'in', t['education_target']),
+        )),
+        Segment('Tier 3: Secondary', (
+            Condition('Income', '>=', t['income_secondary']),
+            Condition('CCAvg', '>=', t['cc_secondary']),
+        )),
+    ))
+
+
+def vip_segment_rules(thresholds=TIER_THRESHOLDS):
+    # VIP Tier 2 is the spending band below the VIP cut-off, unlike customer
+    # Tier 2 which also keeps core-income customers with VIP-level spending.
+    t = thresholds
+    return RuleSet((
+        Segment('Tier 1 (VIP)', (
+            Condition('Income', '>=', t['income_vip']),
+            Condition('CCAvg', '>=', t['cc_vip']),
+            Condition('Education', 'in', t['education_target']),
+        )),
+        Segment('Tier 2 (Core)', (
+            Condition('Income', '>=', t['income_core']),
+            Condition('Income', '<', t['income_vip']),
+            Condition('CCAvg', '>=', t['cc_core']),
+            Condition('CCAvg', '<', t['cc_vip']),
+            Condition('Education', 'in', t['education_target']),
+        )),
+    ), default='Other')
+
+
+CUSTOMER_TIERS = customer_tier_rules()
+VIP_SEGMENTS = vip_segment_rules()
@@ -0,0 +1,136 @@
+"""One read-only, memory-mapped copy of the dataset per machine.
+
+``SharedDataset`` serves the frame straight from the ``.npy`` sidecar bundle
+mapped read-only (``data_store.load_dataset(mmap=True)``). Every session in a
+process gets the same frame object and every worker process maps the same
+files, so the column data is held once in the OS page cache however many
+users or workers there are. The arrays are not writeable: code that tries to
+modify the shared frame in place fails instead of silently copying it.
+
+Each process also records the sessions attached to it in
+``<bundle>/sessions/<pid>.json``; ``attached_sessions`` adds those up across
+all live workers. A process removes its file on exit (``close``, registered
+with ``atexit`` by the dashboard); the file of a process that died without
+exiting cleanly is removed by the next ``attached_sessions`` that finds it.
+"""
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from data_store import CACHE_DIR, DATA_FILE, load_dataset, sidecar_dir
+
+SESSIONS_DIR = 'sessions'
+# A session not seen for this long is dropped even if nobody reported it closed.
+SESSION_TTL = 30 * 60
+
+
+def _registry_dir(path, cache_dir):
+    return os.path.join(sidecar_dir(path, cache_dir), SESSIONS_DIR)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _root(array):
+    while isinstance(array, np.ndarray) and not isinstance(array, np.memmap) and array.base is not None:
+        array = array.base
+    return array
+
+
+def attached_sessions(path=DATA_FILE, cache_dir=CACHE_DIR, ttl=SESSION_TTL):
+    """``{pid: sessions}`` for every live worker serving ``path``; dead workers' entries are removed."""
+    registry = _registry_dir(path, cache_dir)
+    try:
+        names = os.listdir(registry)
+    except OSError:
+        return {}
+    counts = {}
+    now = time.time()
+    for name in names:
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(registry, name), encoding='utf-8') as fh:
+                entry = json.load(fh)
+        except (OSError, ValueError):
+            continue
+        if not _pid_alive(entry['pid']):
+            try:
+                os.remove(os.path.join(registry, name))
+            except OSError:
+                pass
+        elif now - entry['updated'] <= ttl:
+            counts[entry['pid']] = entry['sessions']
+    return counts
+
+
+class SharedDataset:
+    """The process-wide, memory-mapped frame plus the sessions using it."""
+
+    def __init__(self, path=DATA_FILE, cache_dir=CACHE_DIR, ttl=SESSION_TTL):
+        self.path = path
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.df = load_dataset(path, cache_dir, mmap=True)
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._registry = os.path.join(_registry_dir(path, cache_dir), f'{os.getpid()}.json')
+
+    @property
+    def mapped(self):
+        """True when every column is backed by the read-only bundle files."""
+        return all(isinstance(_root(self.df[col].to_numpy()), np.memmap) for col in self.df.columns)
+
+    @property
+    def nbytes(self):
+        return sum(self.df[col].to_numpy().nbytes for col in self.df.columns)
+
+    def attach(self, session_id, is_active=None):
+        """Record ``session_id`` as using the dataset; returns this process's session count.
+
+        ``is_active(session_id)``, if given, is used to drop sessions that
+        have closed; others are dropped after ``ttl`` seconds without a call.
+        """
+        now = time.time()
+        with self._lock:
+            self._sessions[session_id] = now
+            for sid, seen in list(self._sessions.items()):
+                if now - seen > self.ttl or (is_active is not None and sid != session_id
+                                             and not is_active(sid)):
+                    del self._sessions[sid]
+            count = len(self._sessions)
+        self._publish(count, now)
+        return count
+
+    @property
+    def sessions(self):
+        return len(self._sessions)
+
+    def _publish(self, count, now):
+        entry = {'pid': os.getpid(), 'sessions': count, 'updated': now}
+        try:
+            os.makedirs(os.path.dirname(self._registry), exist_ok=True)
+            tmp = self._registry + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as fh:
+                json.dump(entry, fh)
+            os.replace(tmp, self._registry)
+        except OSError:
+            # Read-only deployments only lose the cross-process count.
+            pass
+
+    def close(self):
+        """Remove this process's registry entry."""
+        try:
+            os.remove(self._registry)
+        except OSError:
+            pass
@@ -0,0 +1,91 @@
+"""Sorted, paged views of a selection for the Data Explorer table.
+
+``SortIndex`` keeps a stable argsort of each column of the dataset, built the
+first time the column is sorted on and shared by every session (the filter
+index's Income and CCAvg orders are reused as they are). Ordering a selection
+by a column then needs no sort: for a large selection the column's global
+order is filtered down to the selected rows in one pass, and only a small
+selection (below ``SMALL_SELECTION`` of the table) is argsorted directly.
+The ordered row positions are kept beside the selection
+(``Selection.derive``), so paging through them, in either direction, is a
+slice of page-size length and only that page's rows are gathered.
+
+Values that are not columns of the frame, such as model scores, can be
+``attach``-ed under a column name and are then sorted and paged like one.
+Ties keep row order when ascending; a descending view is the ascending one
+reversed. ``updated`` carries the column sorts built so far over to a frame
+whose rows changed or grew, merging in just those rows.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from filter_index import merged_order
+
+ROW_ORDER = None
+SMALL_SELECTION = 1 / 16
+
+
+class SortIndex:
+    def __init__(self, df, orders=None):
+        self.df = df
+        self.attached = {}
+        self._orders = dict(orders or {})
+        self._lock = threading.Lock()
+
+    def updated(self, df, rows, orders=None):
+        """Index of ``df`` after ``rows`` changed or were appended; attached values are not carried over."""
+        index = SortIndex(df, orders)
+        with self._lock:
+            built = dict(self._orders)
+        for column, order in built.items():
+            if column not in index._orders and column in df.columns:
+                index._orders[column] = merged_order(order, df[column].to_numpy(), rows)
+        return index
+
+    def attach(self, column, values):
+        """Sort and page ``values`` (one per row of the frame) as ``column``."""
+        with self._lock:
+            self.attached[column] = np.asarray(values)
+            self._orders.pop(column, None)
+
+    def values(self, column):
+        values = self.attached.get(column)
+        return self.df[column].to_numpy() if values is None else values
+
+    def order(self, column):
+        """Row positions of the whole table sorted by ``column`` (stable)."""
+        order = self._orders.get(column)
+        if order is None:
+            with self._lock:
+                order = self._orders.get(column)
+                if order is None:
+                    order = np.argsort(self.values(column), kind='stable')
+                    self._orders[column] = order
+        return order
+
+    def ordered(self, selection, column=ROW_ORDER):
+        """Positions of the selected rows in ascending ``column`` order (row order for ``None``)."""
+        if column is ROW_ORDER:
+            return selection.positions()
+        return selection.derive(('sorted', column), lambda sel: self._ordered(sel, column))
+
+    def _ordered(self, selection, column):
+        if selection.rows is None:
+            return self.order(column)
+        if len(selection) < SMALL_SELECTION * len(self.df):
+            return selection.rows[np.argsort(self.values(column)[selection.rows], kind='stable')]
+        order = self.order(column)
+        mask = np.zeros(len(self.df), dtype=bool)
+        mask[selection.rows] = True
+        return order[mask[order]]
+
+    def page(self, selection, column=ROW_ORDER, ascending=True, start=0, size=100, columns=None):
+        """DataFrame of rows ``start`` to ``start + size`` of the selection in the given order."""
+        rows = self.ordered(selection, column)
+        if not ascending:
+            rows = rows[::-1]
+        rows = rows[start:start + size]
+        columns = list(self.df.columns) if columns is None else list(columns)
+        return pd.DataFrame({c: self.values(c)[rows] for c in columns}, index=self.df.index[rows], copy=False)
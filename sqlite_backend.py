@@ -0,0 +1,366 @@
+"""Optional SQLite backend for the aggregate sections.
+
+``build_database`` writes the customer table to a local SQLite file (one row
+per frame row, in frame order) with indexes on the filter columns of
+``INDEXED_COLUMNS``. ``SqliteBackend`` answers the sections that are group-bys
+over the filtered customers (the overview KPIs, income by loan status and
+bracket, education stats and customer tier counts) as SQL aggregate queries:
+the sidebar filter becomes the ``WHERE`` clause and the tier rules a ``CASE``
+expression, so only the per-group rows come back into Python. Queries run on
+a pool of read-only connections shared by the sessions of a process.
+
+The results have the same shape as the ``analytics`` functions they replace,
+with exact medians (the pandas path's ``exact=True``); ``check_parity``
+compares the two on a set of presets:
+
+    python sqlite_backend.py check
+"""
+import argparse
+import contextlib
+import os
+import queue
+import sqlite3
+import sys
+
+import numpy as np
+import pandas as pd
+
+import analytics
+from analytics import Dataset, tier_rules
+from data_cube import INCOME_BRACKET_BINS, INCOME_BRACKET_LABELS, conversion_table
+from data_store import DATA_FILE, sidecar_dir
+from filter_index import EDUCATION_LABELS, typed_bounds
+
+BACKENDS = ('pandas', 'sqlite')
+DB_NAME = 'customers.sqlite'
+DB_FORMAT = 1
+TABLE = 'customers'
+INDEXED_COLUMNS = ('Income', 'CCAvg', 'Education', 'Personal Loan')
+INSERT_ROWS = 100_000
+POOL_SIZE = 4
+MMAP_BYTES = 256 * 2**20
+
+_SQL_OPS = {'>=': '>=', '>': '>', '<=': '<=', '<': '<', '==': '='}
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def database_path(path=DATA_FILE):
+    """Database file beside the sidecar bundle of ``path``."""
+    return os.path.join(sidecar_dir(path), DB_NAME)
+
+
+def build_database(df, path, version=''):
+    """Write ``df`` to a new SQLite file at ``path`` (replacing it atomically)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f'{path}.tmp{os.getpid()}'
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    with contextlib.closing(sqlite3.connect(tmp)) as conn:
+        conn.execute('PRAGMA journal_mode=OFF')
+        conn.execute('PRAGMA synchronous=OFF')
+        columns = ', '.join(f"{_quote(col)} {'REAL' if df[col].dtype.kind == 'f' else 'INTEGER'}"
+                            for col in df.columns)
+        conn.execute(f'CREATE TABLE {TABLE} ({columns})')
+        insert = f"INSERT INTO {TABLE} VALUES ({', '.join('?' * len(df.columns))})"
+        for start in range(0, len(df), INSERT_ROWS):
+            chunk = [df[col].to_numpy()[start:start + INSERT_ROWS].tolist() for col in df.columns]
+            conn.executemany(insert, zip(*chunk))
+        for col in INDEXED_COLUMNS:
+            conn.execute(f"CREATE INDEX {_quote('idx_' + col.replace(' ', '_'))} ON {TABLE} ({_quote(col)})")
+        conn.execute('CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)')
+        conn.executemany('INSERT INTO meta VALUES (?, ?)',
+                         [('format', str(DB_FORMAT)), ('version', version), ('rows', str(len(df)))])
+        conn.execute('ANALYZE')
+        conn.commit()
+    os.replace(tmp, path)
+    return path
+
+
+def database_version(path):
+    """Dataset version the file at ``path`` was built from, or ``None``."""
+    try:
+        with contextlib.closing(sqlite3.connect(f'file:{path}?mode=ro', uri=True)) as conn:
+            meta = dict(conn.execute('SELECT key, value FROM meta'))
+    except sqlite3.Error:
+        return None
+    return meta.get('version') if meta.get('format') == str(DB_FORMAT) else None
+
+
+class ConnectionPool:
+    """``size`` read-only connections to one database, handed out one at a time."""
+
+    def __init__(self, path, size=POOL_SIZE):
+        self.path = path
+        self.size = size
+        self.closed = False
+        self._idle = queue.Queue()
+        for _ in range(size):
+            conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True, check_same_thread=False)
+            conn.execute(f'PRAGMA mmap_size={MMAP_BYTES}')
+            self._idle.put(conn)
+
+    @contextlib.contextmanager
+    def connection(self):
+        if self.closed:
+            raise sqlite3.ProgrammingError(f"connection pool for {self.path} is closed")
+        conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def query(self, sql, params=()):
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def close(self):
+        """Close every connection, once each is back from the query using it."""
+        if self.closed:
+            return
+        self.closed = True
+        for _ in range(self.size):
+            self._idle.get().close()
+
+
+def _nan(value):
+    return np.nan if value is None else float(value)
+
+
+class SqliteBackend:
+    name = 'sqlite'
+
+    def __init__(self, path, dtypes, pool_size=POOL_SIZE):
+        self.path = path
+        self.dtypes = dict(dtypes)
+        self.pool = ConnectionPool(path, pool_size)
+        self.education_levels = [level for (level,) in self.pool.query(
+            f'SELECT DISTINCT "Education" FROM {TABLE} ORDER BY 1')]
+        self._overall = None
+
+    @classmethod
+    def open(cls, data, path=None, pool_size=POOL_SIZE):
+        """Backend over ``data``'s frame; the file is (re)built unless it holds ``data.version``."""
+        path = database_path() if path is None else path
+        if database_version(path) != data.version:
+            build_database(data.df, path, data.version)
+        return cls(path, {col: data.df[col].dtype for col in data.df.columns}, pool_size)
+
+    def where(self, spec, *extra):
+        """``WHERE`` clause and parameters for ``spec`` (plus ``extra`` conditions)."""
+        clauses, params = [], []
+        for col, (low, high) in spec.ranges().items():
+            low, high = typed_bounds(self.dtypes[col], low, high)
+            clauses.append(f'{_quote(col)} BETWEEN ? AND ?')
+            params += [float(low), float(high)]
+        for col, allowed in spec.categories().items():
+            clauses.append(f"{_quote(col)} IN ({', '.join('?' * len(allowed))})")
+            params += [int(v) for v in allowed]
+        for clause, values in extra:
+            clauses.append(clause)
+            params += list(values)
+        return 'WHERE ' + ' AND '.join(clauses), params
+
+    def condition(self, condition):
+        """SQL for a ``segmentation.Condition``, compared in the column's precision."""
+        column = _quote(condition.column)
+        if condition.op == 'in':
+            return f"{column} IN ({', '.join('?' * len(condition.value))})", [int(v) for v in condition.value]
+        value = condition.value
+        if np.dtype(self.dtypes[condition.column]).kind == 'f':
+            value = np.dtype(self.dtypes[condition.column]).type(value)
+        return f'{column} {_SQL_OPS[condition.op]} ?', [float(value)]
+
+    def _median(self, column, where, params):
+        (n,), = self.pool.query(f'SELECT COUNT(*) FROM {TABLE} {where}', params)
+        if not n:
+            return np.nan
+        rows = self.pool.query(f'SELECT {_quote(column)} FROM {TABLE} {where} ORDER BY 1 LIMIT ? OFFSET ?',
+                               params + [2 - n % 2, (n - 1) // 2])
+        return float(np.mean([value for (value,) in rows]))
+
+    def kpis(self, spec=None):
+        """Like ``analytics.kpis``; every customer when ``spec`` is ``None``."""
+        where, params = self.where(spec) if spec is not None else ('', [])
+        (n, loans, income, ccavg), = self.pool.query(
+            f'SELECT COUNT(*), SUM("Personal Loan" = 1), AVG("Income"), AVG("CCAvg") FROM {TABLE} {where}', params)
+        counts = dict.fromkeys(self.education_levels, 0)
+        counts.update(self.pool.query(f'SELECT "Education", COUNT(*) FROM {TABLE} {where} GROUP BY 1', params))
+        return {
+            'customers': n,
+            'loan_rate': loans / n if n else np.nan,
+            'avg_income': _nan(income),
+            'avg_ccavg': _nan(ccavg),
+            'education_counts': {int(k): int(v) for k, v in counts.items()},
+        }
+
+    def overview(self, spec):
+        if self._overall is None:
+            self._overall = self.kpis()
+        return {'overall': self._overall, 'filtered': self.kpis(spec)}
+
+    def income_brackets(self, spec):
+        where, params = self.where(spec)
+        cases = ' '.join(f'WHEN "Income" > ? AND "Income" <= ? THEN {i}' for i in range(len(INCOME_BRACKET_LABELS)))
+        bounds = [float(edge) for pair in zip(INCOME_BRACKET_BINS[:-1], INCOME_BRACKET_BINS[1:]) for edge in pair]
+        count = np.zeros(len(INCOME_BRACKET_LABELS))
+        loans = np.zeros(len(INCOME_BRACKET_LABELS))
+        for bracket, n, accepted in self.pool.query(
+                f'SELECT CASE {cases} END AS bracket, COUNT(*), SUM("Personal Loan" = 1) FROM {TABLE} {where} '
+                f'GROUP BY bracket HAVING bracket IS NOT NULL', bounds + params):
+            count[bracket], loans[bracket] = n, accepted
+        return conversion_table(count, loans, INCOME_BRACKET_LABELS, 'Income_Bracket')
+
+    def income_analysis(self, spec):
+        by_loan = {}
+        for loan in (1, 0):
+            where, params = self.where(spec, ('"Personal Loan" = ?', [loan]))
+            (mean, low, high), = self.pool.query(
+                f'SELECT AVG("Income"), MIN("Income"), MAX("Income") FROM {TABLE} {where}', params)
+            by_loan[loan] = {
+                'mean': _nan(mean),
+                'min': _nan(low),
+                'median': self._median('Income', where, params),
+                'max': _nan(high),
+            }
+        where, params = self.where(spec)
+        (avg_income,), = self.pool.query(f'SELECT AVG("Income") FROM {TABLE} {where}', params)
+        return {'avg_income': _nan(avg_income), 'by_loan': by_loan, 'brackets': self.income_brackets(spec)}
+
+    def education_analysis(self, spec):
+        where, params = self.where(spec)
+        groups = self.pool.query(
+            f'SELECT "Education", COUNT(*), SUM("Personal Loan" = 1), SUM("Personal Loan"), AVG("Personal Loan"), '
+            f'AVG("Income"), MIN("Income"), MAX("Income"), AVG("CCAvg") FROM {TABLE} {where} GROUP BY 1', params)
+        present = {row[0]: row for row in groups}
+        conversion = conversion_table(
+            [present[level][1] if level in present else 0 for level in self.education_levels],
+            [present[level][2] if level in present else 0 for level in self.education_levels],
+            [EDUCATION_LABELS.get(level, str(level)) for level in self.education_levels],
+            'Education_Label').sort_index()
+        records = {}
+        for level, n, _, total, rate, income, low, high, ccavg in groups:
+            where, params = self.where(spec, ('"Education" = ?', [level]))
+            records[EDUCATION_LABELS.get(level, str(level))] = [
+                n, total, rate, income, self._median('Income', where, params), low, high, ccavg]
+        details = pd.DataFrame.from_dict(records, orient='index', columns=[
+            'Count', 'Loan_Count', 'Loan_Rate', 'Avg_Income', 'Median_Income', 'Min_Income', 'Max_Income',
+            'Avg_CC'])
+        details.index = details.index.astype(str).rename('Education_Label')
+        return {'conversion': conversion, 'details': details.sort_index()}
+
+    def customer_tiers(self, spec, rules):
+        """Like ``analytics.customer_tiers``, with the rules as one ``CASE``."""
+        cases, case_params = [], []
+        for code, segment in enumerate(rules.segments):
+            parts = [self.condition(condition) for condition in segment.conditions]
+            cases.append(f"WHEN {' AND '.join(sql for sql, _ in parts) or '1'} THEN {code}")
+            case_params += [value for _, values in parts for value in values]
+        where, params = self.where(spec)
+        k = len(rules.labels)
+        totals = np.zeros((4, k))
+        for code, n, loans, income, ccavg in self.pool.query(
+                f"SELECT CASE {' '.join(cases)} ELSE {len(rules.segments)} END AS tier, COUNT(*), "
+                f'SUM("Personal Loan"), SUM("Income"), SUM("CCAvg") FROM {TABLE} {where} GROUP BY tier',
+                case_params + params):
+            totals[:, code] = n, loans, income, ccavg
+        count, loans, income, ccavg = totals
+        with np.errstate(invalid='ignore', divide='ignore'):
+            frame = pd.DataFrame({
+                'count': count.astype(np.int64),
+                'sum': loans,
+                'mean': loans / count,
+                'Income': income / count,
+                'CCAvg': ccavg / count,
+            }, index=pd.Index(rules.labels, name='Tier'))
+        frame = frame[frame['count'] > 0]
+        n = int(count.sum())
+        frame['share'] = frame['count'] / n if n else np.nan
+        return frame
+
+    def section_result(self, spec, name, *params):
+        """``SQL_RESULTS[name]`` for ``spec``; the same params as ``analytics.section_result``."""
+        return SQL_RESULTS[name](self, spec, *params)
+
+    def close(self):
+        self.pool.close()
+
+
+# Sections answered in SQL, by ``analytics.SECTION_RESULTS`` name and with its
+# params; ``exact`` is accepted and ignored (the SQL results are exact).
+SQL_RESULTS = {
+    'overview': lambda backend, spec: backend.overview(spec),
+    'income': lambda backend, spec, exact: backend.income_analysis(spec),
+    'education': lambda backend, spec: backend.education_analysis(spec),
+    'tiers': lambda backend, spec, thresholds=(): backend.customer_tiers(spec, tier_rules(thresholds)),
+}
+
+# (name, *params) compared by ``check_parity``; the pandas side runs with exact quantiles.
+PARITY_RESULTS = [
+    ('overview',),
+    ('income', True),
+    ('education',),
+    ('tiers',),
+    ('tiers', (('income_vip', 120), ('cc_vip', 3.5), ('education_target', (3,)))),
+]
+
+
+def _differences(expected, actual, path, rtol):
+    if isinstance(expected, dict):
+        if set(expected) != set(actual):
+            return [f"{path}: keys {sorted(expected)} != {sorted(actual)}"]
+        return [d for key in expected for d in _differences(expected[key], actual[key], f'{path}.{key}', rtol)]
+    if isinstance(expected, pd.DataFrame):
+        try:
+            pd.testing.assert_frame_equal(expected, actual[expected.columns], check_dtype=False, rtol=rtol)
+        except AssertionError as exc:
+            return [f"{path}: {exc}"]
+        return []
+    if not np.isclose(float(expected), float(actual), rtol=rtol, equal_nan=True):
+        return [f"{path}: {expected!r} != {actual!r}"]
+    return []
+
+
+def check_parity(data, backend, presets, results=PARITY_RESULTS, rtol=1e-6):
+    """Differences between the pandas and SQLite results, as messages (empty when they agree)."""
+    differences = []
+    for preset, spec in presets.items():
+        selection = data.select(spec)
+        for name, *params in results:
+            expected = analytics.section_result(data, spec, name, *params, selection=selection)
+            actual = backend.section_result(spec, name, *params)
+            differences += _differences(expected, actual, f'{preset}/{name}', rtol)
+    return differences
+
+
+def main(argv=None):
+    from batch import DEFAULT_PRESETS, load_presets
+
+    parser = argparse.ArgumentParser(description="Build the SQLite backend or check it against the pandas path.")
+    parser.add_argument('command', choices=['build', 'check'])
+    parser.add_argument('--data', default=DATA_FILE, help="source workbook")
+    parser.add_argument('--db', help=f"database file (default: {DB_NAME} beside the data cache)")
+    parser.add_argument('--presets', help="presets JSON file (default: the batch presets)")
+    args = parser.parse_args(argv)
+
+    data = Dataset.load(args.data)
+    backend = SqliteBackend.open(data, args.db or database_path(args.data))
+    if args.command == 'build':
+        print(f"{backend.path}: {len(data.df):,} customers, version {data.version[:12]}")
+        return 0
+    presets = load_presets(args.presets) if args.presets else dict(DEFAULT_PRESETS)
+    differences = check_parity(data, backend, presets)
+    for message in differences:
+        print(message)
+    checked = len(presets) * len(PARITY_RESULTS)
+    if differences:
+        print(f"{len(differences)} difference(s) in {checked} results")
+        return 1
+    print(f"all {checked} results agree")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
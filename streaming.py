@@ -0,0 +1,291 @@
+"""Out-of-core aggregation for customer files larger than memory.
+
+``iter_chunks`` reads a CSV or Parquet extract in fixed-size chunks and
+``StreamStats`` folds each chunk into mergeable accumulators (counts, means
+and sums of squared deviations, combined with Chan et al.'s pairwise update
+so a large offset does not cancel the variance away, min/max, and per-bracket, per-education, per-loan-status and
+per-tier tallies). Peak memory is one chunk plus the accumulators, whatever
+the file size. ``StreamStats`` answers the same calls as a ``CubeSlice``
+(``len``, ``mean``, ``education_counts``, ``conversion_by_*``) plus the Customer
+Tiers summary, so the dashboard metrics can be fed from either. ``batch.py
+--stream`` uses it to compute every preset in one pass over such a file.
+
+    python streaming.py customers.parquet --chunksize 500000 --income 40 200
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from analytics import STAT_COLUMNS
+from data_cube import INCOME_BRACKET_BINS, INCOME_BRACKET_LABELS, conversion_table
+from data_store import NUMERIC_COLS, compact
+from filter_index import EDUCATION_LABELS, FilterSpec
+from segmentation import CUSTOMER_TIERS
+
+STREAM_COLUMNS = NUMERIC_COLS + ['Education']
+DEFAULT_CHUNKSIZE = 250_000
+
+
+def clean_chunk(chunk):
+    """Same cleaning as ``data_store.read_source``, one chunk at a time."""
+    for col in STREAM_COLUMNS:
+        chunk[col] = pd.to_numeric(chunk[col], errors='coerce')
+    return compact(chunk.dropna(subset=STREAM_COLUMNS))
+
+
+def iter_chunks(path, chunksize=DEFAULT_CHUNKSIZE, columns=STREAM_COLUMNS):
+    """Yield cleaned DataFrame chunks of at most ``chunksize`` rows."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.parquet', '.pq'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("reading Parquet in chunks requires pyarrow") from exc
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=list(columns)):
+            yield clean_chunk(batch.to_pandas())
+    elif ext in ('.csv', '.txt', '.gz'):
+        for chunk in pd.read_csv(path, usecols=list(columns), chunksize=chunksize):
+            yield clean_chunk(chunk)
+    else:
+        raise ValueError(f"unsupported file type for streaming: {path!r} (use CSV or Parquet)")
+
+
+def filtered_chunks(chunks, spec=None):
+    """Restrict each chunk to ``spec``; empty chunks are dropped."""
+    for chunk in chunks:
+        if spec is not None:
+            chunk = chunk[spec.mask(chunk)]
+        if len(chunk):
+            yield chunk
+
+
+def _combine(n, mean, m2, other_n, other_mean, other_m2):
+    """``(mean, m2)`` of two disjoint sets of ``n`` and ``other_n`` values (Chan et al.)."""
+    total = n + other_n
+    if not total:
+        return mean, m2
+    delta = other_mean - mean
+    return mean + delta * other_n / total, m2 + other_m2 + delta * delta * n * other_n / total
+
+
+def _add_keyed(table, keys, weights):
+    """``table[key] += bincount`` for the (few) distinct keys in ``keys``."""
+    levels, codes = np.unique(keys, return_inverse=True)
+    for name, values in weights.items():
+        totals = np.bincount(codes, weights=values, minlength=len(levels))
+        for level, total in zip(levels.tolist(), totals):
+            row = table.setdefault(level, {})
+            row[name] = row.get(name, 0.0) + total
+
+
+class StreamStats:
+    """Mergeable sufficient statistics for the dashboard's summary metrics."""
+
+    def __init__(self, brackets=INCOME_BRACKET_BINS, bracket_labels=INCOME_BRACKET_LABELS,
+                 rules=CUSTOMER_TIERS):
+        self.brackets = list(brackets)
+        self.bracket_labels = list(bracket_labels)
+        self.rules = rules
+        self.n = 0
+        self.means = dict.fromkeys(STAT_COLUMNS, 0.0)
+        self.m2 = dict.fromkeys(STAT_COLUMNS, 0.0)       # sum of squared deviations from the mean
+        self.mins = dict.fromkeys(STAT_COLUMNS, np.inf)
+        self.maxs = dict.fromkeys(STAT_COLUMNS, -np.inf)
+        self.loans = 0
+        self.by_loan = {}
+        self.by_education = {}
+        self.bracket_count = np.zeros(len(self.bracket_labels))
+        self.bracket_loans = np.zeros(len(self.bracket_labels))
+        self.tier_count = np.zeros(len(rules.labels))
+        self.tier_loans = np.zeros(len(rules.labels))
+        self.tier_income = np.zeros(len(rules.labels))
+        self.tier_ccavg = np.zeros(len(rules.labels))
+
+    def update(self, chunk):
+        """Fold one DataFrame chunk into the accumulators."""
+        if not len(chunk):
+            return self
+        loan = chunk['Personal Loan'].to_numpy()
+        income = chunk['Income'].to_numpy(dtype=np.float64)
+        ccavg = chunk['CCAvg'].to_numpy(dtype=np.float64)
+        accepted = (loan == 1).astype(np.float64)
+
+        self.loans += int(accepted.sum())
+        for col in STAT_COLUMNS:
+            values = chunk[col].to_numpy(dtype=np.float64)
+            mean = values.mean()
+            centered = values - mean
+            self.means[col], self.m2[col] = _combine(self.n, self.means[col], self.m2[col],
+                                                     len(values), mean, np.dot(centered, centered))
+            self.mins[col] = min(self.mins[col], values.min())
+            self.maxs[col] = max(self.maxs[col], values.max())
+        self.n += len(chunk)
+
+        ones = np.ones(len(chunk))
+        _add_keyed(self.by_loan, loan, {'count': ones, 'Income': income, 'CCAvg': ccavg})
+        for level in np.unique(loan).tolist():
+            values = income[loan == level]
+            row = self.by_loan[level]
+            row['Income_min'] = min(row.get('Income_min', np.inf), values.min())
+            row['Income_max'] = max(row.get('Income_max', -np.inf), values.max())
+        _add_keyed(self.by_education, chunk['Education'].to_numpy(),
+                   {'count': ones, 'loans': accepted, 'Income': income, 'CCAvg': ccavg})
+
+        # Right-closed brackets, like pd.cut(Income, INCOME_BRACKET_BINS).
+        codes = np.searchsorted(self.brackets, income, side='left') - 1
+        valid = (codes >= 0) & (codes < len(self.bracket_labels))
+        k = len(self.bracket_labels)
+        self.bracket_count += np.bincount(codes[valid], minlength=k)
+        self.bracket_loans += np.bincount(codes[valid], weights=accepted[valid], minlength=k)
+
+        tiers = self.rules.codes(chunk)
+        k = len(self.rules.labels)
+        self.tier_count += np.bincount(tiers, minlength=k)
+        self.tier_loans += np.bincount(tiers, weights=accepted, minlength=k)
+        self.tier_income += np.bincount(tiers, weights=income, minlength=k)
+        self.tier_ccavg += np.bincount(tiers, weights=ccavg, minlength=k)
+        return self
+
+    def merge(self, other):
+        """Add ``other``'s accumulators into this one (e.g. from another worker)."""
+        self.loans += other.loans
+        for col in STAT_COLUMNS:
+            self.means[col], self.m2[col] = _combine(self.n, self.means[col], self.m2[col],
+                                                     other.n, other.means[col], other.m2[col])
+            self.mins[col] = min(self.mins[col], other.mins[col])
+            self.maxs[col] = max(self.maxs[col], other.maxs[col])
+        for mine, theirs in ((self.by_loan, other.by_loan), (self.by_education, other.by_education)):
+            for level, row in theirs.items():
+                target = mine.setdefault(level, {})
+                for name, value in row.items():
+                    if name.endswith('_min'):
+                        target[name] = min(target.get(name, np.inf), value)
+                    elif name.endswith('_max'):
+                        target[name] = max(target.get(name, -np.inf), value)
+                    else:
+                        target[name] = target.get(name, 0.0) + value
+        self.n += other.n
+        for name in ('bracket_count', 'bracket_loans', 'tier_count', 'tier_loans',
+                     'tier_income', 'tier_ccavg'):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        return self
+
+    def __len__(self):
+        return self.n
+
+    def mean(self, column, loan=None):
+        """Mean of a stat column or ``Personal Loan``; ``loan`` restricts to one status."""
+        if loan is not None:
+            row = self.by_loan.get(loan)
+            if not row:
+                return np.nan
+            if column == 'Personal Loan':
+                return float(loan == 1)
+            return row[column] / row['count']
+        if not self.n:
+            return np.nan
+        if column == 'Personal Loan':
+            return self.loans / self.n
+        return self.means[column]
+
+    def std(self, column):
+        """Sample standard deviation (``ddof=1``, as pandas)."""
+        if self.n < 2:
+            return np.nan
+        return float(np.sqrt(self.m2[column] / (self.n - 1)))
+
+    def loan_income_range(self, loan):
+        row = self.by_loan.get(loan, {})
+        return row.get('Income_min', np.nan), row.get('Income_max', np.nan)
+
+    def education_counts(self):
+        levels = sorted(self.by_education)
+        counts = [self.by_education[level]['count'] for level in levels]
+        return pd.Series(counts, index=pd.Index(levels, name='Education'))
+
+    def conversion_by_income_bracket(self):
+        return conversion_table(self.bracket_count, self.bracket_loans, self.bracket_labels, 'Income_Bracket')
+
+    def conversion_by_education(self):
+        levels = sorted(self.by_education)
+        count = [self.by_education[level]['count'] for level in levels]
+        loans = [self.by_education[level]['loans'] for level in levels]
+        labels = [EDUCATION_LABELS.get(level, str(level)) for level in levels]
+        return conversion_table(count, loans, labels, 'Education_Label').sort_index()
+
+    def tier_summary(self):
+        """Per-tier count, loans, conversion and average Income/CCAvg, in rule order."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            frame = pd.DataFrame({
+                'count': self.tier_count.astype(np.int64),
+                'sum': self.tier_loans,
+                'mean': self.tier_loans / self.tier_count,
+                'Income': self.tier_income / self.tier_count,
+                'CCAvg': self.tier_ccavg / self.tier_count,
+            }, index=pd.Index(self.rules.labels, name='Tier'))
+        return frame[frame['count'] > 0]
+
+    def results(self):
+        """Every section's metrics, with the tables as DataFrames."""
+        return {
+            'customers': self.n,
+            'conversion_rate': self.mean('Personal Loan'),
+            'means': {col: self.mean(col) for col in STAT_COLUMNS},
+            'std': {col: self.std(col) for col in STAT_COLUMNS},
+            'income_by_loan': {
+                str(level): {
+                    'mean': self.mean('Income', loan=level),
+                    'min': self.loan_income_range(level)[0],
+                    'max': self.loan_income_range(level)[1],
+                } for level in sorted(self.by_loan)
+            },
+            'income_brackets': self.conversion_by_income_bracket(),
+            'education': self.conversion_by_education(),
+            'tiers': self.tier_summary(),
+        }
+
+    def to_dict(self):
+        """JSON-friendly summary of every section's metrics."""
+        def records(value):
+            if isinstance(value, pd.DataFrame):
+                return value.reset_index().to_dict(orient='records')
+            return value
+
+        return {key: records(value) for key, value in self.results().items()}
+
+
+def aggregate_file(path, spec=None, chunksize=DEFAULT_CHUNKSIZE):
+    """Stream ``path`` through ``StreamStats``, optionally restricted to ``spec``."""
+    stats = StreamStats()
+    for chunk in filtered_chunks(iter_chunks(path, chunksize), spec):
+        stats.update(chunk)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aggregate a large customer file chunk by chunk.")
+    parser.add_argument('path', help="CSV or Parquet file with the UniversalBank columns")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--income', type=float, nargs=2, metavar=('LOW', 'HIGH'))
+    parser.add_argument('--ccavg', type=float, nargs=2, metavar=('LOW', 'HIGH'))
+    parser.add_argument('--education', type=int, nargs='+')
+    parser.add_argument('--loan', type=int, nargs='+')
+    args = parser.parse_args(argv)
+
+    spec = None
+    if any(v is not None for v in (args.income, args.ccavg, args.education, args.loan)):
+        spec = FilterSpec(
+            income=tuple(args.income or (-np.inf, np.inf)),
+            ccavg=tuple(args.ccavg or (-np.inf, np.inf)),
+            education=tuple(args.education or FilterSpec.education),
+            loan=tuple(args.loan or FilterSpec.loan),
+        )
+    stats = aggregate_file(args.path, spec, args.chunksize)
+    print(json.dumps(stats.to_dict(), indent=2, default=float))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,38 @@
+import argparse
+import atexit
+import functools
+import json
+import os
+import sys
+import time
+_script_start = time.perf_counter()
+
 import streamlit as st
+from streamlit import runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-import seaborn as sns
-import matplotlib.pyplot as plt
+
+import analytics
+from analytics import Dataset
+from batch import DEFAULT_PRESETS
+from charts import (RENDER_MODES, RENDER_ROWS, RENDER_SAMPLED, binned_histogram, density_heatmap,
+                    format_bytes, resolve_mode)
+from data_store import DATA_FILE
+from export import EXPORT_FORMATS, available_formats, export_file
+from filter_index import DEFAULT_FILTERS, EDUCATION_LABELS, LOAN_LABELS, FilterSpec, education_labels
+from intervals import CONFIDENCE, RESAMPLES
+from profiling import (LOG_BACKUPS, LOG_MAX_BYTES, PROFILE_LOG, Profiler, flame_figure, jsonl_logger,
+                       trace_allocations, trace_frame)
+from refresh import DatasetRefresher
+from rerun_stats import SCRIPT, RerunLog
+from result_cache import ResultCache, cache_key, fingerprint
+from scoring import ModelTrainer
+from segmentation import TIER_THRESHOLDS
+from threshold_search import MIN_TIER_SIZE
+from shared_store import SharedDataset, attached_sessions
+from sqlite_backend import BACKENDS, SQL_RESULTS, SqliteBackend
+from warmup import CacheWarmer
 
 # Page configuration
 st.set_page_config(
@@ -15,6 +42,16 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Per-stage profile of every rerun (see profiling.py), written to a rotating
+# JSON-lines log. The panel showing it is hidden unless the page is opened
+# with ?debug=1.
+debug = 'debug' in st.query_params
+_ctx = get_script_run_ctx()
+profiler = st.session_state.setdefault(
+    'profiler', Profiler(jsonl_logger(), session=_ctx.session_id if _ctx is not None else None))
+profiler.reset()
+profiler.start(SCRIPT)
+
 # Title and header
 st.markdown("""
     <style>
@@ -34,96 +71,330 @@ st.markdown("""
     <p style="text-align: center; color: #666;">Data-Driven Customer Segmentation & Marketing Analysis</p>
 """, unsafe_allow_html=True)
 
+# Aggregate backend, chosen at startup:
+#   streamlit run streamlit_dashboard.py -- --backend sqlite
+_parser = argparse.ArgumentParser()
+_parser.add_argument('--backend', choices=BACKENDS, default='pandas')
+backend_name = _parser.parse_known_args(sys.argv[1:])[0].backend
+
 # Load data
-@st.cache_data
-def load_data():
-    df = pd.read_excel('UniversalBank with description.xls', sheet_name='Data', header=3)
-    
-    # Convert numeric columns
-    numeric_cols = ['Age', 'Experience', 'Income', 'Family', 'CCAvg', 'Mortgage', 
-                   'Securities Account', 'CD Account', 'Online', 'CreditCard', 'Personal Loan']
-    for col in numeric_cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    
-    df = df.dropna()
-    return df
+@st.cache_resource
+def load_shared():
+    # The typed .npy sidecar mapped read-only: one frame per process, and the
+    # same page-cache pages for every worker process (see shared_store.py).
+    # The .xls is only parsed when the sidecar is missing or stale. The
+    # process's session registry entry is removed when it exits.
+    shared = SharedDataset(DATA_FILE)
+    atexit.register(shared.close)
+    return shared
+
+@st.cache_resource
+def load_engines():
+    # Filter index, data cube, quantile sketches and moments, built once per process and
+    # shared by every session instead of being re-pickled (see analytics.py).
+    # The refresher folds source changes and delta files into a new Dataset in
+    # the background; each rerun reads the current one (see refresh.py).
+    refresher = DatasetRefresher(Dataset.build(load_shared().df), DATA_FILE).start()
+    # Warm the popular presets as soon as the dataset is built, so the first
+    # session does not pay for them.
+    data = refresher.current
+    load_warmer(data, data.version, load_backend(data, data.version) if backend_name == 'sqlite' else None)
+    return refresher
+
+@st.cache_resource
+def load_results():
+    # Section results and figure JSON keyed by filter state, shared by every
+    # session of the process (see result_cache.py).
+    return ResultCache()
+
+@st.cache_resource
+def load_trainer():
+    # The propensity model of each dataset version: the saved one, else the
+    # newest saved one (so a refresh only rescores), else trained and saved
+    # on a background thread while the explorer shows no scores (see scoring.py).
+    return ModelTrainer()
+
+@st.cache_resource(max_entries=2)
+def load_propensity(_data, version, _model, model_version):
+    # Every customer's score under the model, attached to the table's sort
+    # index as the Propensity column.
+    start = time.perf_counter()
+    scores = _model.score(_data.df)
+    seconds = time.perf_counter() - start
+    _data.sorts.attach(PROPENSITY, scores)
+    return scores, seconds
+
+@st.cache_resource(max_entries=2, on_release=lambda backend: backend.close())
+def load_backend(_data, version):
+    # The SQLite copy of this dataset version and its pooled read-only
+    # connections; the sections it pushes down run as SQL aggregates over it
+    # (see sqlite_backend.py). An evicted version's connections are closed.
+    return SqliteBackend.open(_data)
 
-df = load_data()
+@st.cache_resource(max_entries=2)
+def load_warmer(_data, version, _backend=None):
+    # Computes the popular presets' results into the shared cache in the
+    # background, through the aggregate backend the sections use; one per
+    # process and dataset version (see warmup.py).
+    results = load_results()
+    results.bind(version)
+    return CacheWarmer(_data, results, backend=_backend).start()
+
+def session_active(session_id):
+    return not runtime.exists() or runtime.get_instance().is_active_session(session_id)
+
+with profiler.span('load_data') as span:
+    shared = load_shared()
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        shared.attach(ctx.session_id, is_active=session_active)
+    refresher = load_engines()
+    data = refresher.current
+    df = data.df
+    backend = load_backend(data, data.version) if backend_name == 'sqlite' else None
+    result_cache = load_results()
+    result_cache.bind(data.version)
+    warmer = load_warmer(data, data.version, backend)
+    span.rows = len(df)
+rerun_log = st.session_state.setdefault('rerun_log', RerunLog())
+
+def rerun_unit(name):
+    # A fragment: widgets inside it rerun only this function, not the whole
+    # script. Every run is timed into the session's rerun log; it counts as a
+    # rerun only when the fragment ran on its own (not inside a full run or
+    # an enclosing fragment).
+    def decorate(fn):
+        @st.fragment
+        @functools.wraps(fn)
+        def run():
+            ctx = get_script_run_ctx()
+            isolated = bool(ctx is not None and ctx.fragment_ids_this_run) and not rerun_log.running
+            if isolated:
+                profiler.reset()
+            with rerun_log.timing(name, isolated), profiler.span(name, rows=len(selected)):
+                fn()
+        return run
+    return decorate
+
+def cached(name, compute, *params):
+    # Results for the current filters: computed on the first visit with this
+    # filter state (and params), then served from the process-wide cache.
+    # Cached values are shared, so callers must not modify them.
+    # With the SQLite backend every key carries its name (as the warm-up's do).
+    key = cache_key(name, filter_spec, *params, backend=None if backend is None else backend.name)
+    return result_cache.get_or_compute(key, compute)
+
+def result(name, *params):
+    # One of analytics.SECTION_RESULTS, which the cache warm-up also fills;
+    # with the SQLite backend, the ones it pushes down are SQL queries.
+    def compute():
+        with profiler.span('compute'):
+            if backend is not None and name in SQL_RESULTS:
+                return backend.section_result(filter_spec, name, *params)
+            return analytics.section_result(data, filter_spec, name, *params, selection=selected)
+    with profiler.span(f"result:{name}", rows=len(selected)):
+        return cached(name, compute, *params)
 
 # Sidebar for filters and navigation
 st.sidebar.markdown("## 🎯 Navigation & Filters")
 section = st.sidebar.radio(
     "Select Analysis Section:",
     ["📊 Overview", "📈 Income Analysis", "💳 Credit Card Analysis", 
-     "🎓 Education Analysis", "🎪 VIP Segment", "🎯 Customer Tiers", "📋 Data Explorer"]
+     "🎓 Education Analysis", "🎪 VIP Segment", "🎯 Customer Tiers", "📋 Data Explorer",
+     "🔀 Scenario Comparison"]
 )
 
 # Sidebar filters
 st.sidebar.markdown("---")
 st.sidebar.markdown("## 🔍 Filters")
 
-income_range = st.sidebar.slider(
+filter_mode = st.sidebar.radio(
+    "Filter updates:",
+    ["Live", "On apply"],
+    horizontal=True,
+    key='filter_mode',
+    help="Live reruns the dashboard on every filter change. On apply batches changes "
+         "(e.g. dragging several sliders) into a single rerun when Apply is pressed."
+)
+# Widgets in a form send their values only on submit; the keys keep the
+# values when switching between the two modes.
+filters = st.sidebar.form("filters", border=False) if filter_mode == "On apply" else st.sidebar
+
+income_range = filters.slider(
     "Income Range ($k):",
     int(df['Income'].min()),
     int(df['Income'].max()),
-    (40, 200)
+    (40, 200),
+    key='income_range'
 )
 
-cc_spending_range = st.sidebar.slider(
+cc_spending_range = filters.slider(
     "CC Spending Range ($k/month):",
     float(df['CCAvg'].min()),
     float(df['CCAvg'].max()),
     (0.0, 10.0),
-    step=0.1
+    step=0.1,
+    key='cc_spending_range'
 )
 
-education_filter = st.sidebar.multiselect(
+education_filter = filters.multiselect(
     "Education Level:",
     [1, 2, 3],
     default=[1, 2, 3],
-    format_func=lambda x: {1: "Undergrad", 2: "Graduate", 3: "Professional"}.get(x)
+    format_func=EDUCATION_LABELS.get,
+    key='education_filter'
 )
 
-loan_filter = st.sidebar.multiselect(
+loan_filter = filters.multiselect(
     "Personal Loan Status:",
     [0, 1],
     default=[0, 1],
-    format_func=lambda x: {0: "No Loan", 1: "Accepted Loan"}.get(x)
+    format_func=LOAN_LABELS.get,
+    key='loan_filter'
+)
+
+exact_quantiles = filters.checkbox(
+    "Exact quantiles",
+    value=False,
+    help="Compute medians, quartiles and correlations from the filtered rows instead of the merged sketches and moments.",
+    key='exact_quantiles'
+)
+
+if filter_mode == "On apply":
+    filters.form_submit_button("Apply filters", type="primary")
+
+# Confidence intervals of the conversion rates (see intervals.py). They only
+# need each segment's count and loans, so they cost the same for any number
+# of customers.
+CI_METHODS = {"Wilson": 'wilson', "Poisson bootstrap": 'poisson', "Multinomial bootstrap": 'multinomial', "Off": None}
+CI_RESAMPLES = [200, 500, 1000, 2000, 5000, 10000]
+with st.sidebar.expander("📏 Confidence intervals"):
+    ci_method = CI_METHODS[st.selectbox(
+        "Method:",
+        list(CI_METHODS),
+        key='ci_method',
+        help="Wilson score intervals are closed-form; the bootstraps resample the filtered customers."
+    )]
+    ci_resamples = st.select_slider("Bootstrap resamples:", CI_RESAMPLES, value=RESAMPLES, key='ci_resamples',
+                                    disabled=ci_method in (None, 'wilson'))
+    ci_confidence = st.select_slider("Confidence level:", [0.8, 0.9, 0.95, 0.99], value=CONFIDENCE,
+                                     format_func=lambda c: f"{c:.0%}", key='ci_confidence',
+                                     disabled=ci_method is None)
+# The interval options as cache-key params; the resample count only matters to a bootstrap.
+ci_params = () if ci_method is None else (ci_method, ci_confidence) + (
+    (ci_resamples,) if ci_method != 'wilson' else ())
+
+# Apply filters through the pre-built index (no full-table scan). The selection
+# is row positions into df: sections gather only the columns they use and never
+# write derived columns into a filtered copy.
+with profiler.span('filter') as span:
+    filter_spec = FilterSpec.from_widgets(income_range, cc_spending_range, education_filter, loan_filter)
+    selected = data.select(filter_spec)
+    span.rows = len(selected)
+kpis = result('overview')
+overall, filtered = kpis['overall'], kpis['filtered']
+
+st.sidebar.metric("Filtered Records", filtered['customers'], delta=filtered['customers']-len(df))
+st.sidebar.metric("Conversion Rate", f"{filtered['loan_rate']*100:.1f}%")
+
+workers = attached_sessions(DATA_FILE) or {os.getpid(): shared.sessions}
+st.sidebar.caption(
+    f"Shared dataset: {format_bytes(shared.nbytes)} {'memory-mapped' if shared.mapped else 'in memory'}, "
+    f"{sum(workers.values())} session(s) attached across {len(workers)} worker(s)"
 )
+if backend is not None:
+    st.sidebar.caption(f"Aggregates: SQLite ({os.path.basename(backend.path)}, "
+                       f"{backend.pool.size} pooled connections)")
+if refresher.refreshed is not None:
+    refreshed = refresher.refreshed
+    st.sidebar.caption(
+        f"Data revision {data.revision}: {refreshed['rows']:,} row(s) refreshed at "
+        f"{refreshed['at']:%H:%M:%S} in {refreshed['seconds'] * 1000:,.1f} ms"
+    )
+
+# Header, navigation, filters and the sidebar KPIs are on screen at this point.
+# Plotly is only imported below by the sections that draw figures, so on a
+# fresh worker this is not held up by it (benchmarks/bench_imports.py reads
+# this back to track time-to-first-paint).
+st.session_state.setdefault('first_paint_ms', (time.perf_counter() - _script_start) * 1000)
 
-# Apply filters
-df_filtered = df[
-    (df['Income'] >= income_range[0]) &
-    (df['Income'] <= income_range[1]) &
-    (df['CCAvg'] >= cc_spending_range[0]) &
-    (df['CCAvg'] <= cc_spending_range[1]) &
-    (df['Education'].isin(education_filter)) &
-    (df['Personal Loan'].isin(loan_filter))
-]
+def with_intervals(name, table, *params, rate='mean'):
+    # A section's rate table with the low/high bounds of its rates, cached per
+    # filter state, ``params`` and interval options; as it is when they are off.
+    if ci_method is None:
+        return table
+    return cached(f"{name}:intervals", lambda: analytics.with_intervals(
+        table, rate=rate, total=len(selected), method=ci_method, resamples=ci_resamples, confidence=ci_confidence
+    ), *ci_params, *params)
 
-st.sidebar.metric("Filtered Records", len(df_filtered), delta=len(df_filtered)-len(df))
-st.sidebar.metric("Conversion Rate", f"{df_filtered['Personal Loan'].mean()*100:.1f}%")
+def interval_text(row):
+    # " (95% CI 10.2–16.1%)" for a row of a table from with_intervals
+    if 'low' not in row or pd.isna(row['low']):
+        return ""
+    return f" ({ci_confidence:.0%} CI {row['low']*100:.1f}–{row['high']*100:.1f}%)"
+
+def error_bars(table, rate='mean'):
+    # Plotly error bar arrays (in %) for the rates of a table from with_intervals
+    if 'low' not in table:
+        return {}
+    return {'error_y': ((table['high'] - table[rate]) * 100).to_numpy(),
+            'error_y_minus': ((table[rate] - table['low']) * 100).to_numpy()}
+
+def no_customers():
+    # Sections that chart the filtered customers show a note instead when the
+    # filters leave none.
+    if len(selected):
+        return False
+    st.info("No customers match the current filters.")
+    return True
+
+def chart_mode(key):
+    # Per-chart switch between per-row traces and server-side binning
+    mode = st.selectbox("Rendering", RENDER_MODES, key=key, label_visibility="collapsed")
+    return resolve_mode(mode, len(selected))
+
+def show_chart(name, build, *params, payload=False, key=None):
+    # The figure is built and serialized once per filter state; later visits
+    # only parse the cached JSON. A chart that does not depend on the sidebar
+    # filters passes the ``key`` of what it does depend on instead.
+    def construct():
+        with profiler.span('build figure'):
+            fig = build()
+        with profiler.span('to_json'):
+            return fig.to_json()
+    import plotly.graph_objects as go
+    with profiler.span(f"chart:{name}", rows=len(selected)):
+        if key is None:
+            spec = cached(name, construct, *params)
+        else:
+            spec = result_cache.get_or_compute(key + (name,) + params, construct)
+        with profiler.span('plotly_chart'):
+            # Rebuilt as a Figure: plotly rejects a plain dict without traces.
+            st.plotly_chart(go.Figure(json.loads(spec)), use_container_width=True)
+    if payload:
+        st.caption(f"Plotly payload: {format_bytes(len(spec.encode('utf-8')))}")
 
 # ============================================
 # SECTION 1: OVERVIEW
 # ============================================
-if section == "📊 Overview":
+@rerun_unit("overview")
+def overview_section():
     st.markdown("<h2 class='section-title'>Dashboard Overview</h2>", unsafe_allow_html=True)
     
     col1, col2, col3, col4, col5 = st.columns(5)
     with col1:
-        st.metric("Total Customers", len(df), delta=len(df_filtered))
+        st.metric("Total Customers", len(df), delta=len(selected))
     with col2:
-        st.metric("Loan Rate", f"{df['Personal Loan'].mean()*100:.1f}%", 
-                 delta=f"{(df_filtered['Personal Loan'].mean()-df['Personal Loan'].mean())*100:+.1f}%")
+        st.metric("Loan Rate", f"{overall['loan_rate']*100:.1f}%", 
+                 delta=f"{(filtered['loan_rate']-overall['loan_rate'])*100:+.1f}%")
     with col3:
-        st.metric("Avg Income", f"${df['Income'].mean():.0f}k", 
-                 delta=f"${df_filtered['Income'].mean()-df['Income'].mean():+.0f}k")
+        st.metric("Avg Income", f"${overall['avg_income']:.0f}k", 
+                 delta=f"${filtered['avg_income']-overall['avg_income']:+.0f}k")
     with col4:
-        st.metric("Avg CC Spending", f"${df['CCAvg'].mean():.2f}k", 
-                 delta=f"${df_filtered['CCAvg'].mean()-df['CCAvg'].mean():+.2f}k")
+        st.metric("Avg CC Spending", f"${overall['avg_ccavg']:.2f}k", 
+                 delta=f"${filtered['avg_ccavg']-overall['avg_ccavg']:+.2f}k")
     with col5:
-        st.metric("Filtered Data %", f"{len(df_filtered)/len(df)*100:.1f}%")
+        st.metric("Filtered Data %", f"{len(selected)/len(df)*100:.1f}%")
     
     st.markdown("---")
     
@@ -161,25 +432,27 @@ if section == "📊 Overview":
     
     # Quick stats table
     st.markdown("#### 📊 Quick Statistics")
+    edu_all = overall['education_counts']
+    edu_filtered = filtered['education_counts']
     stats_df = pd.DataFrame({
         'Metric': ['Total Customers', 'Loan Acceptance %', 'Avg Income ($k)', 'Avg CC Spending ($k)', 'Undergrad %', 'Graduate %', 'Professional %'],
         'Overall': [
             f"{len(df):,}",
-            f"{df['Personal Loan'].mean()*100:.1f}%",
-            f"${df['Income'].mean():.1f}",
-            f"${df['CCAvg'].mean():.2f}",
-            f"{(df['Education']==1).sum()/len(df)*100:.1f}%",
-            f"{(df['Education']==2).sum()/len(df)*100:.1f}%",
-            f"{(df['Education']==3).sum()/len(df)*100:.1f}%"
+            f"{overall['loan_rate']*100:.1f}%",
+            f"${overall['avg_income']:.1f}",
+            f"${overall['avg_ccavg']:.2f}",
+            f"{edu_all.get(1, 0)/len(df)*100:.1f}%",
+            f"{edu_all.get(2, 0)/len(df)*100:.1f}%",
+            f"{edu_all.get(3, 0)/len(df)*100:.1f}%"
         ],
         'Filtered': [
-            f"{len(df_filtered):,}",
-            f"{df_filtered['Personal Loan'].mean()*100:.1f}%",
-            f"${df_filtered['Income'].mean():.1f}",
-            f"${df_filtered['CCAvg'].mean():.2f}",
-            f"{(df_filtered['Education']==1).sum()/len(df_filtered)*100:.1f}%" if len(df_filtered) > 0 else "0%",
-            f"{(df_filtered['Education']==2).sum()/len(df_filtered)*100:.1f}%" if len(df_filtered) > 0 else "0%",
-            f"{(df_filtered['Education']==3).sum()/len(df_filtered)*100:.1f}%" if len(df_filtered) > 0 else "0%"
+            f"{len(selected):,}",
+            f"{filtered['loan_rate']*100:.1f}%",
+            f"${filtered['avg_income']:.1f}",
+            f"${filtered['avg_ccavg']:.2f}",
+            f"{edu_filtered.get(1, 0)/len(selected)*100:.1f}%" if len(selected) > 0 else "0%",
+            f"{edu_filtered.get(2, 0)/len(selected)*100:.1f}%" if len(selected) > 0 else "0%",
+            f"{edu_filtered.get(3, 0)/len(selected)*100:.1f}%" if len(selected) > 0 else "0%"
         ]
     })
     st.dataframe(stats_df, use_container_width=True)
@@ -187,30 +460,46 @@ if section == "📊 Overview":
 # ============================================
 # SECTION 2: INCOME ANALYSIS
 # ============================================
-elif section == "📈 Income Analysis":
+@rerun_unit("income")
+def income_section():
+    import plotly.express as px
     st.markdown("<h2 class='section-title'>Income Distribution & Loan Acceptance</h2>", unsafe_allow_html=True)
+    if no_customers():
+        return
     
     col1, col2 = st.columns(2)
     
-    with col1:
+    @rerun_unit("income_histogram")
+    def income_histogram():
         st.markdown("### Distribution by Loan Status")
-        fig = px.histogram(
-            df_filtered,
-            x='Income',
-            color='Personal Loan',
-            nbins=50,
-            title='Income Distribution',
-            labels={'Personal Loan': 'Loan Status', 'Income': 'Income ($k)'},
-            color_discrete_map={0: '#1f77b4', 1: '#ff7f0e'}
-        )
-        fig.update_xaxes(title_text='Income ($k)')
-        fig.update_yaxes(title_text='Number of Customers')
-        st.plotly_chart(fig, use_container_width=True)
-    
-    with col2:
-        st.markdown("### Box Plot by Loan Status")
+        mode = chart_mode("income_hist_mode")
+        
+        def build():
+            if mode == RENDER_ROWS:
+                fig = px.histogram(
+                    selected.frame(['Income', 'Personal Loan']),
+                    x='Income',
+                    color='Personal Loan',
+                    nbins=50,
+                    title='Income Distribution',
+                    labels={'Personal Loan': 'Loan Status', 'Income': 'Income ($k)'},
+                    color_discrete_map={0: '#1f77b4', 1: '#ff7f0e'}
+                )
+            else:
+                fig = binned_histogram(
+                    selected['Income'],
+                    selected['Personal Loan'],
+                    nbins=50,
+                    title='Income Distribution'
+                )
+            fig.update_xaxes(title_text='Income ($k)')
+            fig.update_yaxes(title_text='Number of Customers')
+            return fig
+        show_chart("income_histogram", build, mode, payload=True)
+    
+    def income_box():
         fig = px.box(
-            df_filtered,
+            selected.frame(['Personal Loan', 'Income']),
             x='Personal Loan',
             y='Income',
             title='Income Distribution (Box Plot)',
@@ -220,125 +509,160 @@ elif section == "📈 Income Analysis":
         fig.update_xaxes(title_text='Loan Status', 
                         ticktext=['No Loan', 'Accepted Loan'],
                         tickvals=[0, 1])
-        st.plotly_chart(fig, use_container_width=True)
+        return fig
+    
+    with col1:
+        income_histogram()
+    
+    with col2:
+        st.markdown("### Box Plot by Loan Status")
+        show_chart("income_box", income_box)
     
     # Income statistics by loan status
     st.markdown("### Income Statistics by Loan Status")
     col1, col2 = st.columns(2)
     
-    income_loan = df_filtered[df_filtered['Personal Loan'] == 1]['Income']
-    income_no_loan = df_filtered[df_filtered['Personal Loan'] == 0]['Income']
+    income = result('income', exact_quantiles)
+    income_loan = income['by_loan'][1]
+    income_no_loan = income['by_loan'][0]
     
     with col1:
-        st.metric("Loan Customers - Avg Income", f"${income_loan.mean():.1f}k", 
-                 delta=f"${income_loan.mean()-df_filtered['Income'].mean():+.1f}k")
-        st.metric("Loan Customers - Min Income", f"${income_loan.min():.1f}k")
-        st.metric("Loan Customers - Median Income", f"${income_loan.median():.1f}k")
+        st.metric("Loan Customers - Avg Income", f"${income_loan['mean']:.1f}k", 
+                 delta=f"${income_loan['mean']-income['avg_income']:+.1f}k")
+        st.metric("Loan Customers - Min Income", f"${income_loan['min']:.1f}k")
+        st.metric("Loan Customers - Median Income", f"${income_loan['median']:.1f}k")
     
     with col2:
-        st.metric("Non-Loan Customers - Avg Income", f"${income_no_loan.mean():.1f}k",
-                 delta=f"${income_no_loan.mean()-df_filtered['Income'].mean():+.1f}k")
-        st.metric("Non-Loan Customers - Max Income", f"${income_no_loan.max():.1f}k")
-        st.metric("Non-Loan Customers - Median Income", f"${income_no_loan.median():.1f}k")
+        st.metric("Non-Loan Customers - Avg Income", f"${income_no_loan['mean']:.1f}k",
+                 delta=f"${income_no_loan['mean']-income['avg_income']:+.1f}k")
+        st.metric("Non-Loan Customers - Max Income", f"${income_no_loan['max']:.1f}k")
+        st.metric("Non-Loan Customers - Median Income", f"${income_no_loan['median']:.1f}k")
     
     # Income vs conversion rate
     st.markdown("### Conversion Rate by Income Bracket")
-    income_bins = [0, 40, 80, 120, 160, 224]
-    income_labels = ['<$40k', '$40-80k', '$80-120k', '$120-160k', '>$160k']
-    df_filtered['Income_Bracket'] = pd.cut(df_filtered['Income'], bins=income_bins, labels=income_labels)
-    
-    conversion_by_income = df_filtered.groupby('Income_Bracket', observed=True)['Personal Loan'].agg(['mean', 'count'])
-    conversion_by_income['mean'] = conversion_by_income['mean'] * 100
-    
-    fig = px.bar(
-        conversion_by_income.reset_index(),
-        x='Income_Bracket',
-        y='mean',
-        title='Conversion Rate by Income Bracket',
-        labels={'mean': 'Conversion Rate (%)', 'Income_Bracket': 'Income Bracket'},
-        color='mean',
-        color_continuous_scale='RdYlGn'
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    
+    brackets = with_intervals('income_brackets', income['brackets'])
+    
+    def income_brackets():
+        conversion_by_income = brackets.assign(mean=brackets['mean'] * 100)
+        return px.bar(
+            conversion_by_income.reset_index(),
+            x='Income_Bracket',
+            y='mean',
+            title='Conversion Rate by Income Bracket',
+            labels={'mean': 'Conversion Rate (%)', 'Income_Bracket': 'Income Bracket'},
+            color='mean',
+            color_continuous_scale='RdYlGn',
+            **error_bars(brackets)
+        )
+    show_chart("income_brackets", income_brackets, *ci_params)
 
 # ============================================
 # SECTION 3: CREDIT CARD ANALYSIS
 # ============================================
-elif section == "💳 Credit Card Analysis":
+@rerun_unit("credit_card")
+def credit_card_section():
+    import plotly.express as px
     st.markdown("<h2 class='section-title'>Credit Card Spending Analysis</h2>", unsafe_allow_html=True)
+    if no_customers():
+        return
     
     col1, col2 = st.columns(2)
     
-    with col1:
+    @rerun_unit("cc_histogram")
+    def cc_histogram():
         st.markdown("### CC Spending Distribution")
-        fig = px.histogram(
-            df_filtered,
-            x='CCAvg',
-            color='Personal Loan',
-            nbins=50,
-            title='CC Spending Distribution',
-            labels={'CCAvg': 'Monthly CC Spending ($k)', 'Personal Loan': 'Loan Status'},
-            color_discrete_map={0: '#1f77b4', 1: '#ff7f0e'}
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        mode = chart_mode("cc_hist_mode")
+        
+        def build():
+            if mode == RENDER_ROWS:
+                return px.histogram(
+                    selected.frame(['CCAvg', 'Personal Loan']),
+                    x='CCAvg',
+                    color='Personal Loan',
+                    nbins=50,
+                    title='CC Spending Distribution',
+                    labels={'CCAvg': 'Monthly CC Spending ($k)', 'Personal Loan': 'Loan Status'},
+                    color_discrete_map={0: '#1f77b4', 1: '#ff7f0e'}
+                )
+            return binned_histogram(
+                selected['CCAvg'],
+                selected['Personal Loan'],
+                nbins=50,
+                title='CC Spending Distribution',
+                x_title='Monthly CC Spending ($k)'
+            )
+        show_chart("cc_histogram", build, mode, payload=True)
     
-    with col2:
+    @rerun_unit("cc_scatter")
+    def cc_scatter():
         st.markdown("### Income vs CC Spending (Scatter)")
-        fig = px.scatter(
-            df_filtered,
-            x='Income',
-            y='CCAvg',
-            color='Personal Loan',
-            title='Income vs CC Spending',
-            labels={'Income': 'Income ($k)', 'CCAvg': 'Monthly CC Spending ($k)', 'Personal Loan': 'Loan Status'},
-            color_discrete_map={0: '#1f77b4', 1: '#ff7f0e'},
-            opacity=0.6
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        scatter_mode = chart_mode("cc_scatter_mode")
+        
+        def build():
+            if scatter_mode == RENDER_ROWS:
+                return px.scatter(
+                    selected.frame(['Income', 'CCAvg', 'Personal Loan']),
+                    x='Income',
+                    y='CCAvg',
+                    color='Personal Loan',
+                    title='Income vs CC Spending',
+                    labels={'Income': 'Income ($k)', 'CCAvg': 'Monthly CC Spending ($k)', 'Personal Loan': 'Loan Status'},
+                    color_discrete_map={0: '#1f77b4', 1: '#ff7f0e'},
+                    opacity=0.6
+                )
+            return density_heatmap(
+                selected['Income'],
+                selected['CCAvg'],
+                selected['Personal Loan'],
+                title='Income vs CC Spending (density)',
+                x_title='Income ($k)',
+                y_title='Monthly CC Spending ($k)',
+                sample_per_group=500 if scatter_mode == RENDER_SAMPLED else 0
+            )
+        show_chart("cc_scatter", build, scatter_mode, payload=True)
+    
+    with col1:
+        cc_histogram()
+    with col2:
+        cc_scatter()
     
     # Outlier detection
     st.markdown("### VIP Outlier Detection (High Spenders)")
-    Q1 = df_filtered['CCAvg'].quantile(0.25)
-    Q3 = df_filtered['CCAvg'].quantile(0.75)
-    IQR = Q3 - Q1
-    outlier_threshold = Q3 + 1.5 * IQR
-    
-    outliers = df_filtered[df_filtered['CCAvg'] > outlier_threshold]
-    normal = df_filtered[df_filtered['CCAvg'] <= outlier_threshold]
+    cc = result('credit_card', exact_quantiles)
     
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Outlier Customers", len(outliers), delta=f"{len(outliers)/len(df_filtered)*100:.1f}%")
+        st.metric("Outlier Customers", cc['outliers'], delta=f"{cc['outlier_share']*100:.1f}%")
     with col2:
-        st.metric("Outlier Conversion Rate", f"{outliers['Personal Loan'].mean()*100:.1f}%",
-                 delta=f"{(outliers['Personal Loan'].mean()-normal['Personal Loan'].mean())*100:+.1f}%")
+        st.metric("Outlier Conversion Rate", f"{cc['outlier_rate']*100:.1f}%",
+                 delta=f"{(cc['outlier_rate']-cc['normal_rate'])*100:+.1f}%")
     with col3:
-        st.metric("Outlier Threshold", f"${outlier_threshold:.2f}k")
+        st.metric("Outlier Threshold", f"${cc['threshold']:.2f}k")
     
     st.info(f"""
     ### 🎪 VIP Segment Insights:
-    - **High Spenders (>$5k/month)**: {len(outliers)} customers ({len(outliers)/len(df_filtered)*100:.1f}%)
-    - **Conversion Rate**: {outliers['Personal Loan'].mean()*100:.1f}% (vs {normal['Personal Loan'].mean()*100:.1f}% for normal)
-    - **Relative Performance**: {outliers['Personal Loan'].mean()/normal['Personal Loan'].mean():.1f}x better than average
+    - **High Spenders (>$5k/month)**: {cc['outliers']} customers ({cc['outlier_share']*100:.1f}%)
+    - **Conversion Rate**: {cc['outlier_rate']*100:.1f}% (vs {cc['normal_rate']*100:.1f}% for normal)
+    - **Relative Performance**: {cc['outlier_rate']/cc['normal_rate']:.1f}x better than average
     - **Recommendation**: Premium service tier with dedicated account managers
     """)
 
 # ============================================
 # SECTION 4: EDUCATION ANALYSIS
 # ============================================
-elif section == "🎓 Education Analysis":
+@rerun_unit("education")
+def education_section():
+    import plotly.express as px
     st.markdown("<h2 class='section-title'>Education Level Impact</h2>", unsafe_allow_html=True)
+    if no_customers():
+        return
     
-    education_map = {1: 'Undergrad', 2: 'Graduate', 3: 'Professional'}
-    df_filtered['Education_Label'] = df_filtered['Education'].map(education_map)
-    
-    col1, col2 = st.columns(2)
+    education = result('education')
+    conversion = with_intervals('education_conversion', education['conversion'])
     
-    with col1:
-        st.markdown("### Conversion Rate by Education")
-        education_stats = df_filtered.groupby('Education_Label', observed=True)['Personal Loan'].agg(['mean', 'count'])
-        education_stats['mean'] = education_stats['mean'] * 100
-        
+    def education_conversion():
+        education_stats = conversion.assign(mean=conversion['mean'] * 100)
         fig = px.bar(
             education_stats.reset_index(),
             x='Education_Label',
@@ -347,73 +671,81 @@ elif section == "🎓 Education Analysis":
             labels={'mean': 'Conversion Rate (%)', 'Education_Label': 'Education Level'},
             color='mean',
             color_continuous_scale='Viridis',
-            text='mean'
+            text='mean',
+            **error_bars(conversion)
         )
         fig.update_traces(texttemplate='%{text:.1f}%', textposition='outside')
-        st.plotly_chart(fig, use_container_width=True)
-    
-    with col2:
-        st.markdown("### Income by Education Level")
-        fig = px.box(
-            df_filtered,
+        return fig
+    
+    def education_income():
+        return px.box(
+            pd.DataFrame({
+                'Education_Label': selected.derive('Education_Label', lambda rows: education_labels(rows['Education'])),
+                'Income': selected['Income'],
+            }),
             x='Education_Label',
             y='Income',
             title='Income Distribution by Education',
             labels={'Education_Label': 'Education Level', 'Income': 'Income ($k)'},
             color_discrete_sequence=['#1f77b4', '#ff7f0e', '#2ca02c']
         )
-        st.plotly_chart(fig, use_container_width=True)
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("### Conversion Rate by Education")
+        show_chart("education_conversion", education_conversion, *ci_params)
+    
+    with col2:
+        st.markdown("### Income by Education Level")
+        show_chart("education_income", education_income)
     
     # Education statistics
     st.markdown("### Detailed Education Statistics")
-    edu_stats = df_filtered.groupby('Education_Label', observed=True).agg({
-        'Personal Loan': ['count', 'sum', 'mean'],
-        'Income': ['mean', 'median', 'min', 'max'],
-        'CCAvg': 'mean'
-    }).round(2)
-    
-    edu_stats.columns = ['Count', 'Loan_Count', 'Loan_Rate', 'Avg_Income', 'Median_Income', 'Min_Income', 'Max_Income', 'Avg_CC']
+    edu_stats = education['details'].round(2)
     edu_stats['Loan_Rate'] = (edu_stats['Loan_Rate'] * 100).round(1).astype(str) + '%'
+    if 'low' in conversion:
+        edu_stats[f'Loan_Rate_{ci_confidence:.0%}_CI'] = [
+            f"{low*100:.1f}–{high*100:.1f}%" for low, high in conversion.loc[edu_stats.index, ['low', 'high']].values]
     
     st.dataframe(edu_stats, use_container_width=True)
 
 # ============================================
 # SECTION 5: VIP SEGMENT
 # ============================================
-elif section == "🎪 VIP Segment":
+@rerun_unit("vip")
+def vip_section():
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
     st.markdown("<h2 class='section-title'>VIP Customer Segment Analysis</h2>", unsafe_allow_html=True)
-    
-    # Define VIP tiers
-    vip_tier1 = df_filtered[
-        (df_filtered['Income'] >= 150) &
-        (df_filtered['CCAvg'] >= 4) &
-        (df_filtered['Education'].isin([2, 3]))
-    ]
-    
-    vip_tier2 = df_filtered[
-        (df_filtered['Income'] >= 100) &
-        (df_filtered['Income'] < 150) &
-        (df_filtered['CCAvg'] >= 2) &
-        (df_filtered['CCAvg'] < 4) &
-        (df_filtered['Education'].isin([2, 3]))
-    ]
-    
-    outlier_threshold = df_filtered['CCAvg'].quantile(0.75) + 1.5 * (df_filtered['CCAvg'].quantile(0.75) - df_filtered['CCAvg'].quantile(0.25))
-    vip_outliers = df_filtered[df_filtered['CCAvg'] > outlier_threshold]
+    if no_customers():
+        return
+    
+    # Define VIP tiers (thresholds live in segmentation.TIER_THRESHOLDS)
+    vip = result('vip', exact_quantiles)
+    segments = with_intervals('vip_segments', vip['segments'], exact_quantiles, rate='conversion')
+    vip_tier1 = segments.loc['Tier 1 (VIP)']
+    vip_tier2 = segments.loc['Tier 2 (Core)']
+    vip_outliers = segments.loc[analytics.HIGH_SPENDERS]
+    outlier_threshold = vip['threshold']
+    t = TIER_THRESHOLDS
     
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.metric("Tier 1 (VIP)", len(vip_tier1), delta=f"{len(vip_tier1)/len(df_filtered)*100:.1f}%")
-        st.metric("T1 Conversion", f"{vip_tier1['Personal Loan'].mean()*100:.1f}%")
+        st.metric("Tier 1 (VIP)", int(vip_tier1['count']), delta=f"{vip_tier1['share']*100:.1f}%")
+        st.metric("T1 Conversion", f"{vip_tier1['conversion']*100:.1f}%",
+                  help=interval_text(vip_tier1).strip() or None)
     
     with col2:
-        st.metric("Tier 2 (Core)", len(vip_tier2), delta=f"{len(vip_tier2)/len(df_filtered)*100:.1f}%")
-        st.metric("T2 Conversion", f"{vip_tier2['Personal Loan'].mean()*100:.1f}%")
+        st.metric("Tier 2 (Core)", int(vip_tier2['count']), delta=f"{vip_tier2['share']*100:.1f}%")
+        st.metric("T2 Conversion", f"{vip_tier2['conversion']*100:.1f}%",
+                  help=interval_text(vip_tier2).strip() or None)
     
     with col3:
-        st.metric("High Spenders", len(vip_outliers), delta=f"{len(vip_outliers)/len(df_filtered)*100:.1f}%")
-        st.metric("HS Conversion", f"{vip_outliers['Personal Loan'].mean()*100:.1f}%")
+        st.metric("High Spenders", int(vip_outliers['count']), delta=f"{vip_outliers['share']*100:.1f}%")
+        st.metric("HS Conversion", f"{vip_outliers['conversion']*100:.1f}%",
+                  help=interval_text(vip_outliers).strip() or None)
     
     st.markdown("---")
     
@@ -423,11 +755,11 @@ elif section == "🎪 VIP Segment":
     with col1:
         st.markdown("#### 🌟 Tier 1: Premium VIP")
         st.write(f"""
-        - **Income**: $150k+
-        - **CC Spending**: $4k+/month
+        - **Income**: ${t['income_vip']}k+
+        - **CC Spending**: ${t['cc_vip']}k+/month
         - **Education**: Graduate/Professional
-        - **Count**: {len(vip_tier1)} customers
-        - **Conversion**: {vip_tier1['Personal Loan'].mean()*100:.1f}%
+        - **Count**: {int(vip_tier1['count'])} customers
+        - **Conversion**: {vip_tier1['conversion']*100:.1f}%{interval_text(vip_tier1)}
         - **Action**: Dedicated account managers
         - **Expected ROI**: 35-40%
         """)
@@ -435,11 +767,11 @@ elif section == "🎪 VIP Segment":
     with col2:
         st.markdown("#### ⭐ Tier 2: Core Targets")
         st.write(f"""
-        - **Income**: $100k-150k
-        - **CC Spending**: $2k-4k/month
+        - **Income**: ${t['income_core']}k-{t['income_vip']}k
+        - **CC Spending**: ${t['cc_core']}k-{t['cc_vip']}k/month
         - **Education**: Graduate/Professional
-        - **Count**: {len(vip_tier2)} customers
-        - **Conversion**: {vip_tier2['Personal Loan'].mean()*100:.1f}%
+        - **Count**: {int(vip_tier2['count'])} customers
+        - **Conversion**: {vip_tier2['conversion']*100:.1f}%{interval_text(vip_tier2)}
         - **Action**: Email/phone campaigns
         - **Expected ROI**: 18-22%
         """)
@@ -448,9 +780,9 @@ elif section == "🎪 VIP Segment":
         st.markdown("#### 💎 High Spenders")
         st.write(f"""
         - **CC Spending**: > ${outlier_threshold:.1f}k/month
-        - **Count**: {len(vip_outliers)} customers
-        - **Conversion**: {vip_outliers['Personal Loan'].mean()*100:.1f}%
-        - **Avg Income**: ${vip_outliers['Income'].mean():.0f}k
+        - **Count**: {int(vip_outliers['count'])} customers
+        - **Conversion**: {vip_outliers['conversion']*100:.1f}%{interval_text(vip_outliers)}
+        - **Avg Income**: ${vip_outliers['avg_income']:.0f}k
         - **Action**: Premium products
         - **Expected ROI**: 25-32%
         """)
@@ -458,59 +790,47 @@ elif section == "🎪 VIP Segment":
     # Visualization: VIP segments comparison
     st.markdown("### VIP Segment Comparison")
     
-    fig = go.Figure()
-    
-    segments = ['Tier 1 (VIP)', 'Tier 2 (Core)', 'High Spenders']
-    counts = [len(vip_tier1), len(vip_tier2), len(vip_outliers)]
-    conversions = [
-        vip_tier1['Personal Loan'].mean() * 100,
-        vip_tier2['Personal Loan'].mean() * 100,
-        vip_outliers['Personal Loan'].mean() * 100
-    ]
-    
-    fig = make_subplots(
-        rows=1, cols=2,
-        specs=[[{'type': 'pie'}, {'type': 'bar'}]]
-    )
-    
-    fig.add_trace(
-        go.Pie(labels=segments, values=counts, name='Count', hole=0.3),
-        row=1, col=1
-    )
-    
-    fig.add_trace(
-        go.Bar(x=segments, y=conversions, name='Conversion Rate', 
-               marker_color=['#2ca02c', '#ff7f0e', '#d62728']),
-        row=1, col=2
-    )
-    
-    fig.update_yaxes(title_text='Conversion Rate (%)', row=1, col=2)
-    fig.update_layout(height=400, title_text='VIP Segments: Size and Conversion')
-    
-    st.plotly_chart(fig, use_container_width=True)
+    def vip_comparison():
+        bars = error_bars(segments, rate='conversion')
+        error_y = dict(type='data', array=bars['error_y'], arrayminus=bars['error_y_minus']) if bars else None
+        
+        fig = make_subplots(
+            rows=1, cols=2,
+            specs=[[{'type': 'pie'}, {'type': 'bar'}]]
+        )
+        
+        fig.add_trace(
+            go.Pie(labels=list(segments.index), values=segments['count'].tolist(), name='Count', hole=0.3),
+            row=1, col=1
+        )
+        
+        fig.add_trace(
+            go.Bar(x=list(segments.index), y=(segments['conversion'] * 100).tolist(), name='Conversion Rate',
+                   marker_color=['#2ca02c', '#ff7f0e', '#d62728'], error_y=error_y),
+            row=1, col=2
+        )
+        
+        fig.update_yaxes(title_text='Conversion Rate (%)', row=1, col=2)
+        fig.update_layout(height=400, title_text='VIP Segments: Size and Conversion')
+        return fig
+    show_chart("vip_comparison", vip_comparison, exact_quantiles, *ci_params)
 
 # ============================================
 # SECTION 6: CUSTOMER TIERS
 # ============================================
-elif section == "🎯 Customer Tiers":
+@rerun_unit("tiers")
+def tiers_section():
+    import plotly.express as px
     st.markdown("<h2 class='section-title'>3-Tier Customer Segmentation Model</h2>", unsafe_allow_html=True)
+    if no_customers():
+        return
     
-    # Create tiering logic
-    def assign_tier(row):
-        if (row['Income'] >= 150) and (row['CCAvg'] >= 4) and (row['Education'] in [2, 3]):
-            return 'Tier 1: VIP'
-        elif (row['Income'] >= 100) and (row['Income'] < 150) and (row['CCAvg'] >= 2) and (row['Education'] in [2, 3]):
-            return 'Tier 2: Core'
-        elif (row['Income'] >= 80) and (row['CCAvg'] >= 1):
-            return 'Tier 3: Secondary'
-        else:
-            return 'Do Not Pursue'
-    
-    df_filtered['Tier'] = df_filtered.apply(assign_tier, axis=1)
-    
-    # Tier distribution
-    tier_counts = df_filtered['Tier'].value_counts()
-    tier_conversion = df_filtered.groupby('Tier')['Personal Loan'].agg(['mean', 'count', 'sum'])
+    # Tiering logic is declared in segmentation.CUSTOMER_TIERS (one np.select pass);
+    # Tier 1 cut-offs applied from the threshold optimizer replace the defaults.
+    tier_thresholds = st.session_state.get('tier_thresholds', ())
+    tier_params = (tier_thresholds,) if tier_thresholds else ()
+    tier_conversion = with_intervals('tiers', result('tiers', *tier_params), *tier_params)
+    tier_counts = tier_conversion['count'].sort_values(ascending=False)
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -526,11 +846,85 @@ elif section == "🎯 Customer Tiers":
                 with col:
                     st.metric(
                         tier,
-                        f"{count} ({count/len(df_filtered)*100:.1f}%)",
+                        f"{count} ({tier_conversion.loc[tier, 'share']*100:.1f}%)",
                         delta=f"Conv: {conv_rate:.1f}%",
-                        delta_color="normal" if idx < 3 else "off"
+                        delta_color="normal" if idx < 3 else "off",
+                        help=interval_text(tier_conversion.loc[tier]).strip() or None
                     )
     
+    if tier_thresholds:
+        t = dict(tier_thresholds)
+        st.caption(f"Tier 1 cut-offs from the optimizer: Income ≥ ${t['income_vip']}k, CC spending ≥ "
+                   f"${t['cc_vip']:.1f}k/month, {', '.join(EDUCATION_LABELS[e] for e in t['education_target'])}")
+    
+    @rerun_unit("tier_optimizer")
+    def tier_optimizer():
+        # Every Income x CCAvg x education cut-off for Tier 1, evaluated from
+        # cumulative count tables (see threshold_search.py)
+        search = result('tier_frontier')
+        frontier = search['frontier']
+        if frontier.empty:
+            st.info(f"No Tier 1 cut-offs select {MIN_TIER_SIZE} or more customers with the current filters.")
+            return
+        current = tier_conversion.loc['Tier 1: VIP'] if 'Tier 1: VIP' in tier_conversion.index else None
+        
+        if st.session_state.get('tier_pick') not in range(len(frontier)):
+            st.session_state.pop('tier_pick', None)
+        nearest = int(np.abs(frontier['count'] - (current['count'] if current is not None else 0)).argmin())
+        pick = st.select_slider(
+            "Tier 1 size:",
+            options=range(len(frontier)),
+            value=nearest,
+            format_func=lambda i: f"{frontier['count'][i]:,} ({frontier['conversion'][i]*100:.1f}%)",
+            key='tier_pick'
+        )
+        point = frontier.iloc[pick]
+        
+        def frontier_chart():
+            fig = px.line(
+                frontier.assign(conversion=frontier['conversion'] * 100),
+                x='count',
+                y='conversion',
+                markers=True,
+                hover_data=['income', 'ccavg', 'education'],
+                title='Best Tier 1 Conversion by Tier Size',
+                labels={'count': 'Tier 1 customers', 'conversion': 'Conversion Rate (%)',
+                        'income': 'Income ≥ ($k)', 'ccavg': 'CC spending ≥ ($k)', 'education': 'Education'}
+            )
+            if current is not None:
+                fig.add_scatter(x=[current['count']], y=[current['mean'] * 100], mode='markers', name='Current',
+                                marker=dict(symbol='star', size=14, color='#d62728'))
+            fig.add_scatter(x=[point['count']], y=[point['conversion'] * 100], mode='markers', name='Selected',
+                            marker=dict(size=14, color='#2ca02c'))
+            return fig
+        show_chart("tier_frontier", frontier_chart, pick, *tier_params)
+        
+        st.markdown(
+            f"**Income** ≥ ${point['income']}k · **CC spending** ≥ ${point['ccavg']:.1f}k/month · **Education**: "
+            f"{', '.join(EDUCATION_LABELS[e] for e in point['education'])} → **{point['count']:,}** customers, "
+            f"**{point['conversion']*100:.1f}%** conversion"
+        )
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("Apply to tiers", type="primary", key='tier_apply'):
+                st.session_state['tier_thresholds'] = (
+                    ('cc_vip', round(float(point['ccavg']), 6)),
+                    ('education_target', tuple(int(e) for e in point['education'])),
+                    ('income_vip', int(point['income'])),
+                )
+                st.rerun()
+        with col2:
+            if st.button("Reset to defaults", key='tier_reset', disabled=not tier_thresholds):
+                st.session_state.pop('tier_thresholds', None)
+                st.rerun()
+        st.caption(f"{search['candidates']:,} cut-off combinations evaluated for the filtered customers; the curve "
+                   f"keeps the best conversion for each Tier 1 size (at least {MIN_TIER_SIZE}). Tier 2 keeps "
+                   f"Income from the core cut-off up to the Tier 1 one, with the same education levels.")
+    
+    if st.toggle("🔧 Optimize Tier 1 thresholds", key='tier_optimizer',
+                 help="Search Income, CC spending and education cut-offs for the best conversion at each tier size."):
+        tier_optimizer()
+    
     st.markdown("---")
     
     # Tier comparison chart
@@ -538,8 +932,8 @@ elif section == "🎯 Customer Tiers":
     
     col1, col2 = st.columns(2)
     
-    with col1:
-        fig = px.pie(
+    def tier_distribution():
+        return px.pie(
             tier_counts.reset_index(),
             values='count',
             names='Tier',
@@ -547,10 +941,10 @@ elif section == "🎯 Customer Tiers":
             color_discrete_sequence=['#2ca02c', '#ff7f0e', '#1f77b4', '#d62728'],
             hole=0.3
         )
-        st.plotly_chart(fig, use_container_width=True)
     
-    with col2:
-        tier_conv_sorted = tier_conversion['mean'].sort_values(ascending=False) * 100
+    def tier_conversion_rates():
+        tiers_sorted = tier_conversion.sort_values('mean', ascending=False)
+        tier_conv_sorted = tiers_sorted['mean'] * 100
         fig = px.bar(
             x=tier_conv_sorted.index,
             y=tier_conv_sorted.values,
@@ -558,26 +952,33 @@ elif section == "🎯 Customer Tiers":
             labels={'x': 'Tier', 'y': 'Conversion Rate (%)'},
             color=tier_conv_sorted.values,
             color_continuous_scale='RdYlGn',
-            text=tier_conv_sorted.values.round(1)
+            text=tier_conv_sorted.values.round(1),
+            **error_bars(tiers_sorted)
         )
         fig.update_traces(texttemplate='%{text:.1f}%', textposition='outside')
-        st.plotly_chart(fig, use_container_width=True)
+        return fig
+    
+    with col1:
+        show_chart("tier_distribution", tier_distribution, *tier_params)
+    
+    with col2:
+        show_chart("tier_conversion", tier_conversion_rates, *tier_params, *ci_params)
     
     # Detailed tier analysis
     st.markdown("### Tier Details & Recommendations")
     
     for tier, color in zip(tiers_order, colors):
-        if tier in df_filtered['Tier'].values:
-            tier_data = df_filtered[df_filtered['Tier'] == tier]
+        if tier in tier_counts.index:
+            tier_data = tier_conversion.loc[tier]
             col1, col2 = st.columns(2)
             
             with col1:
                 st.markdown(f"### 🎯 {tier}")
                 st.write(f"""
-                **Size**: {len(tier_data)} customers ({len(tier_data)/len(df_filtered)*100:.1f}%)
-                **Conversion**: {tier_data['Personal Loan'].mean()*100:.1f}%
-                **Avg Income**: ${tier_data['Income'].mean():.0f}k
-                **Avg CC Spending**: ${tier_data['CCAvg'].mean():.2f}k/month
+                **Size**: {int(tier_data['count'])} customers ({tier_data['share']*100:.1f}%)
+                **Conversion**: {tier_data['mean']*100:.1f}%{interval_text(tier_data)}
+                **Avg Income**: ${tier_data['Income']:.0f}k
+                **Avg CC Spending**: ${tier_data['CCAvg']:.2f}k/month
                 """)
             
             with col2:
@@ -595,35 +996,120 @@ elif section == "🎯 Customer Tiers":
 # ============================================
 # SECTION 7: DATA EXPLORER
 # ============================================
-elif section == "📋 Data Explorer":
+PROPENSITY = 'Propensity'
+TABLE_COLUMNS = ['ID', 'Age', 'Income', 'CCAvg', 'Education', 'Mortgage', 'Personal Loan', PROPENSITY]
+TABLE_PAGE_SIZES = [25, 50, 100, 250, 500]
+
+@rerun_unit("explorer")
+def explorer_section():
+    import plotly.express as px
     st.markdown("<h2 class='section-title'>Interactive Data Explorer</h2>", unsafe_allow_html=True)
     
     tab1, tab2, tab3 = st.tabs(["📊 Raw Data", "📈 Statistics", "🔗 Correlations"])
     
-    with tab1:
-        st.markdown("### Filtered Dataset")
+    @rerun_unit("download")
+    def download_panel():
+        st.markdown("### Download Data")
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            export_columns = st.multiselect("Columns to export:", list(df.columns), default=list(df.columns))
+        with col2:
+            export_format = st.selectbox("Format:", available_formats())
+        export_spec = filter_spec
+        fmt = EXPORT_FORMATS[export_format]
+        # The file is only built (in chunks) when the button is clicked
+        st.download_button(
+            label=f"Download filtered data as {export_format}",
+            data=lambda: export_file(df, export_format, data.index.rows(export_spec), export_columns),
+            file_name=f"filtered_customers.{fmt.extension}",
+            mime=fmt.mime,
+            disabled=not export_columns
+        )
+    
+    def first_page():
+        st.session_state['table_page'] = 1
+    
+    @st.fragment(run_every=2)
+    def training_status():
+        # Shown while the propensity model trains; the page reruns with the
+        # scores once it is saved.
+        trainer = load_trainer()
+        if trainer.training(data.version):
+            st.caption("Propensity model training… scores appear here when it finishes.")
+        elif trainer.errors:
+            st.caption(f"Propensity model training failed: {trainer.errors[-1]}")
+        else:
+            st.rerun()
+    
+    @rerun_unit("table")
+    def data_table():
+        # Sorted and paged on the server (see sort_index.py): the filtered rows
+        # are ordered once per filter state and sort column, each page is a
+        # slice of that order, and only the visible page is sent to the browser.
+        model = load_trainer().model(df, data.version)
+        if model is None:
+            scores, min_score, table_columns = None, 0.0, [c for c in TABLE_COLUMNS if c != PROPENSITY]
+            training_status()
+        else:
+            scores, score_seconds = load_propensity(data, data.version, model, model.version)
+            table_columns = TABLE_COLUMNS
+            min_score = st.slider("Minimum propensity:", 0.0, 1.0, 0.0, step=0.05, key='table_min_score',
+                                  on_change=first_page)
+        # Customers at or above the score, kept beside the selection like its sort orders
+        shown = selected if not min_score else selected.derive(
+            (PROPENSITY, min_score), lambda sel: sel.subset(scores[sel.positions()] >= min_score))
+        
+        col1, col2, col3, col4 = st.columns([2, 2, 1, 1])
+        with col1:
+            sort_options = ["Row order"] + ([PROPENSITY] if scores is not None else []) + list(df.columns)
+            sort_by = st.selectbox("Sort by:", sort_options, key='table_sort', on_change=first_page)
+        with col2:
+            direction = st.radio("Order:", ["Ascending", "Descending"], horizontal=True, key='table_order',
+                                 on_change=first_page)
+        with col3:
+            page_size = st.selectbox("Rows per page:", TABLE_PAGE_SIZES, index=TABLE_PAGE_SIZES.index(100),
+                                     key='table_page_size', on_change=first_page)
+        pages = max(1, -(-len(shown) // page_size))
+        if st.session_state.get('table_page', 1) > pages:
+            st.session_state['table_page'] = pages
+        with col4:
+            page = st.number_input("Page:", min_value=1, max_value=pages, step=1, key='table_page')
+        
+        column = None if sort_by == "Row order" else sort_by
+        columns = table_columns if column is None or column in table_columns else table_columns + [column]
+        start = (page - 1) * page_size
+        with profiler.span('sort', rows=len(shown)):
+            data.sorts.ordered(shown, column)
+        with profiler.span('page', rows=page_size):
+            rows = data.sorts.page(shown, column, direction == "Ascending", start, page_size, columns)
         st.dataframe(
-            df_filtered[['ID', 'Age', 'Income', 'CCAvg', 'Education', 'Mortgage', 'Personal Loan']].head(100),
+            rows,
             use_container_width=True,
-            height=400
+            height=400,
+            column_config={PROPENSITY: st.column_config.ProgressColumn(PROPENSITY, min_value=0.0, max_value=1.0,
+                                                                      format="%.3f")}
         )
+        first = start + 1 if len(rows) else 0
+        above = f" with propensity ≥ {min_score:.2f}" if min_score else ""
+        st.caption(f"Rows {first:,}–{start + len(rows):,} of {len(shown):,}{above} (page {page:,} of {pages:,})")
+        if model is None:
+            return
+        metrics = dict(model.metrics)
+        st.caption(f"Propensity: logistic model {model.version} (holdout AUC {metrics.get('auc', float('nan')):.3f}); "
+                   f"{len(scores):,} customers scored in {score_seconds * 1000:,.1f} ms "
+                   f"({len(scores) / max(score_seconds, 1e-9):,.0f} rows/s)")
+    
+    with tab1:
+        st.markdown("### Filtered Dataset")
+        data_table()
         
-        st.markdown("### Download Data")
-        csv = df_filtered.to_csv(index=False)
-        st.download_button(
-            label="Download filtered data as CSV",
-            data=csv,
-            file_name="filtered_customers.csv",
-            mime="text/csv"
-        )
+        download_panel()
     
     with tab2:
         st.markdown("### Summary Statistics")
         
-        numeric_columns = ['Age', 'Experience', 'Income', 'Family', 'CCAvg', 'Mortgage']
-        
-        stats = df_filtered[numeric_columns].describe().T
-        st.dataframe(stats, use_container_width=True)
+        # Age, Experience, Income, Family, CCAvg and Mortgage (analytics.STAT_COLUMNS)
+        st.dataframe(result('describe', None, exact_quantiles), use_container_width=True)
         
         # By loan status
         st.markdown("### Statistics by Loan Status")
@@ -631,51 +1117,189 @@ elif section == "📋 Data Explorer":
         
         with col1:
             st.markdown("#### Loan = 0 (No Loan)")
-            st.dataframe(
-                df_filtered[df_filtered['Personal Loan'] == 0][numeric_columns].describe().T,
-                use_container_width=True
-            )
+            st.dataframe(result('describe', 0, exact_quantiles), use_container_width=True)
         
         with col2:
             st.markdown("#### Loan = 1 (Accepted Loan)")
-            st.dataframe(
-                df_filtered[df_filtered['Personal Loan'] == 1][numeric_columns].describe().T,
-                use_container_width=True
-            )
+            st.dataframe(result('describe', 1, exact_quantiles), use_container_width=True)
     
     with tab3:
         st.markdown("### Correlation Matrix")
         
-        numeric_cols = ['Age', 'Experience', 'Income', 'Family', 'CCAvg', 'Mortgage', 'Personal Loan', 'CD Account']
-        corr_matrix = df_filtered[numeric_cols].corr()
+        # The numeric columns plus Personal Loan and CD Account (analytics.CORR_COLUMNS)
+        corr_matrix = result('correlations', exact_quantiles)
         
-        fig = px.imshow(
-            corr_matrix,
-            labels=dict(x="Variable", y="Variable", color="Correlation"),
-            x=corr_matrix.columns,
-            y=corr_matrix.columns,
-            color_continuous_scale='RdBu',
-            color_continuous_midpoint=0,
-            zmin=-1,
-            zmax=1,
-            text_auto='.2f'
-        )
-        fig.update_layout(height=600)
-        st.plotly_chart(fig, use_container_width=True)
+        def correlation_matrix():
+            fig = px.imshow(
+                corr_matrix,
+                labels=dict(x="Variable", y="Variable", color="Correlation"),
+                x=corr_matrix.columns,
+                y=corr_matrix.columns,
+                color_continuous_scale='RdBu',
+                color_continuous_midpoint=0,
+                zmin=-1,
+                zmax=1,
+                text_auto='.2f'
+            )
+            fig.update_layout(height=600)
+            return fig
         
-        st.markdown("### Top Correlations with Personal Loan")
-        loan_corr = corr_matrix['Personal Loan'].sort_values(ascending=False)
+        def loan_correlations():
+            loan_corr = corr_matrix['Personal Loan'].sort_values(ascending=False)
+            return px.bar(
+                x=loan_corr.index,
+                y=loan_corr.values,
+                title='Variable Correlation with Personal Loan',
+                labels={'x': 'Variable', 'y': 'Correlation'},
+                color=loan_corr.values,
+                color_continuous_scale='RdBu',
+                color_continuous_midpoint=0
+            )
+        
+        show_chart("correlation_matrix", correlation_matrix, exact_quantiles)
         
+        st.markdown("### Top Correlations with Personal Loan")
+        show_chart("loan_correlations", loan_correlations, exact_quantiles)
+
+# ============================================
+# SECTION 8: SCENARIO COMPARISON
+# ============================================
+SCENARIO_COLUMNS = (['Scenario', 'Income min', 'Income max', 'CC min', 'CC max']
+                    + list(EDUCATION_LABELS.values()) + list(LOAN_LABELS.values()))
+
+def scenario_row(name, spec):
+    row = {'Scenario': name, 'Income min': spec.income[0], 'Income max': spec.income[1],
+           'CC min': spec.ccavg[0], 'CC max': spec.ccavg[1]}
+    row.update({label: level in spec.education for level, label in EDUCATION_LABELS.items()})
+    row.update({label: status in spec.loan for status, label in LOAN_LABELS.items()})
+    return row
+
+def scenario_specs(table):
+    # Named filter states from the editor's rows: unnamed rows are skipped,
+    # a repeated name keeps its first row and empty cells the default filters.
+    specs = {}
+    for row in table.to_dict('records'):
+        def value(col, default=False):
+            return default if pd.isna(row[col]) else row[col]
+        name = str(value('Scenario', '')).strip()
+        if not name or name in specs:
+            continue
+        specs[name] = FilterSpec.from_widgets(
+            (value('Income min', DEFAULT_FILTERS.income[0]), value('Income max', DEFAULT_FILTERS.income[1])),
+            (value('CC min', DEFAULT_FILTERS.ccavg[0]), value('CC max', DEFAULT_FILTERS.ccavg[1])),
+            [level for level, label in EDUCATION_LABELS.items() if value(label)],
+            [status for status, label in LOAN_LABELS.items() if value(label)],
+        )
+    return specs
+
+@rerun_unit("scenarios")
+def scenarios_section():
+    import plotly.express as px
+    st.markdown("<h2 class='section-title'>Scenario Comparison</h2>", unsafe_allow_html=True)
+    st.caption("Each row is a named filter state, independent of the sidebar filters. Add, edit or delete rows; "
+               "all of them are evaluated together in one pass over the data.")
+    
+    if 'scenario_table' not in st.session_state:
+        st.session_state['scenario_table'] = pd.DataFrame(
+            [scenario_row(name, spec) for name, spec in DEFAULT_PRESETS.items()], columns=SCENARIO_COLUMNS)
+    # The editor keeps its edits under its key; a new key starts it from the stored table.
+    # Bounds go up to the highest value in the data, like the sidebar sliders.
+    income_max = max(int(np.ceil(df['Income'].max())), int(DEFAULT_FILTERS.income[1]))
+    cc_max = max(float(np.ceil(df['CCAvg'].max())), DEFAULT_FILTERS.ccavg[1])
+    editor = st.session_state.setdefault('scenario_editor', 0)
+    table = st.data_editor(
+        st.session_state['scenario_table'],
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            'Income min': st.column_config.NumberColumn(min_value=0, max_value=income_max, step=1, format="$%dk"),
+            'Income max': st.column_config.NumberColumn(min_value=0, max_value=income_max, step=1, format="$%dk"),
+            'CC min': st.column_config.NumberColumn(min_value=0.0, max_value=cc_max, step=0.1, format="$%.1fk"),
+            'CC max': st.column_config.NumberColumn(min_value=0.0, max_value=cc_max, step=0.1, format="$%.1fk"),
+        },
+        key=f'scenario_table_{editor}'
+    )
+    if st.button("➕ Add current filters", key='scenario_add',
+                 help="Add the sidebar's filter state as a scenario."):
+        names = set(table['Scenario'].dropna())
+        name = next(n for n in (f"current filters {i}" if i else "current filters" for i in range(len(names) + 1))
+                    if n not in names)
+        st.session_state['scenario_table'] = pd.concat(
+            [table, pd.DataFrame([scenario_row(name, filter_spec)], columns=SCENARIO_COLUMNS)], ignore_index=True)
+        st.session_state['scenario_editor'] = editor + 1
+        st.rerun()
+    
+    specs = scenario_specs(table)
+    if not specs:
+        st.info("Name at least one scenario to compare.")
+        return
+    
+    # Cached by the scenarios' names and filter states, whatever the sidebar says
+    key = ('scenarios',) + tuple((name, fingerprint(spec)) for name, spec in specs.items())
+    with profiler.span('result:scenarios', rows=len(df)):
+        comparison = result_cache.get_or_compute(key, lambda: analytics.compare_scenarios(data, specs))
+    kpis, tiers = comparison['kpis'], comparison['tiers']
+    
+    st.markdown("### Side-by-Side KPIs")
+    st.dataframe(
+        kpis.assign(conversion=kpis['conversion'] * 100, share=kpis['customers'] / len(df) * 100),
+        use_container_width=True,
+        column_config={
+            'customers': st.column_config.NumberColumn("Customers", format="%d"),
+            'loans': st.column_config.NumberColumn("Loans", format="%d"),
+            'conversion': st.column_config.NumberColumn("Conversion", format="%.1f%%"),
+            'avg_income': st.column_config.NumberColumn("Avg Income", format="$%.1fk"),
+            'avg_ccavg': st.column_config.NumberColumn("Avg CC Spending", format="$%.2fk"),
+            'share': st.column_config.NumberColumn("Share of all", format="%.1f%%"),
+        }
+    )
+    
+    col1, col2 = st.columns(2)
+    
+    def scenario_conversion():
         fig = px.bar(
-            x=loan_corr.index,
-            y=loan_corr.values,
-            title='Variable Correlation with Personal Loan',
-            labels={'x': 'Variable', 'y': 'Correlation'},
-            color=loan_corr.values,
-            color_continuous_scale='RdBu',
-            color_continuous_midpoint=0
+            x=kpis.index,
+            y=kpis['conversion'] * 100,
+            title='Conversion Rate by Scenario',
+            labels={'x': 'Scenario', 'y': 'Conversion Rate (%)'},
+            text=(kpis['conversion'] * 100).round(1)
         )
-        st.plotly_chart(fig, use_container_width=True)
+        fig.update_traces(texttemplate='%{text:.1f}%', textposition='outside')
+        return fig
+    
+    def scenario_tier_mix():
+        with np.errstate(invalid='ignore', divide='ignore'):
+            shares = tiers.div(kpis['customers'], axis=0) * 100
+        return px.bar(
+            shares.reset_index().melt(id_vars='Scenario', var_name='Tier', value_name='share'),
+            x='Scenario',
+            y='share',
+            color='Tier',
+            title='Tier Mix by Scenario',
+            labels={'share': 'Customers (%)'},
+            color_discrete_sequence=['#2ca02c', '#ff7f0e', '#1f77b4', '#d62728']
+        )
+    
+    with col1:
+        show_chart("scenario_conversion", scenario_conversion, key=key)
+    with col2:
+        show_chart("scenario_tier_mix", scenario_tier_mix, key=key)
+    
+    st.markdown("### Customers per Tier")
+    st.dataframe(tiers, use_container_width=True)
+
+SECTIONS = {
+    "📊 Overview": overview_section,
+    "📈 Income Analysis": income_section,
+    "💳 Credit Card Analysis": credit_card_section,
+    "🎓 Education Analysis": education_section,
+    "🎪 VIP Segment": vip_section,
+    "🎯 Customer Tiers": tiers_section,
+    "📋 Data Explorer": explorer_section,
+    "🔀 Scenario Comparison": scenarios_section,
+}
+SECTIONS[section]()
 
 # Footer
 st.markdown("---")
@@ -686,3 +1310,43 @@ st.markdown("""
     <p>Developed with Streamlit | <strong>Status: </strong>Ready for Implementation</p>
     </footer>
 """, unsafe_allow_html=True)
+
+# Full-run compute time, from the top of the script to here. Fragment reruns
+# skip the script and are logged by rerun_unit (see rerun_stats.py).
+rerun_log.record(SCRIPT, time.perf_counter() - _script_start)
+profiler.stop()
+# Started only now, with the page already drawn, so it never delays a render.
+with st.sidebar.expander("⏱️ Reruns & cache"):
+    st.caption(f"{rerun_log.reruns} rerun(s), {rerun_log.compute_seconds * 1000:,.0f} ms of compute this session")
+    st.dataframe(rerun_log.summary(), use_container_width=True)
+    cache = result_cache.stats()
+    st.caption(f"Result cache: {cache['entries']} entries, {format_bytes(cache['bytes'])}, "
+               f"{cache['hits']} hits / {cache['misses']} misses ({cache['hit_rate']*100:.0f}% hit rate), "
+               f"{cache['evictions']} evicted")
+    warm = warmer.progress()
+    failed = f", {warm['failed']} failed" if warm['failed'] else ""
+    st.caption(f"Cache warm-up: {warm['done']}/{warm['total']} results for {len(warmer.presets)} presets "
+               f"({'running' if warm['running'] else 'done'}, {warm['seconds']:.1f} s{failed})")
+    st.button("Reset", on_click=rerun_log.clear, key='reset_reruns')
+
+if debug:
+    with st.sidebar.expander("🔥 Profile", expanded=True):
+        # Tracing is counted per session that switched it on (see profiling.py),
+        # so it is only asked for or released when this checkbox changes.
+        st.checkbox("Trace allocations", key='trace_allocations',
+                    on_change=lambda: trace_allocations(st.session_state['trace_allocations']),
+                    help="Record the bytes each stage allocates (tracemalloc, process-wide). "
+                         "Slows every rerun down while on.")
+        traces = list(reversed(profiler.traces))
+        pick = st.selectbox(
+            "Run:",
+            range(len(traces)),
+            format_func=lambda i: (f"{traces[i].unit} · {traces[i].seconds * 1000:,.0f} ms · "
+                                   f"{time.strftime('%H:%M:%S', time.localtime(traces[i].at))}"),
+            key='profile_trace'
+        )
+        if pick is not None:
+            st.plotly_chart(flame_figure(traces[pick]), use_container_width=True)
+            st.dataframe(trace_frame(traces[pick]), hide_index=True, use_container_width=True)
+        st.caption(f"Every run is logged to {PROFILE_LOG} (rotated at {format_bytes(LOG_MAX_BYTES)}, "
+                   f"{LOG_BACKUPS} backups)")
@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import Dataset  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def data():
+    """The UniversalBank sample, loaded through the sidecar like the dashboard does."""
+    return Dataset.load()
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from filter_index import EDUCATION_LEVELS, FilterSpec
+from moments import MOMENT_COLUMNS
+
+COLUMNS = list(MOMENT_COLUMNS)
+
+
+def random_specs(count, seed=0):
+    """Seeded filter states over (and a little beyond) the sample's Income and CCAvg ranges."""
+    rng = np.random.default_rng(seed)
+    specs = {}
+    for i in range(count):
+        i_low, i_high = np.sort(rng.uniform(0.0, 230.0, 2)).round()
+        c_low, c_high = np.sort(rng.uniform(0.0, 10.0, 2)).round(1)
+        levels = tuple(level for level in EDUCATION_LEVELS if rng.random() < 0.7) or (1,)
+        loan = ((0, 1), (0,), (1,))[rng.integers(3)]
+        specs[f'random {i}'] = FilterSpec(income=(float(i_low), float(i_high)), ccavg=(float(c_low), float(c_high)),
+                                         education=levels, loan=loan)
+    return specs
+
+
+SPECS = {
+    'default': FilterSpec(),
+    **random_specs(40),
+    'no education': FilterSpec(education=()),
+    'above the data': FilterSpec(income=(500.0, 600.0)),
+}
+
+
+def single_row_spec(df):
+    """A spec that matches exactly one customer."""
+    keys = ['Income', 'CCAvg', 'Education', 'Personal Loan']
+    unique = df.drop_duplicates(keys, keep=False)
+    row = unique.iloc[0]
+    spec = FilterSpec(income=(float(row['Income']),) * 2, ccavg=(float(row['CCAvg']),) * 2,
+                      education=(int(row['Education']),), loan=(int(row['Personal Loan']),))
+    assert spec.mask(df).sum() == 1
+    return spec
+
+
+def assert_matches_pandas(moments, frame):
+    expected = frame[COLUMNS].astype(np.float64)
+    assert moments.n == len(expected)
+    pd.testing.assert_series_equal(moments.mean(), expected.mean(), check_names=False, rtol=1e-9, atol=1e-9)
+    pd.testing.assert_series_equal(moments.std(), expected.std(), check_names=False, rtol=1e-7, atol=1e-9)
+    pd.testing.assert_frame_equal(moments.corr(), expected.corr(), rtol=1e-7, atol=1e-9)
+
+
+@pytest.mark.parametrize('name', list(SPECS) + ['single row'])
+def test_query_matches_pandas(data, name):
+    spec = single_row_spec(data.df) if name == 'single row' else SPECS[name]
+    mask = spec.mask(data.df)
+    assert_matches_pandas(data.moments.query(spec), data.df[mask])
+    for loan in (0, 1):
+        by_loan = mask & (data.df['Personal Loan'].to_numpy() == loan)
+        assert_matches_pandas(data.moments.query(spec, loan=loan), data.df[by_loan])
+
+
+def test_empty_and_single_row_are_nan(data):
+    empty = data.moments.query(FilterSpec(education=()))
+    assert empty.n == 0 and empty.mean().isna().all() and empty.corr().isna().all().all()
+    single = data.moments.query(single_row_spec(data.df))
+    assert single.n == 1 and single.std().isna().all() and single.corr().isna().all().all()
+
+
+def test_updated_matches_pandas(data):
+    df = data.df.copy()
+    rows = np.array([3, 10, 400])
+    df.loc[rows, 'Income'] = df['Income'].iloc[rows] + 50
+    df.loc[rows, 'CCAvg'] = 0.0
+    df = pd.concat([df, df.iloc[[5, 6]]], ignore_index=True)
+    moments = data.moments.updated(df, np.r_[rows, len(df) - 2, len(df) - 1])
+    for spec in list(SPECS.values())[:10]:
+        assert_matches_pandas(moments.query(spec), df[spec.mask(df)])
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from filter_index import FilterSpec
+from quantile_sketch import QuantileSketch
+
+SPECS = [
+    FilterSpec(),
+    FilterSpec(income=(35.5, 180.0), ccavg=(0.3, 6.2)),
+    FilterSpec(education=(2, 3), loan=(1,)),
+]
+
+
+def test_std_with_large_offset():
+    values = 1e7 + np.random.default_rng(0).standard_normal(200_000)
+    expected = pd.Series(values).std()
+    merged = QuantileSketch().update(values[:70_000]).merge(QuantileSketch().update(values[70_000:]))
+    extra = QuantileSketch.merged([QuantileSketch().update(values[:1000])], extra=values[1000:])
+    for sketch in (merged, extra):
+        assert sketch.n == len(values)
+        assert sketch.mean == pytest.approx(values.mean(), rel=1e-12)
+        assert sketch.std == pytest.approx(expected, rel=1e-9)
+
+
+@pytest.mark.parametrize('spec', SPECS)
+def test_describe_moments_match_pandas(data, spec):
+    result = data.sketches.describe(spec)
+    expected = data.df[spec.mask(data.df)][result.index].astype(np.float64).describe().T
+    for stat in ('count', 'mean', 'std', 'min', 'max'):
+        np.testing.assert_allclose(result[stat], expected[stat], rtol=1e-9)
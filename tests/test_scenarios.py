@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+import analytics
+from filter_index import FilterSpec
+from segmentation import CUSTOMER_TIERS
+
+SCENARIOS = {
+    'default': FilterSpec(),
+    'fractional income': FilterSpec(income=(40.5, 100.0)),
+    'fractional both ends': FilterSpec(income=(60.25, 120.75), ccavg=(1.05, 3.95)),
+    'beyond int16': FilterSpec(income=(100.0, 100000.0)),
+    'below the data': FilterSpec(income=(-50000.0, 20.0)),
+    'above the data': FilterSpec(income=(50000.0, 60000.0)),
+    'inverted': FilterSpec(income=(120.0, 80.0)),
+    'single value': FilterSpec(ccavg=(1.9, 1.9)),
+    'no education': FilterSpec(education=()),
+    'unknown level': FilterSpec(education=(2, 4)),
+    'loan takers': FilterSpec(income=(80.5, 224.0), education=(2, 3), loan=(1,)),
+}
+
+
+@pytest.fixture(scope='module')
+def comparison(data):
+    return analytics.compare_scenarios(data, SCENARIOS)
+
+
+@pytest.mark.parametrize('name', list(SCENARIOS))
+def test_scenario_matches_mask(data, comparison, name):
+    spec = SCENARIOS[name]
+    mask = spec.mask(data.df)
+    rows = data.df[mask]
+    kpis = comparison['kpis'].loc[name]
+    assert kpis['customers'] == mask.sum() == len(data.select(spec))
+    assert kpis['loans'] == rows['Personal Loan'].sum()
+    if len(rows):
+        assert kpis['avg_income'] == pytest.approx(rows['Income'].mean())
+        assert kpis['avg_ccavg'] == pytest.approx(rows['CCAvg'].astype(np.float64).mean())
+    else:
+        assert np.isnan(kpis['conversion'])
+    codes = CUSTOMER_TIERS.codes(rows)
+    expected = np.bincount(codes, minlength=len(CUSTOMER_TIERS.labels))
+    np.testing.assert_array_equal(comparison['tiers'].loc[name].to_numpy(), expected)
+
+
+def test_no_scenarios(data):
+    comparison = analytics.compare_scenarios(data, {})
+    assert comparison['kpis'].empty and comparison['tiers'].empty
+
+
+@pytest.mark.parametrize('name', list(SCENARIOS))
+def test_index_count_matches_mask(data, name):
+    spec = SCENARIOS[name]
+    assert data.index.count(spec) == spec.mask(data.df).sum()
@@ -0,0 +1,42 @@
+import time
+
+import numpy as np
+
+from scoring import ModelTrainer, latest_model
+
+
+def wait(trainer, version, timeout=60):
+    deadline = time.monotonic() + timeout
+    while trainer.training(version) and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+def test_trainer_trains_in_background(data, tmp_path):
+    trainer = ModelTrainer(model_dir=str(tmp_path))
+    assert trainer.model(data.df, data.version) is None
+    assert trainer.training(data.version)
+    wait(trainer, data.version)
+    model = trainer.model(data.df, data.version)
+    assert model is not None and not trainer.errors
+    assert model.data_version == data.version
+    assert latest_model(data.version, str(tmp_path)).version == model.version
+    scores = model.score(data.df)
+    assert len(scores) == len(data.df) and np.all((scores >= 0) & (scores <= 1))
+
+
+def test_trainer_reuses_saved_model(data, tmp_path):
+    first = ModelTrainer(model_dir=str(tmp_path))
+    first.model(data.df, data.version)
+    wait(first, data.version)
+    # A new process (or a refreshed dataset) finds the saved model without training.
+    trainer = ModelTrainer(model_dir=str(tmp_path))
+    assert trainer.model(data.df, 'another version').version == first.model(data.df, data.version).version
+    assert not trainer.training('another version')
+
+
+def test_failed_training_is_not_retried(data, tmp_path):
+    trainer = ModelTrainer(model_dir=str(tmp_path))
+    assert trainer.model(data.df.drop(columns='Income'), data.version) is None
+    wait(trainer, data.version)
+    assert trainer.errors
+    assert trainer.model(data.df, data.version) is None and not trainer.training(data.version)
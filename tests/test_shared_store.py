@@ -0,0 +1,29 @@
+import json
+import os
+import subprocess
+import sys
+
+from data_store import DATA_FILE
+from shared_store import SharedDataset, attached_sessions
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def test_registry_drops_closed_and_dead_workers(tmp_path):
+    cache_dir = str(tmp_path)
+    shared = SharedDataset(DATA_FILE, cache_dir)
+    assert shared.attach('session') == 1
+    registry = os.path.dirname(shared._registry)
+    stale = os.path.join(registry, 'stale.json')
+    with open(stale, 'w', encoding='utf-8') as fh:
+        json.dump({'pid': dead_pid(), 'sessions': 3, 'updated': 0}, fh)
+
+    assert attached_sessions(DATA_FILE, cache_dir) == {os.getpid(): 1}
+    assert not os.path.exists(stale)
+    shared.close()
+    assert attached_sessions(DATA_FILE, cache_dir) == {}
+    assert os.listdir(registry) == []
@@ -0,0 +1,22 @@
+import pytest
+
+from filter_index import DEFAULT_FILTERS, FilterSpec
+from sqlite_backend import SqliteBackend, check_parity
+
+PRESETS = {
+    'sidebar defaults': DEFAULT_FILTERS,
+    'edges': FilterSpec(income=(80.5, 100000.0), ccavg=(1.9, 1.9), education=(2, 3), loan=(0,)),
+    'empty': FilterSpec(education=()),
+}
+
+
+@pytest.fixture(scope='module')
+def backend(data, tmp_path_factory):
+    backend = SqliteBackend.open(data, str(tmp_path_factory.mktemp('sqlite') / 'customers.sqlite'))
+    yield backend
+    backend.close()
+
+
+@pytest.mark.parametrize('name', list(PRESETS))
+def test_sql_matches_pandas(data, backend, name):
+    assert check_parity(data, backend, {name: PRESETS[name]}) == []
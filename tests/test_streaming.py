@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+import batch
+from analytics import STAT_COLUMNS
+from streaming import StreamStats
+
+
+@pytest.fixture(scope='module')
+def streamed(data, tmp_path_factory):
+    path = tmp_path_factory.mktemp('stream') / 'customers.csv'
+    data.df.to_csv(path, index=False)
+    results, _ = batch.stream_presets(batch.DEFAULT_PRESETS, str(path), chunksize=700)
+    return results
+
+
+@pytest.mark.parametrize('name', list(batch.DEFAULT_PRESETS))
+def test_stream_matches_frame(data, streamed, name):
+    rows = data.df[batch.DEFAULT_PRESETS[name].mask(data.df)]
+    result = streamed[name]
+    assert result['customers'] == len(rows)
+    assert result['conversion_rate'] == pytest.approx(rows['Personal Loan'].mean())
+    for col in STAT_COLUMNS:
+        values = rows[col].astype(np.float64)
+        assert result['means'][col] == pytest.approx(values.mean())
+        assert result['std'][col] == pytest.approx(values.std())
+    tiers = result['tiers']
+    assert tiers['count'].sum() == len(rows)
+    education = result['education']
+    assert education['count'].sum() == len(rows)
+    assert education['count'].to_numpy() @ education['mean'].to_numpy() == pytest.approx(rows['Personal Loan'].sum())
+
+
+def test_std_with_large_offset(data):
+    df = data.df.astype({'Income': np.float64})
+    df['Income'] += 1e8
+    chunks = [df.iloc[start:start + 700] for start in range(0, len(df), 700)]
+    stats = StreamStats()
+    for chunk in chunks[:3]:
+        stats.update(chunk)
+    rest = StreamStats()
+    for chunk in chunks[3:]:
+        rest.update(chunk)
+    stats.merge(rest)
+    assert stats.mean('Income') == pytest.approx(df['Income'].mean(), rel=1e-12)
+    assert stats.std('Income') == pytest.approx(df['Income'].std(), rel=1e-9)
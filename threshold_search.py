@@ -0,0 +1,140 @@
+"""Search over tier cut-offs with cumulative count tables.
+
+A Tier 1 style segment is ``Income >= a and CCAvg >= b and Education in E``.
+``ThresholdGrid`` bins the selected customers once onto a grid of candidate
+cut-offs (every $1k of Income, every $0.1k of CCAvg) per education level and
+turns the counts and loans into suffix sums over both axes, so
+``count[e, i, j]`` is the number of level-``e`` customers with Income at or
+above ``income_cuts[i]`` and CCAvg at or above ``cc_cuts[j]``. Any candidate
+is then a sum of at most three table cells, and ``candidates`` evaluates every
+cut-off pair for every set of education levels in one vectorized pass.
+
+``frontier`` keeps the candidates no other candidate beats on both size and
+conversion: for each tier size, the best conversion any cut-offs reach.
+Cut-offs are compared in the column's precision, as ``segmentation.Condition``
+does, so a frontier point applied as tier thresholds selects the same rows.
+"""
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from filter_index import EDUCATION_LEVELS
+
+INCOME_STEP = 1
+CC_STEP = 0.1
+MIN_TIER_SIZE = 25
+
+
+def education_sets(levels=EDUCATION_LEVELS):
+    """Every non-empty set of education levels, as sorted tuples."""
+    return [combo for k in range(1, len(levels) + 1) for combo in itertools.combinations(levels, k)]
+
+
+def _cuts(values, step):
+    """Cut-offs from the lowest value up to the highest, ``step`` apart, in ``values``' dtype."""
+    if not len(values):
+        return np.empty(0, dtype=values.dtype)
+    low = np.floor(values.min() / step)
+    high = np.ceil(values.max() / step)
+    return np.round(np.arange(low, high + 1) * step, 6).astype(values.dtype)
+
+
+def _suffix_sums(table):
+    return table[:, ::-1, ::-1].cumsum(axis=1).cumsum(axis=2)[:, ::-1, ::-1]
+
+
+class ThresholdGrid:
+    def __init__(self, income, ccavg, education, loan, levels=EDUCATION_LEVELS,
+                 income_step=INCOME_STEP, cc_step=CC_STEP):
+        income, ccavg = np.asarray(income), np.asarray(ccavg)
+        education, loan = np.asarray(education), np.asarray(loan)
+        self.levels = tuple(levels)
+        self.income_cuts = _cuts(income, income_step)
+        self.cc_cuts = _cuts(ccavg, cc_step)
+        shape = (len(self.levels), len(self.income_cuts), len(self.cc_cuts))
+        size = int(np.prod(shape))
+        # Cell of each customer: its education level and the highest cut-offs
+        # it is at or above.
+        lut = np.full(max(self.levels) + 1, -1, dtype=np.intp)
+        lut[list(self.levels)] = np.arange(len(self.levels))
+        e = lut[education] if size else np.empty(0, dtype=np.intp)
+        keep = e >= 0
+        cells = (e[keep] * shape[1] + np.searchsorted(self.income_cuts, income[keep], side='right') - 1) * shape[2] \
+            + np.searchsorted(self.cc_cuts, ccavg[keep], side='right') - 1
+        self.count = _suffix_sums(np.bincount(cells, minlength=size).reshape(shape))
+        self.loans = _suffix_sums(np.bincount(cells, weights=loan[keep], minlength=size)
+                                  .round().astype(np.int64).reshape(shape))
+        self.total = int(keep.sum())
+
+    @classmethod
+    def from_selection(cls, selection, **kwargs):
+        return cls(selection['Income'], selection['CCAvg'], selection['Education'], selection['Personal Loan'],
+                   **kwargs)
+
+    @property
+    def n_candidates(self):
+        """Cut-off combinations ``candidates`` evaluates with every education set."""
+        return len(education_sets(self.levels)) * len(self.income_cuts) * len(self.cc_cuts)
+
+    def _level_mask(self, education):
+        return np.isin(self.levels, list(education))
+
+    def at(self, income, ccavg, education):
+        """``(customers, loans)`` with Income >= ``income``, CCAvg >= ``ccavg`` and Education in ``education``."""
+        i = np.searchsorted(self.income_cuts, income, side='left')
+        j = np.searchsorted(self.cc_cuts, self.cc_cuts.dtype.type(ccavg), side='left')
+        if i >= len(self.income_cuts) or j >= len(self.cc_cuts):
+            return 0, 0
+        levels = self._level_mask(education)
+        return int(self.count[levels, i, j].sum()), int(self.loans[levels, i, j].sum())
+
+    def _sets(self, sets):
+        return education_sets(self.levels) if sets is None else [tuple(s) for s in sets]
+
+    def _evaluate(self, sets):
+        """Customers and loans of every candidate, flat in (set, Income cut, CCAvg cut) order."""
+        members = np.array([self._level_mask(s) for s in sets], dtype=np.int64).reshape(len(sets), -1)
+        return (np.tensordot(members, self.count, axes=1).ravel(),
+                np.tensordot(members, self.loans, axes=1).ravel())
+
+    def _frame(self, sets, flat, count, loans):
+        s, i, j = np.unravel_index(flat, (len(sets),) + self.count.shape[1:])
+        labels = np.empty(len(sets), dtype=object)
+        for k, combo in enumerate(sets):
+            labels[k] = combo
+        with np.errstate(invalid='ignore', divide='ignore'):
+            conversion = loans[flat] / count[flat]
+        return pd.DataFrame({
+            'income': self.income_cuts[i],
+            'ccavg': self.cc_cuts[j],
+            'education': labels[s],
+            'count': count[flat],
+            'loans': loans[flat],
+            'conversion': conversion,
+        })
+
+    def candidates(self, sets=None):
+        """Customers, loans and conversion of every (Income, CCAvg, education set) candidate."""
+        sets = self._sets(sets)
+        count, loans = self._evaluate(sets)
+        return self._frame(sets, np.arange(len(count)), count, loans)
+
+    def frontier(self, min_count=MIN_TIER_SIZE, sets=None):
+        """Candidates not beaten on both size and conversion, smallest first.
+
+        Of candidates with the same customers and loans, the one listed first
+        by ``candidates`` (the lowest cut-offs) is kept.
+        """
+        sets = self._sets(sets)
+        count, loans = self._evaluate(sets)
+        flat = np.flatnonzero(count >= max(min_count, 1))
+        if len(flat):
+            # Largest first and, at equal size, most loans first; the stable
+            # sort keeps candidate order among ties.
+            key = count[flat] * (int(loans.max()) + 1) + loans[flat]
+            flat = flat[np.argsort(-key, kind='stable')]
+            conversion = loans[flat] / count[flat]
+            best_larger = np.maximum.accumulate(np.concatenate([[-np.inf], conversion[:-1]]))
+            flat = flat[conversion > best_larger][::-1]
+        return self._frame(sets, flat, count, loans)
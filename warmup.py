@@ -0,0 +1,134 @@
+"""Background warm-up of the result cache for popular filter presets.
+
+After a deploy or restart every section is computed from scratch by the first
+sessions. ``CacheWarmer`` computes the ``analytics.SECTION_RESULTS`` the
+sections read with the sidebar's default options (``WARM_RESULTS``) for a list
+of presets, on a small thread pool behind a daemon thread, and stores them in
+the shared ``ResultCache`` under the keys the dashboard looks up. The
+dashboard starts it as soon as a dataset version is built, before the first
+page is drawn; it runs on its own threads, so it never holds up a render.
+``progress()`` reports how far it got.
+
+With an aggregate ``backend`` (``sqlite_backend.SqliteBackend``), the results
+it answers are computed through it, and every key carries its name, as the
+dashboard's do.
+
+Presets are read from ``WARM_PRESETS_FILE`` (the ``batch.py`` presets format)
+when it exists, else ``batch.DEFAULT_PRESETS`` is used; its "sidebar defaults"
+preset is the sidebar's default filter state.
+Figures are not warmed: they are built by the dashboard's own chart code.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import analytics
+from batch import DEFAULT_PRESETS, load_presets
+from result_cache import cache_key
+from sqlite_backend import SQL_RESULTS
+
+WARM_PRESETS_FILE = 'warm_presets.json'
+WARM_WORKERS = 2
+
+# (name, *params) of the results the sections read with exact quantiles off.
+WARM_RESULTS = [
+    ('overview',),
+    ('income', False),
+    ('credit_card', False),
+    ('education',),
+    ('vip', False),
+    ('tiers',),
+    ('describe', None, False),
+    ('describe', 0, False),
+    ('describe', 1, False),
+    ('correlations', False),
+]
+
+
+def warm_presets(path=WARM_PRESETS_FILE):
+    """The configured presets, or the batch defaults."""
+    if os.path.exists(path):
+        return load_presets(path)
+    return dict(DEFAULT_PRESETS)
+
+
+class CacheWarmer:
+    def __init__(self, data, cache, presets=None, results=WARM_RESULTS, workers=WARM_WORKERS, backend=None):
+        self.data = data
+        self.cache = cache
+        self.backend = backend
+        self.presets = warm_presets() if presets is None else dict(presets)
+        self.results = list(results)
+        self.workers = workers
+        self.done = 0
+        self.computed = 0
+        self.failed = []
+        self.started = self.finished = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def total(self):
+        return len(self.presets) * len(self.results)
+
+    @property
+    def running(self):
+        return self.started is not None and self.finished is None
+
+    def start(self):
+        """Start warming in the background (once); returns immediately."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='cache-warmer', daemon=True)
+                self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.finished is not None
+
+    def _run(self):
+        self.started = time.monotonic()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='cache-warmer') as pool:
+                for future in [pool.submit(self._warm, name, spec) for name, spec in self.presets.items()]:
+                    future.result()
+        finally:
+            self.finished = time.monotonic()
+
+    def _warm(self, preset, spec):
+        selection = None
+        backend = None if self.backend is None else self.backend.name
+        for name, *params in self.results:
+            key = cache_key(name, spec, *params, backend=backend)
+            try:
+                if key not in self.cache:
+                    if backend is not None and name in SQL_RESULTS:
+                        value = self.backend.section_result(spec, name, *params)
+                    else:
+                        # One selection per preset, resolved only if something is missing.
+                        if selection is None:
+                            selection = self.data.select(spec)
+                        value = analytics.section_result(self.data, spec, name, *params, selection=selection)
+                    self.cache.put(key, value, version=self.data.version)
+                    with self._lock:
+                        self.computed += 1
+            except Exception as exc:
+                with self._lock:
+                    self.failed.append((preset, name, repr(exc)))
+            with self._lock:
+                self.done += 1
+
+    def progress(self):
+        """``done`` of ``total`` results (``computed`` of them were missing), failures and timing."""
+        end = self.finished if self.finished is not None else time.monotonic()
+        return {
+            'done': self.done,
+            'total': self.total,
+            'computed': self.computed,
+            'failed': len(self.failed),
+            'running': self.running,
+            'seconds': 0.0 if self.started is None else end - self.started,
+        }